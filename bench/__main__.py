@@ -0,0 +1,215 @@
+"""
+Load-test every route of the API and compare the result with a baseline.
+
+    DATABASE_URL=postgresql://postgres@localhost/cyds_bench DB_SSLMODE=disable \\
+        python -m bench --rows 10000 --concurrency 16 --duration 5
+
+    DATABASE_URL=sqlite:////tmp/cyds_bench.db python -m bench --rows 2000
+
+Run from the repository root. The database is topped up to --rows rows per
+table first (or to --customers / --bookings / ... for single tables; see
+bench/seed.py), then the app is started under gunicorn with gunicorn.conf.py
+and --profile, and each endpoint in bench/endpoints.py is driven by
+--concurrency keep-alive clients for --duration seconds. A SQLite file is
+created from the models as a stand-in when there is no local Postgres; its
+numbers only compare with other SQLite runs.
+
+Queries per request are counted in-process (Flask test client) for a few
+requests per endpoint before its load run. Results are printed, saved as JSON
+(--output, bench/results/ by default) and compared against --baseline when it
+exists; the exit status is 1 if any endpoint regressed (see bench/report.py).
+--save-baseline stores the run as the new baseline instead. Throughput and
+latency only compare between runs on the same machine with the same options;
+queries per request compare anywhere.
+
+Writes only touch rows the benchmark creates and removes again, but it still
+writes a lot: only point it at a throwaway database, never at Supabase.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')  # Read by my_app.config on import, here and in the gunicorn workers
+
+from sqlalchemy import event  # noqa: E402
+
+from my_app import create_app, db  # noqa: E402
+from my_app.models import Booking, Calendar, CateringBid, Customer, MealPrepBid, User  # noqa: E402
+
+from .endpoints import ENDPOINTS, Fixtures, cleanup  # noqa: E402
+from .load import drive, wait_for_port  # noqa: E402
+from .report import compare, load_results, print_table, save, summarize  # noqa: E402
+from .seed import VOLUMES, count, create_sqlite_schema, seed  # noqa: E402
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+DEFAULT_BASELINE = os.path.join(BENCH, 'baseline.json')
+PROFILES = ['sync', 'gthread', 'gevent', 'async']  # gunicorn.conf.py
+QUERY_SAMPLES = 3
+TABLES = {
+    'customers': Customer, 'users': User, 'bookings': Booking, 'calendar': Calendar,
+    'meal_prep_bids': MealPrepBid, 'catering_bids': CateringBid,
+}
+
+
+def count_queries(app, endpoint, requests, headers):
+    # SQL statements per request once caches are warm: the fewest over a few in-process requests after a first one
+    counts = []
+    executed = 0
+
+    def on_execute(*args):
+        nonlocal executed
+        executed += 1
+
+    client = app.test_client()
+    event.listen(db.engine, 'before_cursor_execute', on_execute)
+    try:
+        for path, body in itertools.islice(requests, QUERY_SAMPLES + 1):
+            executed = 0
+            response = client.open(path, method=endpoint.method, json=body, headers=headers)
+            response.get_data()  # Runs streamed responses to the end
+            response.close()
+            counts.append(executed)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', on_execute)
+        db.session.remove()  # No transaction left open while the server runs (SQLite would lock)
+    return min(counts[1:] or counts) if counts else None
+
+
+def start_server(args):
+    env = dict(os.environ, GUNICORN_PROFILE=args.profile)
+    env.setdefault('GUNICORN_MAX_REQUESTS', '0')  # A worker recycling mid-run drops connections and skews the numbers
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+               '--bind', f'127.0.0.1:{args.port}', '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    wait_for_port(args.port)
+    return server
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(app, args):
+    endpoints = [
+        endpoint for endpoint in ENDPOINTS
+        if not (args.reads_only and endpoint.writes)
+        and (not args.endpoint or any(pattern in endpoint.name for pattern in args.endpoint))
+    ]
+    fixtures = Fixtures(args.victims)
+    results = {'meta': {
+        'started_at': args.started_at,
+        'commit': git_commit(),
+        'database': db.engine.dialect.name,
+        'rows': {name: count(model) for name, model in TABLES.items()},
+        'profile': args.profile,
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+    }, 'endpoints': {}}
+
+    # Warm up the pools and caches on every worker with a round of every read
+    warmup = [next(endpoint.requests(fixtures)) for endpoint in endpoints if endpoint.method == 'GET']
+    db.session.remove()
+
+    server = start_server(args)
+    try:
+        if warmup and args.warmup:
+            asyncio.run(drive(args.port, 'GET', itertools.cycle(warmup), args.concurrency, args.warmup, fixtures.headers))
+
+        for endpoint in endpoints:
+            requests = endpoint.requests(fixtures)
+            queries = count_queries(app, endpoint, requests, fixtures.headers)
+            latencies, statuses, errors, elapsed = asyncio.run(
+                drive(args.port, endpoint.method, requests, args.concurrency, args.duration, fixtures.headers)
+            )
+            stats = summarize(latencies, statuses, errors, elapsed, endpoint.expect, queries)
+            results['endpoints'][endpoint.name] = stats
+            print(f"{endpoint.name:58} {stats['throughput_rps']:8.1f} req/s  p95 {stats['p95_ms']:8.1f} ms  "
+                  f"queries {stats['queries_per_request']}  errors {stats['errors']}"
+                  + (' (ran out of victims)' if elapsed < args.duration * 0.9 else ''), flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, help='top every table up to ROWS rows first')
+    for name in VOLUMES:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, metavar='ROWS', help=f'rows for {name} (overrides --rows)')
+    parser.add_argument('--profile', choices=PROFILES, default='gthread', help='GUNICORN_PROFILE (default gthread)')
+    parser.add_argument('--workers', type=int, help='WEB_CONCURRENCY (default: the profile\'s)')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent keep-alive clients (default 16)')
+    parser.add_argument('--duration', type=float, default=5, help='seconds per endpoint (default 5)')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of read traffic before measuring (default 2)')
+    parser.add_argument('--victims', type=int, default=1000,
+                        help='rows created for each route that uses one up per request (default 1000)')
+    parser.add_argument('--endpoint', action='append', help='only endpoints whose name contains this (repeatable)')
+    parser.add_argument('--reads-only', action='store_true', help='skip the routes that write')
+    parser.add_argument('--port', type=int, default=8733)
+    parser.add_argument('--output', help='results file (default bench/results/<timestamp>.json)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='results to compare against (default bench/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as --baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed throughput / p95 change before it counts as a regression (default 0.2)')
+    args = parser.parse_args()
+    args.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    url = os.environ.get('DATABASE_URL', '')
+    if not url.startswith(('postgres', 'sqlite')):
+        sys.exit('python -m bench needs a PostgreSQL or SQLite DATABASE_URL')
+    if 'supabase' in url:
+        sys.exit('python -m bench writes to the database; point it at a throwaway copy, not Supabase')
+
+    app = create_app()
+    with app.app_context():
+        create_sqlite_schema()
+        volumes = {name: getattr(args, name) for name in VOLUMES if getattr(args, name) is not None}
+        if args.rows is not None or volumes:
+            seed(args.rows or 0, **volumes)
+        cleanup()  # Rows left behind by an interrupted run
+        try:
+            results = run(app, args)
+        finally:
+            cleanup()
+
+    output = args.output or os.path.join(BENCH, 'results', f"{args.started_at.replace(':', '')}.json")
+    save(results, output)
+    print(f'\nSaved {output}')
+    print_table(results)
+
+    if args.save_baseline:
+        save(results, args.baseline)
+        print(f'Saved baseline {args.baseline}')
+    elif os.path.exists(args.baseline):
+        baseline = load_results(args.baseline)
+        print(f"\nAgainst baseline {args.baseline} ({baseline['meta'].get('commit')}, {baseline['meta'].get('started_at')})")
+        differing = [key for key in ('database', 'profile', 'workers', 'concurrency', 'duration_s', 'cpus', 'rows')
+                     if baseline['meta'].get(key) != results['meta'].get(key)]
+        if differing:
+            print(f"Note: the runs differ in {', '.join(differing)}; only queries per request are comparable")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} endpoints regressed')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
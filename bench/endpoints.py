@@ -0,0 +1,377 @@
+"""
+Every route the benchmark drives, with the requests it sends to each.
+
+Reads use keys sampled from the seeded data. Writes only ever touch rows the
+benchmark creates itself (customers with a bench- email, bookings and calendar
+events of type BENCH_EVENT dated BENCH_DATE or later, and the bids on them), so the
+seeded data the read routes return stays the same from run to run; cleanup()
+removes them all again. Routes that use up a row per request (DELETE, and
+POST of a bid, which needs a booking without one) draw from a pool of
+`victims` rows created up front and stop early when it runs dry.
+"""
+import itertools
+from datetime import date, datetime, timedelta, timezone
+from functools import cached_property
+
+from sqlalchemy import delete, insert, or_, select
+
+from my_app import db
+from my_app.auth import tokens
+from my_app.models import Booking, Calendar, CateringBid, Customer, MealPrepBid, User
+
+BENCH_EVENT = 'Bench event'
+BENCH_DATE = date(2030, 6, 1)  # Outside the seeded range, so month views and date filters never see bench rows
+BENCH_USER = 'bench-user'
+BENCH_PASSWORD = 'bench-password'
+BULK_SIZE = 10  # Bookings per POST /bookings/bulk and /bookings/bulk_delete request
+
+
+class Endpoint:
+    """
+    One benchmarked route. requests(fixtures) returns an iterator of
+    (path, JSON body or None); a finite one ends the route's run early.
+    `expect` is the status every request should get.
+    """
+
+    def __init__(self, method, route, requests, expect=200, writes=None):
+        self.method = method
+        self.route = route
+        self.requests = requests
+        self.expect = expect
+        self.writes = method != 'GET' if writes is None else writes
+
+    @property
+    def name(self):
+        return f'{self.method} {self.route}'
+
+
+class Fixtures:
+    # Keys the requests use, looked up or created the first time an endpoint needs them
+
+    def __init__(self, victims):
+        self.victims = victims
+        self.run = datetime.now().strftime('%Y%m%d%H%M%S')
+        self.serial = itertools.count()
+
+    # Seeded rows, for the reads
+
+    @cached_property
+    def booking(self):
+        # The newest seeded booking that has a calendar event
+        booking = db.session.execute(
+            select(Booking.booking_id, Booking.customer_id, Booking.requested_date)
+            .join(Calendar, Calendar.booking_id == Booking.booking_id)
+            .where(Booking.event_type != BENCH_EVENT)
+            .order_by(Booking.booking_id.desc()).limit(1)
+        ).first()
+        if booking is None:
+            raise SystemExit('No bookings with calendar events to benchmark; seed the database first (--rows)')
+        return booking
+
+    @cached_property
+    def month(self):
+        # First and last day of the sampled booking's month
+        first = self.booking.requested_date.replace(day=1)
+        return first, (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+
+    @cached_property
+    def user(self):
+        if not db.session.scalar(select(User.user_id).where(User.username == BENCH_USER)):
+            db.session.execute(insert(User), [{
+                'username': BENCH_USER, 'password': BENCH_PASSWORD, 'email': 'bench-user@example.com',
+            }])
+            db.session.commit()
+        return BENCH_USER, BENCH_PASSWORD
+
+    @cached_property
+    def headers(self):
+        # Sent with every request: the /metrics/* routes need a token, and so does everything under AUTH_REQUIRED
+        self.user
+        user = db.session.scalars(select(User).where(User.username == BENCH_USER)).one()
+        return {'Authorization': f'Bearer {tokens.issue(user)[0]}'}
+
+    # Rows created by the benchmark, for the writes
+
+    def new_customers(self, count):
+        rows = [{
+            'name': f'Bench Customer {self.run}-{i}',
+            'email': f'bench-{self.run}-{i}@example.com',
+            'phone_number': '(314)-555-0100',
+            'is_active': True,
+        } for i in itertools.islice(self.serial, count)]
+        return self.insert(Customer, Customer.customer_id, rows)
+
+    def new_bookings(self, count, with_event=False):
+        start = datetime.combine(BENCH_DATE, datetime.min.time(), timezone.utc) + timedelta(hours=10)
+        booking_ids = self.insert(Booking, Booking.booking_id, [{
+            'requested_date': BENCH_DATE,
+            'event_location': 'Bench St',
+            'event_type': BENCH_EVENT,
+            'customer_id': self.customer_id,
+            'number_of_guests': 10,
+            'bid_status': 'Pending',
+            'service_type': 'Catering',
+            'start_time': start,
+            'end_time': start + timedelta(hours=3),
+        } for _ in range(count)])
+        if with_event:
+            self.insert(Calendar, Calendar.event_id, [{
+                'event_date': BENCH_DATE,
+                'event_status': 'Pending',
+                'event_type': BENCH_EVENT,
+                'customer_id': self.customer_id,
+                'booking_id': booking_id,
+            } for booking_id in booking_ids])
+        return booking_ids
+
+    def new_bids(self, model, count):
+        return self.insert(model, model.__table__.primary_key.columns.values()[0], [
+            dict(bid_body(booking_id, self.customer_id), supplies=0) if model is MealPrepBid
+            else bid_body(booking_id, self.customer_id)
+            for booking_id in self.new_bookings(count)
+        ])
+
+    @staticmethod
+    def insert(model, key, rows):
+        if not rows:
+            return []
+        keys = db.session.scalars(insert(model).returning(key), rows).all()
+        db.session.commit()
+        return keys
+
+    @cached_property
+    def customer_id(self):
+        # Owns every booking and bid the benchmark creates
+        return self.new_customers(1)[0]
+
+    @cached_property
+    def idle_customers(self):
+        # No bookings, so they can be deactivated
+        return self.new_customers(20)
+
+    @cached_property
+    def edited_booking(self):
+        # (booking_id, event_id) rewritten over and over by the PUT routes
+        booking_id = self.new_bookings(1, with_event=True)[0]
+        return booking_id, db.session.scalar(select(Calendar.event_id).where(Calendar.booking_id == booking_id))
+
+    @cached_property
+    def meal_prep_bid(self):
+        return self.new_bids(MealPrepBid, 1)[0]
+
+    @cached_property
+    def catering_bid(self):
+        return self.new_bids(CateringBid, 1)[0]
+
+
+def cleanup():
+    # Delete every row a benchmark run created
+    bench_customers = select(Customer.customer_id).where(Customer.email.like('bench-%'))
+    bench_bookings = select(Booking.booking_id).where(
+        or_(Booking.event_type == BENCH_EVENT, Booking.customer_id.in_(bench_customers))
+    )
+    for model in (MealPrepBid, CateringBid):
+        db.session.execute(delete(model).where(
+            or_(model.booking_id.in_(bench_bookings), model.customer_id.in_(bench_customers))
+        ))
+    db.session.execute(delete(Calendar).where(or_(
+        Calendar.event_type == BENCH_EVENT, Calendar.booking_id.in_(bench_bookings), Calendar.customer_id.in_(bench_customers)
+    )))
+    db.session.execute(delete(Booking).where(
+        or_(Booking.event_type == BENCH_EVENT, Booking.customer_id.in_(bench_customers))
+    ))
+    db.session.execute(delete(Customer).where(Customer.email.like('bench-%')))
+    db.session.execute(delete(User).where(User.username == BENCH_USER))
+    db.session.commit()
+
+
+def bid_body(booking_id, customer_id):
+    return {
+        'booking_id': booking_id,
+        'customer_id': customer_id,
+        'bid_status': 'Pending',
+        'miles': 10,
+        'service_fee': 100,
+        'estimated_groceries': 150,
+        'estimated_bid_price': 400,
+        'foods': 'Bench menu',
+    }
+
+
+def booking_body(f):
+    # A slot of its own (four a day from the day after BENCH_DATE), so the overlap check never refuses it
+    slot = next(f.serial)
+    day = BENCH_DATE + timedelta(days=1 + slot // 4)
+    start = datetime.combine(day, datetime.min.time(), timezone.utc) + timedelta(hours=6 * (slot % 4))
+    return {
+        'requested_date': day.isoformat(),
+        'event_location': 'Bench St',
+        'event_type': BENCH_EVENT,
+        'customer_id': f.customer_id,
+        'number_of_guests': 10,
+        'bid_status': 'Pending',
+        'user_id': None,
+        'service_type': 'Catering',
+        'start_time': start.isoformat(),
+        'end_time': (start + timedelta(hours=3)).isoformat(),
+    }
+
+
+def repeat(path):
+    # The same request every time; `path` is formatted with the fixtures as f
+    return lambda f: itertools.repeat((path.format(f=f), None))
+
+
+def calendar_month(path):
+    def requests(f):
+        first, last = f.month
+        return itertools.repeat((f'{path}from={first.isoformat()}&to={last.isoformat()}', None))
+    return requests
+
+
+def create_customers(f):
+    for i in f.serial:
+        yield '/customers', {
+            'name': f'Bench Customer {f.run}-{i}',
+            'email': f'bench-{f.run}-{i}@example.com',
+            'phone_number': '(314)-555-0101',
+        }
+
+
+def update_customer(f):
+    for phone_number in itertools.cycle(['(314)-555-0102', '(314)-555-0103']):
+        yield f'/customers/{f.customer_id}', {'phone_number': phone_number}
+
+
+def toggle_customers(suffix):
+    def requests(f):
+        for customer_id in itertools.cycle(f.idle_customers):
+            yield f'/customers/{customer_id}{suffix}', None
+    return requests
+
+
+def update_bid(model):
+    def requests(f):
+        bid_id = f.meal_prep_bid if model is MealPrepBid else f.catering_bid
+        booking_id = db.session.scalar(select(model.booking_id).where(model.__table__.primary_key.columns.values()[0] == bid_id))
+        path = f'/{model.__tablename__.lower()}/{bid_id}/{f.customer_id}/{booking_id}'
+        for status in itertools.cycle(['Pending', 'Confirmed']):
+            yield path, {'bid_status': status}
+    return requests
+
+
+def create_bids(model):
+    def requests(f):
+        for booking_id in f.new_bookings(f.victims):
+            yield f'/{model.__tablename__.lower()}', bid_body(booking_id, f.customer_id)
+    return requests
+
+
+def delete_bids(model):
+    def requests(f):
+        for bid_id in f.new_bids(model, f.victims):
+            yield f'/{model.__tablename__.lower()}/{bid_id}/{f.customer_id}', None
+    return requests
+
+
+def create_bookings(f):
+    while True:
+        yield '/bookings', booking_body(f)
+
+
+def create_bookings_bulk(f):
+    while True:
+        yield '/bookings/bulk', [booking_body(f) for _ in range(BULK_SIZE)]
+
+
+def update_booking(f):
+    # BENCH_DATE itself: no booking_body() slot is on that day
+    body = dict(booking_body(f), requested_date=BENCH_DATE.isoformat(), start_time='10:00:00', end_time='13:00:00')
+    return itertools.repeat((f'/bookings/{f.edited_booking[0]}', body))
+
+
+def delete_bookings(f):
+    for booking_id in f.new_bookings(f.victims):
+        yield f'/bookings/{booking_id}', None
+
+
+def delete_bookings_bulk(f):
+    booking_ids = f.new_bookings(f.victims, with_event=True)
+    for i in range(0, len(booking_ids), BULK_SIZE):
+        yield '/bookings/bulk_delete', {'booking_ids': booking_ids[i:i + BULK_SIZE]}
+
+
+def delete_bookings_and_calendar(f):
+    for booking_id in f.new_bookings(f.victims, with_event=True):
+        yield f'/bookings_and_calendar/{booking_id}', None
+
+
+def add_calendar_events(f):
+    body = {
+        'event_date': BENCH_DATE.isoformat(),
+        'event_status': 'Pending',
+        'event_type': BENCH_EVENT,
+        'booking_id': f.edited_booking[0],
+        'customer_id': f.customer_id,
+        'start_time': '10:00:00',
+        'end_time': '13:00:00',
+    }
+    return itertools.repeat(('/calendar', body))
+
+
+def update_calendar_event(f):
+    body = {
+        'event_date': BENCH_DATE.isoformat(),
+        'event_status': 'Confirmed',
+        'event_type': BENCH_EVENT,
+        'start_time': '10:00:00',
+        'end_time': '13:00:00',
+    }
+    return itertools.repeat((f'/calendar/{f.edited_booking[1]}', body))
+
+
+def login(f):
+    username, password = f.user
+    return itertools.repeat(('/login', {'username': username, 'password': password}))
+
+
+# Reads first, then writes, so the writes' side effects (cache invalidation, ETag bumps) never skew a read
+ENDPOINTS = [
+    Endpoint('GET', '/customers', repeat('/customers')),
+    Endpoint('GET', '/users', repeat('/users')),
+    Endpoint('GET', '/meal_prep_bids', repeat('/meal_prep_bids')),
+    Endpoint('GET', '/catering_bids', repeat('/catering_bids')),
+    Endpoint('GET', '/bids?limit=50', repeat('/bids?limit=50')),
+    Endpoint('GET', '/bids/summary', repeat('/bids/summary')),
+    Endpoint('GET', '/bookings?limit=50', repeat('/bookings?limit=50')),
+    Endpoint('GET', '/bookings?order=requested_date&limit=50', repeat('/bookings?order=requested_date&limit=50')),
+    Endpoint('GET', '/bookings?customer_id=<id>', repeat('/bookings?customer_id={f.booking.customer_id}')),
+    Endpoint('GET', '/bookings/<booking_id>', repeat('/bookings/{f.booking.booking_id}')),
+    Endpoint('GET', '/calendar?from=&to=', calendar_month('/calendar?')),
+    Endpoint('GET', '/calendar/<booking_id>', repeat('/calendar/{f.booking.booking_id}')),
+    Endpoint('GET', '/availability?from=&to=', calendar_month('/availability?')),
+    Endpoint('GET', '/export/bookings?from=&to=', calendar_month('/export/bookings?')),
+    Endpoint('GET', '/export/bids?format=csv&from=&to=', calendar_month('/export/bids?format=csv&')),
+    Endpoint('GET', '/metrics/pool', repeat('/metrics/pool')),
+    Endpoint('GET', '/metrics/customer_cache', repeat('/metrics/customer_cache')),
+    Endpoint('POST', '/login', login, writes=False),
+
+    Endpoint('POST', '/customers', create_customers, expect=201),
+    Endpoint('PUT', '/customers/<id>', update_customer),
+    Endpoint('PATCH', '/customers/<id>', toggle_customers('')),
+    Endpoint('PATCH', '/customers/<id>/reactivate', toggle_customers('/reactivate')),
+    Endpoint('POST', '/meal_prep_bids', create_bids(MealPrepBid), expect=201),
+    Endpoint('PUT', '/meal_prep_bids/<id>/<customer_id>/<booking_id>', update_bid(MealPrepBid)),
+    Endpoint('DELETE', '/meal_prep_bids/<id>/<customer_id>', delete_bids(MealPrepBid)),
+    Endpoint('POST', '/catering_bids', create_bids(CateringBid), expect=201),
+    Endpoint('PUT', '/catering_bids/<id>/<customer_id>/<booking_id>', update_bid(CateringBid)),
+    Endpoint('DELETE', '/catering_bids/<id>/<customer_id>', delete_bids(CateringBid)),
+    Endpoint('POST', '/bookings', create_bookings, expect=201),
+    Endpoint('POST', '/bookings/bulk', create_bookings_bulk, expect=201),
+    Endpoint('PUT', '/bookings/<booking_id>', update_booking),
+    Endpoint('DELETE', '/bookings/<booking_id>', delete_bookings),
+    Endpoint('POST', '/bookings/bulk_delete', delete_bookings_bulk),
+    Endpoint('POST', '/calendar', add_calendar_events, expect=201),
+    Endpoint('PUT', '/calendar/<event_id>', update_calendar_event),
+    Endpoint('DELETE', '/bookings_and_calendar/<booking_id>', delete_bookings_and_calendar),
+]
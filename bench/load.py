@@ -0,0 +1,111 @@
+"""
+Minimal asyncio HTTP/1.1 load generator: keep-alive clients that send requests
+from a shared iterator as fast as the server answers them.
+"""
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import Counter
+
+
+async def http_request(reader, writer, method, path, body=None, headers=None):
+    # (status, whether the server keeps the connection open); sync gunicorn workers always close it
+    head = f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n'
+    head += ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+    payload = b''
+    if body is not None:
+        payload = json.dumps(body).encode()
+        head += f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+    writer.write(head.encode() + b'\r\n' + payload)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('server closed the connection')
+    length, chunked, keep_alive = None, False, True
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding':
+            chunked = 'chunked' in value
+        elif name == 'connection':
+            keep_alive = value != 'close'
+
+    if chunked:
+        # Streamed responses (the /export routes)
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        while (await reader.readline()) not in (b'\r\n', b''):
+            pass
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()  # Body runs until the server closes the connection
+        keep_alive = False
+    return int(status_line.split()[1]), keep_alive
+
+
+async def drive(port, method, requests, concurrency, duration, headers=None):
+    """
+    Send `method` requests (with `headers`) for the (path, JSON body or None)
+    pairs from `requests` over `concurrency` keep-alive connections until
+    `duration` seconds have passed or the iterator runs out. Returns (latencies in
+    seconds, Counter of statuses, connection errors, elapsed seconds).
+    """
+    latencies, statuses, errors = [], Counter(), 0
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def client():
+        nonlocal errors
+        connection, pending = None, None
+        while time.perf_counter() < deadline:
+            if pending is None:
+                pending = next(requests, None)
+                if pending is None:
+                    break
+            request_started = time.perf_counter()
+            reused = connection is not None
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection('127.0.0.1', port)
+                status, keep_alive = await http_request(*connection, method, *pending, headers=headers)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                # An idle keep-alive connection closed by a recycling worker is retried, as browsers do
+                if not (reused and isinstance(e, ConnectionError)):
+                    errors += 1
+                    pending = None
+                connection = None
+                continue
+            latencies.append(time.perf_counter() - request_started)
+            statuses[status] += 1
+            pending = None
+            if not keep_alive:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, statuses, errors, time.perf_counter() - started
+
+
+def percentile(ordered, p):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 1))
+            return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit(f'server on port {port} did not start')
@@ -0,0 +1,86 @@
+"""
+Turn raw load samples into per-endpoint stats, save them as JSON and compare
+a run against a stored baseline.
+"""
+import json
+import os
+
+from .load import percentile
+
+# A latency increase smaller than this is noise however large it is in percent
+LATENCY_FLOOR_MS = 1.0
+# With fewer requests than this p95 is a handful of samples; slow routes are judged on p50 instead
+MIN_P95_SAMPLES = 200
+
+
+def summarize(latencies, statuses, connection_errors, elapsed, expect, queries):
+    latencies = sorted(latencies)
+    errors = connection_errors + sum(n for status, n in statuses.items() if status != expect)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries_per_request': queries,
+    }
+
+
+def print_table(results):
+    print(f"{'endpoint':58} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7} {'errors':>6}")
+    for name, stats in results['endpoints'].items():
+        print(f"{name:58} {stats['throughput_rps']:8.1f} {stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} "
+              f"{stats['p99_ms']:8.1f} {stats['queries_per_request']:7} {stats['errors']:6}")
+
+
+def save(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print each endpoint's change against the baseline and return the names
+    of the endpoints that regressed: more queries per request, errors where
+    there were none, or throughput / latency (p95, or p50 for endpoints with
+    fewer than MIN_P95_SAMPLES requests) worse by more than `tolerance` (a
+    fraction). Throughput and latency are only comparable between runs on
+    the same machine with the same options.
+    """
+    regressions = []
+    print(f"{'endpoint':58} {'req/s':>16} {'p95 ms':>16} {'queries':>9}")
+    for name, stats in results['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            print(f'{name:58} (not in baseline)')
+            continue
+        problems = []
+        if stats['queries_per_request'] > base['queries_per_request']:
+            problems.append('queries')
+        if stats['errors'] and not base['errors']:
+            problems.append('errors')
+        if stats['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            problems.append('throughput')
+        latency = 'p95_ms' if min(stats['requests'], base['requests']) >= MIN_P95_SAMPLES else 'p50_ms'
+        if stats[latency] > base[latency] * (1 + tolerance) and stats[latency] - base[latency] > LATENCY_FLOOR_MS:
+            problems.append(latency[:3])
+        if problems:
+            regressions.append(name)
+        print(f"{name:58} {base['throughput_rps']:7.1f} {change(stats['throughput_rps'], base['throughput_rps'])} "
+              f"{base['p95_ms']:7.1f} {change(stats['p95_ms'], base['p95_ms'])} "
+              f"{base['queries_per_request']:>4}->{stats['queries_per_request']:<3}"
+              + (f"  REGRESSED ({', '.join(problems)})" if problems else ''))
+    return regressions
+
+
+def change(value, base):
+    return f'{(value - base) / base * 100:+7.1f}%' if base else '     n/a'
@@ -0,0 +1,140 @@
+"""
+Seed data for the benchmarks and the query plan check: tops each table up to a
+row count with deterministic (random.Random(0)) synthetic rows. Only point it
+at a throwaway database, never at Supabase.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import BigInteger, func, insert, select, text
+from sqlalchemy.ext.compiler import compiles
+
+from my_app import db
+from my_app.models import Booking, Calendar, CateringBid, Customer, MealPrepBid, User
+
+SEED_BATCH = 10000
+BID_STATUSES = ['Pending', 'Confirmed', 'Completed', 'Cancelled']
+SERVICE_TYPES = ['Catering', 'Meal_Prep']
+
+# Row counts seed() accepts per table (keyword arguments)
+VOLUMES = ('customers', 'users', 'bookings', 'calendar', 'meal_prep_bids', 'catering_bids')
+
+
+def create_sqlite_schema():
+    # SQLite stand-in: build the tables from the models (Postgres gets them from the migrations)
+    if db.engine.dialect.name != 'sqlite':
+        return
+
+    # Registered here, not at import, so tools that only import this module (check_query_plans.py)
+    # keep the stock BigInteger; this process only ever talks to the SQLite file from now on
+    @compiles(BigInteger, 'sqlite')
+    def sqlite_big_integer(type_, compiler, **kw):
+        # SQLite only assigns ids to INTEGER PRIMARY KEY columns; BIGINT keys would stay NULL
+        return 'INTEGER'
+
+    db.create_all()
+
+
+def count(model):
+    return db.session.scalar(select(func.count()).select_from(model))
+
+
+def seed_table(model, target, make_row):
+    if db.engine.dialect.name == 'postgresql':
+        # Restored dumps can leave the id sequence behind the existing rows
+        pk = model.__table__.primary_key.columns.values()[0]
+        db.session.execute(
+            text(f"SELECT setval(pg_get_serial_sequence(:table, :column), coalesce(max({pk.name}), 0) + 1, false) "
+                 f'FROM "{model.__tablename__}"'),
+            {'table': f'"{model.__tablename__}"', 'column': pk.name}
+        )
+    missing = target - count(model)
+    for start in range(0, max(missing, 0), SEED_BATCH):
+        rows = [make_row(start + i) for i in range(min(SEED_BATCH, missing - start))]
+        db.session.execute(insert(model.__table__), rows)
+        db.session.commit()
+    print(f'{model.__tablename__}: {count(model)} rows')
+
+
+def seed(target=0, **volumes):
+    """
+    Top every table up to `target` rows, or to the VOLUMES keyword given for
+    it (seed(10000, calendar=500)). Bids go to bookings that have no bid of
+    that type yet, so each bid table is capped at the number of bookings.
+    """
+    unknown = set(volumes) - set(VOLUMES)
+    if unknown:
+        raise TypeError(f'unknown seed volumes: {", ".join(sorted(unknown))}')
+
+    rng = random.Random(0)
+    run = datetime.now().strftime('%Y%m%d%H%M%S')
+    base = date(2024, 1, 1)
+
+    seed_table(Customer, volumes.get('customers', target), lambda i: {
+        'name': f'Seed Customer {run}-{i}',
+        'email': f'seed-{run}-{i}@example.com',
+        'phone_number': '(314)-555-0100',
+        'is_active': i % 10 != 0,
+    })
+    seed_table(User, volumes.get('users', target), lambda i: {
+        'username': f'seed-{run}-{i}',
+        'password': 'seed',
+        'email': f'seed-user-{run}-{i}@example.com',
+    })
+    customer_ids = db.session.scalars(select(Customer.customer_id)).all()
+
+    def booking_row(i):
+        day = base + timedelta(days=rng.randrange(730))
+        start = datetime.combine(day, datetime.min.time(), timezone.utc) + timedelta(hours=rng.randrange(8, 18))
+        return {
+            'requested_date': day,
+            'event_location': f'{i} Market St',
+            'event_type': 'Seeded event',
+            'customer_id': rng.choice(customer_ids),
+            'number_of_guests': rng.randrange(1, 200),
+            'bid_status': rng.choice(BID_STATUSES),
+            'service_type': rng.choice(SERVICE_TYPES),
+            'start_time': start,
+            'end_time': start + timedelta(hours=3),
+        }
+    if customer_ids:
+        seed_table(Booking, volumes.get('bookings', target), booking_row)
+    bookings = db.session.execute(select(Booking.booking_id, Booking.customer_id, Booking.requested_date)).all()
+    if not bookings:
+        db.session.commit()
+        return
+
+    def calendar_row(i):
+        booking = bookings[i % len(bookings)]
+        return {
+            'event_date': booking.requested_date,
+            'event_status': 'Pending',
+            'event_type': 'Seeded event',
+            'customer_id': booking.customer_id,
+            'booking_id': booking.booking_id,
+        }
+    seed_table(Calendar, volumes.get('calendar', target), calendar_row)
+
+    def seed_bids(model, target, extra):
+        # One bid per booking and table (_booking_customer_uc)
+        taken = set(db.session.scalars(select(model.booking_id)))
+        free = [booking for booking in bookings if booking.booking_id not in taken]
+
+        def bid_row(i):
+            booking = free[i]
+            return dict(extra, **{
+                'created_at': datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=rng.randrange(1000000)),
+                'bid_status': rng.choice(BID_STATUSES),
+                'miles': rng.randrange(50),
+                'service_fee': rng.randrange(50, 500),
+                'estimated_groceries': rng.randrange(50, 500),
+                'estimated_bid_price': rng.randrange(100, 1500),
+                'booking_id': booking.booking_id,
+                'customer_id': booking.customer_id,
+            })
+        seed_table(model, min(target, len(taken) + len(free)), bid_row)
+    seed_bids(MealPrepBid, volumes.get('meal_prep_bids', target), {'supplies': 0})
+    seed_bids(CateringBid, volumes.get('catering_bids', target), {})
+
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
@@ -0,0 +1,116 @@
+"""
+Gunicorn settings for the Procfile (`gunicorn -c gunicorn.conf.py`).
+
+Pick a worker model with GUNICORN_PROFILE:
+
+    sync     one request at a time per process; 2 x CPU + 1 processes
+    gthread  CPU processes x one thread per pooled DB connection (default)
+    gevent   CPU processes, each serving many requests on greenlets; psycopg2 is
+             made cooperative with psycogreen
+    async    my_app.asgi on uvicorn workers (see my_app/asgi.py)
+
+WEB_CONCURRENCY and GUNICORN_THREADS override the computed process / thread
+counts. Threads and greenlets are sized from DB_POOL_SIZE + DB_MAX_OVERFLOW
+so a request never queues for a connection inside the worker; keep
+processes x that sum under the database's connection limit.
+scripts/bench_profiles.py compares the profiles under load. Workers share
+GET /metrics through METRICS_DIR, a fresh temporary directory unless set.
+"""
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Same defaults as my_app/config.py; read from the environment so the master never imports the app
+DB_CONNECTIONS = int(os.getenv("DB_POOL_SIZE", 5)) + int(os.getenv("DB_MAX_OVERFLOW", 5))
+CPUS = multiprocessing.cpu_count()
+
+PROFILES = {
+    'sync': {
+        'worker_class': 'sync',
+        'workers': 2 * CPUS + 1,
+        'preload_app': True,
+    },
+    'gthread': {
+        'worker_class': 'gthread',
+        'workers': max(2, CPUS),
+        'threads': DB_CONNECTIONS,
+        'preload_app': True,
+    },
+    'gevent': {
+        'worker_class': 'gevent',
+        'workers': max(2, CPUS),
+        'worker_connections': 2 * DB_CONNECTIONS,  # Past this, greenlets would only wait on the pool
+        'preload_app': False,  # The app must be imported after gevent monkey-patches the worker
+    },
+    'async': {
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'workers': max(2, CPUS),
+        'wsgi_app': 'my_app.asgi:create_asgi_app()',
+        'preload_app': True,
+    },
+}
+
+# Workers add up each other's request metrics from files here (my_app/metrics.py).
+# Set before the app is imported, so preloaded and per-worker apps alike see it.
+metrics_dir_created = "METRICS_DIR" not in os.environ
+if metrics_dir_created:
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="my_app_metrics_")
+metrics_dir = os.environ["METRICS_DIR"]
+
+# The served app refuses to start on a database the release step has not migrated (my_app/database.py)
+os.environ.setdefault("DB_REQUIRE_MIGRATED", "true")
+
+profile_name = os.getenv("GUNICORN_PROFILE", "gthread")
+if profile_name not in PROFILES:
+    raise RuntimeError(f"GUNICORN_PROFILE must be one of: {', '.join(PROFILES)}")
+profile = PROFILES[profile_name]
+
+wsgi_app = profile.get('wsgi_app', 'my_app:create_app()')
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = profile['worker_class']
+workers = int(os.getenv("WEB_CONCURRENCY", profile['workers']))
+threads = int(os.getenv("GUNICORN_THREADS", profile.get('threads', 1)))
+worker_connections = profile.get('worker_connections', 1000)
+preload_app = profile['preload_app']
+
+timeout = 120
+graceful_timeout = 30
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))  # Seconds; ignored by sync workers
+
+# Recycle workers now and then, staggered so they never all restart at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+
+def when_ready(server):
+    server.log.info(
+        "Profile %s: %s workers x %s, up to %s DB connections",
+        profile_name, workers, worker_class, workers * DB_CONNECTIONS
+    )
+
+
+def on_starting(server):
+    # Files left in a configured METRICS_DIR by an earlier server would be counted as this one's
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def on_exit(server):
+    if metrics_dir_created:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # A preloaded app's pooled connections were opened by the master; never reuse them in a worker
+    if preload_app:
+        from my_app.database import dispose_engines
+        dispose_engines()
+
+
+def post_worker_init(worker):
+    if worker_class == 'gevent':
+        # psycopg2 blocks the whole process unless it yields to the gevent hub while waiting
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
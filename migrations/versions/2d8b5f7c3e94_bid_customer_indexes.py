@@ -0,0 +1,35 @@
+"""Indexes for GET /bids and /bids/summary filtered by customer
+
+Revision ID: 2d8b5f7c3e94
+Revises: 9a6f4b1d8e52
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8b5f7c3e94'
+down_revision = '9a6f4b1d8e52'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns): the customer's bids in GET /bids keyset order
+INDEXES = [
+    ('ix_meal_prep_bids_customer_id_created_at', 'Meal_Prep_Bids', ['customer_id', 'created_at', 'meal_bid_id']),
+    ('ix_catering_bids_customer_id_created_at', 'Catering_Bids', ['customer_id', 'created_at', 'catering_bid_id']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY keeps the tables writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
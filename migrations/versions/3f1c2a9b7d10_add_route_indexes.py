@@ -0,0 +1,69 @@
+"""Add indexes matching the routes' access patterns and the Table_Versions table
+
+Revision ID: 3f1c2a9b7d10
+Revises: 
+Create Date: 2026-10-17 17:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial-index predicate)
+INDEXES = [
+    # GET /bookings keyset pages and filters
+    ('ix_bookings_requested_date_booking_id', 'Bookings', ['requested_date', 'booking_id'], None),
+    ('ix_bookings_customer_id_booking_id', 'Bookings', ['customer_id', 'booking_id'], None),
+    ('ix_bookings_bid_status_booking_id', 'Bookings', ['bid_status', 'booking_id'], None),
+    ('ix_bookings_service_type_booking_id', 'Bookings', ['service_type', 'booking_id'], None),
+    # GET /calendar date window; per-booking event lookups
+    ('ix_calendar_event_date_event_id', 'Calendar', ['event_date', 'event_id'], None),
+    ('ix_calendar_booking_id', 'Calendar', ['booking_id'], None),
+    # One-bid-per-booking checks and GET /bids keyset pages
+    ('ix_meal_prep_bids_booking_id', 'Meal_Prep_Bids', ['booking_id'], None),
+    ('ix_meal_prep_bids_created_at_meal_bid_id', 'Meal_Prep_Bids', ['created_at', 'meal_bid_id'], None),
+    ('ix_catering_bids_booking_id', 'Catering_Bids', ['booking_id'], None),
+    ('ix_catering_bids_created_at_catering_bid_id', 'Catering_Bids', ['created_at', 'catering_bid_id'], None),
+    # Customer name lookups; active customers only
+    ('ix_customers_name', 'Customers', ['name'], None),
+    ('ix_customers_active', 'Customers', ['customer_id'], 'is_active'),
+    # Login
+    ('ix_user_username', 'User', ['username'], None),
+]
+
+
+def upgrade():
+    # Databases bootstrapped with db.create_all() may already have the table
+    if not sa.inspect(op.get_bind()).has_table('Table_Versions'):
+        op.create_table(
+            'Table_Versions',
+            sa.Column('table_name', sa.String(), nullable=False),
+            sa.Column('version', sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint('table_name')
+        )
+
+    # CONCURRENTLY keeps the tables writable while the indexes build; it cannot
+    # run inside a transaction, hence the autocommit block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+    op.drop_table('Table_Versions')
@@ -0,0 +1,36 @@
+"""Revoked_Tokens: access tokens revoked before they expire
+
+Revision ID: 5b7e9d3c2a41
+Revises: 8c4d2e6f1a37
+Create Date: 2026-10-17 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e9d3c2a41'
+down_revision = '8c4d2e6f1a37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped with db.create_all() may already have the table
+    if sa.inspect(op.get_bind()).has_table('Revoked_Tokens'):
+        return
+    op.create_table(
+        'Revoked_Tokens',
+        sa.Column('jti', sa.String(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('jti')
+    )
+    # Expired rows are pruned on every revocation
+    op.create_index('ix_revoked_tokens_expires_at', 'Revoked_Tokens', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='Revoked_Tokens')
+    op.drop_table('Revoked_Tokens')
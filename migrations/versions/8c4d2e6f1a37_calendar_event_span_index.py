@@ -0,0 +1,50 @@
+"""GiST index on calendar event spans for availability and overlap checks
+
+Revision ID: 8c4d2e6f1a37
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e6f1a37'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+# Wall-clock span of a timed calendar event: times are stored in the business timezone
+# (services.CALENDAR_TZ), an end at or before the start runs past midnight, and an event
+# missing either time has no span
+SPAN_FUNCTION = """
+CREATE OR REPLACE FUNCTION calendar_event_span(event_date date, start_time timetz, end_time timetz)
+RETURNS tsrange LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE WHEN start_time IS NULL OR end_time IS NULL THEN NULL ELSE tsrange(
+        event_date + start_time::time,
+        event_date + end_time::time + CASE WHEN end_time::time <= start_time::time
+                                           THEN interval '1 day' ELSE interval '0' END,
+        '[)') END
+$$
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return  # Elsewhere availability.py narrows by event_date instead
+    op.execute(SPAN_FUNCTION)
+    # CONCURRENTLY keeps Calendar writable while the index builds
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calendar_event_span ON "Calendar" '
+            'USING gist (calendar_event_span(event_date, start_time, end_time))'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_calendar_event_span')
+    op.execute('DROP FUNCTION IF EXISTS calendar_event_span(date, timetz, timetz)')
@@ -0,0 +1,40 @@
+"""Idempotency_Keys: stored responses for retried POST requests
+
+Revision ID: 9a6f4b1d8e52
+Revises: 5b7e9d3c2a41
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6f4b1d8e52'
+down_revision = '5b7e9d3c2a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped with db.create_all() may already have the table
+    if sa.inspect(op.get_bind()).has_table('Idempotency_Keys'):
+        return
+    op.create_table(
+        'Idempotency_Keys',
+        sa.Column('key', sa.LargeBinary(), nullable=False),
+        sa.Column('fingerprint', sa.LargeBinary(), nullable=False),
+        sa.Column('status_code', sa.SmallInteger(), nullable=True),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('body', sa.LargeBinary(), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+    # Expired rows are pruned as new responses are stored
+    op.create_index('ix_idempotency_keys_expires_at', 'Idempotency_Keys', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='Idempotency_Keys')
+    op.drop_table('Idempotency_Keys')
@@ -1,7 +1,11 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS  # Import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .config import Config
+from .database import check_migrations_applied, engine_options, dispose_after_fork
+from .logs import configure_logging
+from .serializers import FastJSONProvider
 import os
 from dotenv import load_dotenv  # Import load_dotenv
 
@@ -10,34 +14,78 @@ load_dotenv()
 
 db = SQLAlchemy()
 
+
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)  # orjson-backed jsonify() when orjson is installed
 
     # Set the secret key from environment variables or fallback for development
     app.secret_key = os.getenv('SECRET_KEY', 'fallback-dev-secret-key')  # Use a secure key in production
 
     # Use DATABASE_URL from environment variables for SQLAlchemy connection
+    app.config.from_object(Config)
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'connect_args': {
-            'sslmode': 'require'  # Include SSL mode if necessary
-        }
-    }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    configure_logging(app)
 
     db.init_app(app)
 
-    # Enable CORS for your frontend origin
+    # Enable CORS for your frontend origin (CORS_* on Config)
     CORS(app, resources={r"/*": {
-    "origins": "http://localhost:5173",  # Update this with your frontend's URL if different
-    "methods": ["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],  # Add PATCH method here
-    "allow_headers": ["Content-Type"]
+    "origins": app.config['CORS_ORIGINS'],
+    "methods": app.config['CORS_METHODS'],
+    "allow_headers": app.config['CORS_ALLOW_HEADERS'],
+    "expose_headers": app.config['CORS_EXPOSE_HEADERS'],
+    "max_age": app.config['CORS_MAX_AGE']
 }})
 
+    from .customer_cache import customer_cache
+    customer_cache.init_app(app)
+
+    from .passwords import passwords
+    passwords.init_app(app)
+
+    from .query_stats import query_stats
+    query_stats.init_app(app)
+
+    from .metrics import metrics
+    metrics.init_app(app)
+
+    # After the metrics hooks: a 401 from its before_request still counts as a request
+    from .auth import tokens
+    tokens.init_app(app)
+
+    from .routes import main  # Import the main blueprint
+    app.register_blueprint(main)  # Register the main blueprint
+
+    # Outermost first: preflights are answered before anything is compressed or routed
+    from .middleware import Compression, CorsPreflight
+    if app.config['COMPRESS']:
+        app.wsgi_app = Compression(
+            app.wsgi_app,
+            min_size=app.config['COMPRESS_MIN_SIZE'],
+            level=app.config['COMPRESS_LEVEL'],
+            brotli_quality=app.config['COMPRESS_BROTLI_QUALITY'],
+        )
+    if app.config['CORS_PREFLIGHT_MIDDLEWARE']:
+        app.wsgi_app = CorsPreflight(
+            app.wsgi_app,
+            origins=app.config['CORS_ORIGINS'],
+            methods=app.config['CORS_METHODS'],
+            allow_headers=app.config['CORS_ALLOW_HEADERS'],
+            max_age=app.config['CORS_MAX_AGE'],
+        )
+
+    # The real client address (login throttling, logs) and scheme behind the router
+    if app.config['PROXY_HOPS']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_HOPS'], x_proto=app.config['PROXY_HOPS'])
+
     with app.app_context():
-        from . import routes  # Import routes module
-        from .routes import main  # Import the main blueprint
-        app.register_blueprint(main)  # Register the main blueprint
-        db.create_all()  # Create database tables if necessary
-    
+        if app.config['DB_CREATE_ALL']:
+            db.create_all()  # Local databases only; production schema comes from Alembic migrations
+        elif app.config['DB_REQUIRE_MIGRATED']:
+            check_migrations_applied(db.engine, os.path.join(os.path.dirname(app.root_path), 'migrations'))
+        dispose_after_fork(list(db.engines.values()))
+
     return app
@@ -0,0 +1,210 @@
+"""
+Optional async deployment: serve the API from an ASGI server.
+
+    gunicorn -k uvicorn.workers.UvicornWorker --timeout 120 "my_app.asgi:create_asgi_app()"
+
+The polled list endpoints (ASYNC_ROUTES) run as async handlers over an
+asyncpg engine, so one worker keeps many of them in flight while it waits on
+the database. They build their SQL with the same listings / schemas / etags
+helpers as the Flask routes, so responses, cursors and ETags are identical.
+They count towards GET /metrics and check access tokens like the Flask
+routes. Every other request (writes, OPTIONS preflights, exports, metrics)
+goes to the regular Flask app in a thread pool sized to the sync
+connection pool.
+"""
+import logging
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import anyio
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from . import create_app
+from .auth import tokens
+from .database import async_engine_options, async_engine_url
+from .etags import etag_for, versions_select
+from .listings import bids_page, bookings_page, calendar_select, full_select
+from .logs import access_logger
+from .metrics import metrics
+from .schemas import CATERING_BID_LIST, CUSTOMER_LIST, MEAL_PREP_BID_LIST, USER_LIST
+from .serializers import UnknownField
+
+
+def invalid_parameter(error):
+    return f'Invalid query parameter: {str(error)}'
+
+
+def full_listing(schema):
+    # Unpaginated listing: every row; ?fields= only
+    def build(args):
+        statement, narrowed = full_select(schema, args)
+        return statement, lambda rows: (narrowed.dump(rows), None)
+    return build
+
+
+def keyset_listing(build_page):
+    def build(args):
+        page = build_page(args)
+        return page.statement, page.result
+    return build
+
+
+def calendar_listing(args):
+    statement, schema = calendar_select(args)
+    return statement, lambda rows: (schema.dump(rows), None)
+
+
+class AsyncListing:
+    """
+    Async twin of a Flask list route. `tables` are the route's conditional_get
+    tables (empty for routes without an ETag). build(args) returns the
+    statement plus a function turning its rows into (items, next cursor), and
+    raises ValueError (IndexError / TypeError for bad cursors) on bad input.
+    """
+
+    def __init__(self, path, tables, build, error_message=invalid_parameter):
+        self.path = path
+        self.tables = tables
+        self.build = build
+        self.error_message = error_message
+
+    async def handle(self, request):
+        # Same request metrics as the Flask hooks (metrics.init_app); the event loop thread has its own file
+        started = time.perf_counter()
+        metrics.request_started()
+        status = 500
+        try:
+            response = await self.respond(request, started)
+            status = response.status_code
+            return response
+        finally:
+            metrics.request_finished(request.method, self.path, status, time.perf_counter() - started)
+
+    async def respond(self, request, started):
+        state = request.app.state
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+        # Same token check as the Flask before_request hook (auth.py); none of these routes is public.
+        # Until this worker's denylist has loaded the check can wait on it, so it runs off the event loop
+        header = request.headers.get('Authorization')
+        if header and not tokens.denylist_loaded:
+            auth, error = await anyio.to_thread.run_sync(tokens.authenticate, header)
+        else:
+            auth, error = tokens.authenticate(header)
+        if error is None and auth is None and tokens.required:
+            error = 'Authentication required.'
+        if error:
+            response = JSONResponse({'error': error}, status_code=401, headers={'WWW-Authenticate': 'Bearer'})
+            return self.finish(response, request, request_id, started)
+
+        async with state.engine.connect() as connection:
+            etag = None
+            if self.tables:
+                versions = dict((await connection.execute(versions_select(self.tables))).all())
+                etag = etag_for(versions, self.tables, f'{request.url.path}?{request.url.query}')
+            if etag and if_none_match(request, etag):
+                response = Response(status_code=304)
+            else:
+                try:
+                    statement, finish = self.build(request.query_params)
+                except (ValueError, IndexError, TypeError) as e:
+                    return self.finish(JSONResponse({'error': self.error_message(e)}, status_code=400), request, request_id, started)
+                items, next_cursor = finish((await connection.execute(statement)).all())
+                response = Response(state.json.dumps(items), media_type='application/json')
+                if next_cursor:
+                    response.headers['X-Next-Cursor'] = next_cursor
+        if etag:
+            response.headers['ETag'] = f'"{etag}"'
+            response.headers['Cache-Control'] = 'no-cache'  # Always revalidate, never serve stale
+        return self.finish(response, request, request_id, started)
+
+    def finish(self, response, request, request_id, started):
+        # Same X-Request-ID echo and access log line as the Flask app (logs.configure_logging)
+        response.headers['X-Request-ID'] = request_id
+        sample_rate = request.app.state.log_sample_rate
+        if access_logger.isEnabledFor(logging.INFO) and (sample_rate >= 1 or random.random() < sample_rate):
+            access_logger.info('%s %s %s', request.method, request.url.path, response.status_code, extra={
+                'request_id': request_id,
+                'method': request.method,
+                'path': request.url.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            })
+        return response
+
+
+def if_none_match(request, etag):
+    # Whether the client's If-None-Match already names `etag` (weak or strong, or *)
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/').strip('"') == etag:
+            return True
+    return False
+
+
+ASYNC_ROUTES = [
+    AsyncListing('/customers', ('Customers',), full_listing(CUSTOMER_LIST)),
+    AsyncListing('/users', (), full_listing(USER_LIST)),
+    AsyncListing('/meal_prep_bids', ('Meal_Prep_Bids',), full_listing(MEAL_PREP_BID_LIST)),
+    AsyncListing('/catering_bids', ('Catering_Bids',), full_listing(CATERING_BID_LIST)),
+    AsyncListing('/bookings', ('Bookings',), keyset_listing(bookings_page)),
+    AsyncListing('/bids', ('Meal_Prep_Bids', 'Catering_Bids'), keyset_listing(bids_page)),
+    AsyncListing('/calendar', ('Calendar', 'Customers'), calendar_listing,
+                 error_message=lambda e: invalid_parameter(e) if isinstance(e, UnknownField) else 'Invalid date format. Use YYYY-MM-DD.'),
+]
+ASYNC_PATHS = {listing.path for listing in ASYNC_ROUTES}
+
+
+def create_asgi_app():
+    flask_app = create_app()
+    config = flask_app.config
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Created per worker process, after any fork
+        app.state.engine = create_async_engine(async_engine_url(config), **async_engine_options(config))
+        await anyio.to_thread.run_sync(tokens.load_denylist)
+        yield
+        await app.state.engine.dispose()
+
+    async_app = Starlette(
+        routes=[Route(listing.path, listing.handle, methods=['GET', 'HEAD']) for listing in ASYNC_ROUTES],
+        middleware=[Middleware(
+            CORSMiddleware,
+            allow_origins=config['CORS_ORIGINS'],
+            allow_methods=config['CORS_METHODS'],
+            allow_headers=config['CORS_ALLOW_HEADERS'],
+            expose_headers=config['CORS_EXPOSE_HEADERS'],
+            max_age=config['CORS_MAX_AGE'],
+        )] + ([Middleware(
+            GZipMiddleware,
+            minimum_size=config['COMPRESS_MIN_SIZE'],
+            compresslevel=config['COMPRESS_LEVEL'],
+        )] if config['COMPRESS'] else []),
+        lifespan=lifespan,
+    )
+    async_app.state.json = flask_app.json
+    async_app.state.log_sample_rate = config['LOG_SAMPLE_RATE']
+
+    # One thread per sync connection, so a thread never waits on the pool
+    wsgi_app = WSGIMiddleware(flask_app, workers=config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW'])
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http' or (scope['method'] in ('GET', 'HEAD') and scope['path'] in ASYNC_PATHS):
+            await async_app(scope, receive, send)
+        else:
+            await wsgi_app(scope, receive, send)
+
+    return app
@@ -0,0 +1,239 @@
+import logging
+import os
+import secrets
+import select
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.pool import NullPool
+
+from . import db
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'token_revocations'
+LISTEN_RETRY_SECONDS = 5
+DENYLIST_WAIT_SECONDS = 5  # How long the first check in a worker waits for the denylist to load
+TOKEN_SALT = 'access-token'
+STAFF = 'staff'  # Role of every User today; the claim leaves room for finer roles
+
+AuthToken = namedtuple('AuthToken', ['user_id', 'role', 'jti', 'expires_at'])
+
+
+class TokenAuth:
+    """
+    Stateless access tokens: POST /login signs {user id, role, token id} with
+    SECRET_KEY (itsdangerous, HMAC-SHA1, timestamped), and a before_request
+    hook verifies the Authorization: Bearer header and sets g.auth. A check is
+    an HMAC and a dict lookup; it never touches the database.
+
+    Key rotation: tokens are signed with SECRET_KEY and verified with it or
+    any of SECRET_KEY_FALLBACKS, so a new key can be rolled out while tokens
+    signed with the old one run out (AUTH_TOKEN_TTL).
+
+    Revocation: POST /logout stores the token id in Revoked_Tokens until the
+    token would have expired, with a NOTIFY in the same transaction. Each
+    worker holds the unexpired ids in memory, kept current by a thread that
+    LISTENs and reloads the table whenever it (re)connects, or that re-reads
+    the table every AUTH_DENYLIST_REFRESH seconds where LISTEN is not
+    available (SQLite, PgBouncer without DB_LISTEN_URL).
+
+    With AUTH_REQUIRED off (the default) a request without a token still goes
+    through with g.auth None; a bad, expired or revoked token is always 401.
+    """
+
+    def __init__(self):
+        self.serializer = None
+        self.ttl = 3600
+        self.required = False
+        self.public_endpoints = set()
+        self.url = None
+        self.listen = False
+        self.refresh = 30
+        self.connect_args = {}
+        self._sync_pid = None
+        self._reset()
+        # The denylist thread does not survive fork (gunicorn --preload)
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._revoked = {}  # token id -> expiry (epoch seconds)
+        self._loaded = threading.Event()
+
+    def init_app(self, app):
+        config = app.config
+        # itsdangerous signs with the last key and accepts any of them
+        self.serializer = URLSafeTimedSerializer([*config['SECRET_KEY_FALLBACKS'], app.secret_key], salt=TOKEN_SALT)
+        self.ttl = config['AUTH_TOKEN_TTL']
+        self.required = config['AUTH_REQUIRED']
+        self.public_endpoints = set(config['AUTH_PUBLIC_ENDPOINTS'])
+        self.refresh = config['AUTH_DENYLIST_REFRESH']
+        uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+        self.url = uri or None
+        # LISTEN needs a session-level connection, which PgBouncer transaction pooling cannot give
+        self.listen = uri.startswith('postgres') and (bool(config['DB_LISTEN_URL']) or not config['DB_PGBOUNCER'])
+        if self.listen and config['DB_LISTEN_URL']:
+            self.url = config['DB_LISTEN_URL']
+        if uri.startswith('postgres') and config.get('DB_SSLMODE'):
+            self.connect_args = {'sslmode': config['DB_SSLMODE']}
+
+        @app.before_request
+        def authenticate_request():
+            if request.method == 'OPTIONS':
+                return None  # CORS preflights carry no credentials
+            g.auth, error = self.authenticate(request.headers.get('Authorization'))
+            if error is None and g.auth is None and self.required and request.endpoint not in self.public_endpoints:
+                error = 'Authentication required.'
+            if error:
+                return jsonify({'error': error}), 401, {'WWW-Authenticate': 'Bearer'}
+            return None
+
+    def issue(self, user):
+        # (token, seconds until it expires) for a user who just logged in
+        token = self.serializer.dumps({'uid': user.user_id, 'role': STAFF, 'jti': secrets.token_urlsafe(12)})
+        return token, self.ttl
+
+    def authenticate(self, header):
+        # (AuthToken or None, error message or None) for an Authorization header value
+        if not header:
+            return None, None
+        scheme, _, token = header.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return None, 'Expected an Authorization: Bearer token.'
+        try:
+            claims, issued = self.serializer.loads(token.strip(), max_age=self.ttl, return_timestamp=True)
+        except SignatureExpired:
+            return None, 'Token expired.'
+        except BadSignature:
+            return None, 'Invalid token.'
+        self._ensure_denylist()
+        if claims['jti'] in self._revoked:
+            return None, 'Token revoked.'
+        return AuthToken(claims['uid'], claims['role'], claims['jti'], issued.timestamp() + self.ttl), None
+
+    def revoke(self, auth):
+        """
+        Revoke a token for every worker until it expires. Commits the session;
+        this worker stops accepting the token at once, the others as soon as
+        the NOTIFY (or their next reload) arrives.
+        """
+        expires_at = datetime.fromtimestamp(auth.expires_at, timezone.utc)
+        db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.now(timezone.utc)))
+        db.session.execute(insert(RevokedToken).values(jti=auth.jti, user_id=auth.user_id, expires_at=expires_at))
+        connection = db.session.connection()
+        if connection.dialect.name == 'postgresql':
+            # NOTIFY is transactional: other workers only hear about it if the revocation commits
+            connection.execute(db.select(db.func.pg_notify(NOTIFY_CHANNEL, f'{auth.jti} {auth.expires_at}')))
+        db.session.commit()
+        self._add({auth.jti: auth.expires_at})
+
+    def status(self):
+        # Denylist state for GET /metrics/auth
+        with self._lock:
+            return {
+                'required': self.required,
+                'ttl': self.ttl,
+                'revoked': len(self._revoked),
+                'loaded': self._loaded.is_set(),
+                'listening': self.listen and self._sync_pid == os.getpid(),
+            }
+
+    # Denylist
+
+    @property
+    def denylist_loaded(self):
+        # Whether authenticate() can run without waiting for this worker's first denylist load
+        return self.url is None or (self._sync_pid == os.getpid() and self._loaded.is_set())
+
+    def load_denylist(self):
+        # Start this worker's denylist sync and wait (up to DENYLIST_WAIT_SECONDS) for its first load
+        self._ensure_denylist()
+
+    def _add(self, revoked, replace=False):
+        now = time.time()
+        with self._lock:
+            entries = {} if replace else {jti: expires for jti, expires in self._revoked.items() if expires > now}
+            entries.update((jti, expires) for jti, expires in revoked.items() if expires > now)
+            self._revoked = entries  # Swapped whole, so checks read it without the lock
+
+    def _ensure_denylist(self):
+        # Started lazily in the worker that checks tokens, never in a preloading master
+        if self.url and self._sync_pid != os.getpid():
+            with self._lock:
+                if self._sync_pid != os.getpid():
+                    self._sync_pid = os.getpid()
+                    threading.Thread(target=self._sync, name='token-denylist', daemon=True).start()
+        if self.url and not self._loaded.is_set():
+            self._loaded.wait(DENYLIST_WAIT_SECONDS)
+
+    def _load(self, engine):
+        with engine.connect() as connection:
+            rows = connection.execute(
+                db.select(RevokedToken.jti, RevokedToken.expires_at)
+                .where(RevokedToken.expires_at > datetime.now(timezone.utc))
+            ).all()
+        # SQLite hands back naive datetimes; they were stored as UTC
+        self._add({
+            jti: (expires_at if expires_at.tzinfo else expires_at.replace(tzinfo=timezone.utc)).timestamp()
+            for jti, expires_at in rows
+        }, replace=True)
+        self._loaded.set()
+
+    def _sync(self):
+        engine = create_engine(self.url, poolclass=NullPool, connect_args=self.connect_args)
+        while True:
+            connection = None
+            try:
+                if not self.listen:
+                    self._load(engine)
+                    time.sleep(self.refresh)
+                    continue
+                connection = engine.raw_connection()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f'LISTEN {NOTIFY_CHANNEL}')
+                # Listening first, so a revocation made during the load is not missed
+                self._load(engine)
+                while True:
+                    if select.select([dbapi_connection], [], [], 60) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    revoked = {}
+                    for notify in dbapi_connection.notifies:
+                        jti, _, expires_at = notify.payload.partition(' ')
+                        revoked[jti] = float(expires_at)
+                    dbapi_connection.notifies.clear()
+                    self._add(revoked)
+            except Exception:
+                logger.warning('Token denylist sync failed; retrying in %ss', LISTEN_RETRY_SECONDS, exc_info=True)
+                # Fail open: requests stop waiting for a load that is not coming
+                self._loaded.set()
+                time.sleep(LISTEN_RETRY_SECONDS)
+            finally:
+                if connection is not None:
+                    connection.invalidate()
+
+
+def staff_required(view):
+    """
+    401 without a valid staff token, whatever AUTH_REQUIRED says: for the
+    diagnostics routes, which show SQL text, timings and pool state.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        auth = g.get('auth')
+        if auth is None or auth.role != STAFF:
+            return jsonify({'error': 'Authentication required.'}), 401, {'WWW-Authenticate': 'Bearer'}
+        return view(*args, **kwargs)
+    return wrapper
+
+
+tokens = TokenAuth()
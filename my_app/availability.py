@@ -0,0 +1,217 @@
+"""
+Calendar availability (GET /availability) and the booking overlap checks.
+
+A timed calendar event occupies [event_date + start_time, event_date +
+end_time) in wall-clock time, running past midnight when it ends at or before
+its start. Times are compared as the client wrote them: a UTC offset on a
+stored time, a booking's times or the from / to of GET /availability is
+dropped, never converted, just as create_booking stores them. On PostgreSQL the
+overlap test is a `&&` on calendar_event_span(), answered by its GiST index
+(migration 8c4d2e6f1a37). Without them (SQLite, or a database that has not
+been migrated), since no event spans more than a day, the event_date B-tree
+narrows the candidates to the window's days plus the one before, and
+EventSpans (sorted by start, bisected) picks the overlapping ones here.
+"""
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from dateutil import parser
+from sqlalchemy import func, literal_column, or_, select
+
+from . import db
+from .models import Calendar
+
+CANCELLED_STATUSES = ('cancelled', 'canceled')  # Events in these statuses (any case) free their slot
+MAX_AVAILABILITY_DAYS = 92
+MAX_EVENT_SPAN = timedelta(days=1)  # An end at or before the start runs past midnight, never further
+LOCK_NAMESPACE = 0x43414c  # pg_advisory_xact_lock(LOCK_NAMESPACE, day ordinal)
+SPAN_INDEX_RECHECK = 60  # Seconds; a worker picks up migration 8c4d2e6f1a37 without a restart
+
+_span_index = {}  # engine URL -> (checked at, whether calendar_event_span() exists there)
+
+EVENT_COLUMNS = (
+    Calendar.event_id, Calendar.booking_id, Calendar.event_date, Calendar.event_status,
+    Calendar.event_type, Calendar.start_time, Calendar.end_time,
+)
+
+
+def wall_clock(value):
+    # Time of day of a stored or parsed time, without its UTC offset
+    if isinstance(value, datetime):
+        value = value.time()
+    return value.replace(tzinfo=None)
+
+
+def event_span(event_date, start_time, end_time):
+    # (start, end) as naive wall-clock datetimes; None for an event missing either time
+    if start_time is None or end_time is None:
+        return None
+    start = datetime.combine(event_date, wall_clock(start_time))
+    end = datetime.combine(event_date, wall_clock(end_time))
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def has_span_index():
+    engine = db.engine
+    key = str(engine.url)
+    checked_at, exists = _span_index.get(key, (None, False))
+    if checked_at is None or (not exists and time.monotonic() - checked_at > SPAN_INDEX_RECHECK):
+        exists = engine.dialect.name == 'postgresql' and bool(db.session.scalar(
+            select(func.to_regprocedure('calendar_event_span(date, timetz, timetz)').is_not(None))
+        ))
+        _span_index[key] = (time.monotonic(), exists)
+    return exists
+
+
+def is_cancelled(row):
+    return (row.event_status or '').lower() in CANCELLED_STATUSES
+
+
+def overlapping_select(start, end, exclude_booking_id=None):
+    # Candidate events for [start, end); overlapping_events() applies the exact test
+    statement = select(*EVENT_COLUMNS)
+    if exclude_booking_id is not None:
+        statement = statement.where(or_(Calendar.booking_id.is_(None), Calendar.booking_id != exclude_booking_id))
+    if has_span_index():
+        span = func.calendar_event_span(Calendar.event_date, Calendar.start_time, Calendar.end_time)
+        statement = statement.where(span.op('&&')(func.tsrange(start, end, literal_column("'[)'"))))
+    else:
+        statement = statement.where(
+            Calendar.event_date.between(start.date() - timedelta(days=1), end.date()),
+            Calendar.start_time.is_not(None),
+            Calendar.end_time.is_not(None),
+        )
+    return statement
+
+
+class EventSpans:
+    """
+    Timed events sorted by start, for overlap queries without the GiST index.
+    No event is longer than MAX_EVENT_SPAN, so the ones overlapping [start,
+    end) all start in [start - MAX_EVENT_SPAN, end): two bisections find
+    that slice, and only its events have their end compared.
+    """
+
+    def __init__(self, events):
+        # events: [(span, row)]
+        self.events = sorted(events, key=lambda event: (event[0], event[1].event_id))
+        self.starts = [span[0] for span, _ in self.events]
+
+    def overlapping(self, start, end):
+        # [(span, row)] overlapping [start, end), in start order
+        low = bisect_left(self.starts, start - MAX_EVENT_SPAN)
+        high = bisect_left(self.starts, end)
+        return [(span, row) for span, row in self.events[low:high] if span[1] > start]
+
+
+def overlapping_events(start, end, exclude_booking_id=None):
+    # [(span, row)] of the timed, not cancelled events overlapping [start, end), in start order
+    events = []
+    for row in db.session.execute(overlapping_select(start, end, exclude_booking_id)):
+        span = event_span(row.event_date, row.start_time, row.end_time)
+        if span and not is_cancelled(row):
+            events.append((span, row))
+    # The GiST candidates already overlap; the event_date ones are the window's days and the day before
+    return EventSpans(events).overlapping(start, end)
+
+
+def lock_event_dates(event_date):
+    """
+    Serialize overlap checks for bookings around `event_date` until the
+    transaction ends, so two requests cannot both find a slot free and take
+    it. Events on adjacent days can overlap (past midnight), so a booking
+    locks its own day and the next: any two bookings that could overlap
+    share a lock. PostgreSQL only; SQLite already allows one writer.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    db.session.execute(select(
+        func.pg_advisory_xact_lock(LOCK_NAMESPACE, event_date.toordinal()),
+        func.pg_advisory_xact_lock(LOCK_NAMESPACE, event_date.toordinal() + 1),
+    ))
+
+
+def booking_conflicts(event_date, start_time, end_time, booking_id=None):
+    # Calendar events (other than the booking's own) overlapping a booking's slot; holds the date locks
+    lock_event_dates(event_date)
+    start, end = event_span(event_date, start_time, end_time)
+    return [event_dict(span, row) for span, row in overlapping_events(start, end, exclude_booking_id=booking_id)]
+
+
+def event_dict(span, row):
+    return {
+        'event_id': row.event_id,
+        'booking_id': row.booking_id,
+        'event_date': row.event_date.isoformat(),
+        'event_status': row.event_status,
+        'event_type': row.event_type,
+        'start': span[0].isoformat() if span else None,
+        'end': span[1].isoformat() if span else None,
+    }
+
+
+def parse_window(args):
+    """
+    The from / to query parameters of GET /availability as naive wall-clock
+    datetimes. Each is an ISO 8601 datetime (any UTC offset dropped, as for
+    booking times) or a YYYY-MM-DD date; a `to` date includes that whole day.
+    Raises ValueError with the message for the client.
+    """
+    if not args.get('from') or not args.get('to'):
+        raise ValueError('Both from and to are required (YYYY-MM-DD or ISO 8601 datetime).')
+    moments = []
+    for name in ('from', 'to'):
+        value = args[name]
+        try:
+            moment = parser.isoparse(value)
+        except ValueError:
+            raise ValueError(f'Invalid {name}; use YYYY-MM-DD or an ISO 8601 datetime.')
+        moment = moment.replace(tzinfo=None)
+        if name == 'to' and len(value) == 10:
+            moment += timedelta(days=1)
+        moments.append(moment)
+    start, end = moments
+    if end <= start:
+        raise ValueError('to must be after from.')
+    if end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise ValueError(f'The window can span at most {MAX_AVAILABILITY_DAYS} days.')
+    return start, end
+
+
+def availability(start, end):
+    """
+    GET /availability body for [start, end): the timed events in it, the
+    free gaps between them, and the events on those days that have no
+    times yet (they block nothing, but staff should know about them).
+    """
+    events = overlapping_events(start, end)
+
+    free = []
+    cursor = start
+    for (event_start, event_end), _ in events:
+        if event_start > cursor:
+            free.append({'start': cursor.isoformat(), 'end': event_start.isoformat()})
+        cursor = max(cursor, event_end)
+    if cursor < end:
+        free.append({'start': cursor.isoformat(), 'end': end.isoformat()})
+
+    untimed = db.session.execute(
+        select(*EVENT_COLUMNS)
+        .where(
+            Calendar.event_date.between(start.date(), (end - timedelta(microseconds=1)).date()),
+            or_(Calendar.start_time.is_(None), Calendar.end_time.is_(None)),
+        )
+        .order_by(Calendar.event_date, Calendar.event_id)
+    ).all()
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'available': not events,
+        'events': [event_dict(span, row) for span, row in events],
+        'free': free,
+        'unscheduled': [event_dict(None, row) for row in untimed if not is_cancelled(row)],
+    }
@@ -3,10 +3,106 @@ from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
 
+
+def env_flag(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")  # Make sure this is set correctly
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-print("Database URL:", Config.SQLALCHEMY_DATABASE_URI)
+    # Connection pool, per gunicorn worker (see my_app/database.py)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 300))  # Seconds; recycle before Supabase idles the connection out
+    DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 10))  # Seconds to wait for a free connection
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+    DB_RANDOM_PAGE_COST = float(os.getenv("DB_RANDOM_PAGE_COST", 1.1))  # SSD storage; 4.0 makes the planner shy away from index scans
+    DB_SSLMODE = os.getenv("DB_SSLMODE", "require")
+    DB_PGBOUNCER = env_flag("DB_PGBOUNCER")  # NullPool, no prepared statements
+    # Direct (non-PgBouncer) connection for the LISTEN threads of the customer cache and the token denylist;
+    # CUSTOMER_CACHE_LISTEN_URL is its old name
+    DB_LISTEN_URL = os.getenv("DB_LISTEN_URL") or os.getenv("CUSTOMER_CACHE_LISTEN_URL")
+
+    # Rows fetched per server-side cursor round trip by the /export endpoints (see my_app/exports.py)
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+    # Refuse POST /bookings and PUT /bookings/<id> slots that overlap another calendar event (see my_app/availability.py)
+    BOOKING_CONFLICT_CHECK = env_flag("BOOKING_CONFLICT_CHECK", True)
+
+    # Idempotency-Key replays for the create routes (see my_app/idempotency.py)
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 86400))  # Seconds a stored response is replayed
+    IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", 5))  # Seconds a duplicate waits for the first response before 409
+    IDEMPOTENCY_CLAIM_TIMEOUT = int(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT", 30))  # Seconds before a key with no stored response counts as done
+
+    # Per-worker customer summary cache (see my_app/customer_cache.py)
+    CUSTOMER_CACHE_SIZE = int(os.getenv("CUSTOMER_CACHE_SIZE", 1024))
+    CUSTOMER_CACHE_TTL = int(os.getenv("CUSTOMER_CACHE_TTL", 300))  # Seconds; upper bound on staleness if a NOTIFY is missed
+    CUSTOMER_CACHE_LISTEN = env_flag("CUSTOMER_CACHE_LISTEN", True)  # Cross-worker invalidation via LISTEN/NOTIFY
+
+    # Login password hashing and failed-login throttling, per worker (see my_app/passwords.py)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")  # werkzeug method with its cost, e.g. pbkdf2:sha256:600000
+    PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", 2))  # Hashes computed at once
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 16))  # Logins waiting for a hash thread before 503
+    LOGIN_MAX_USER_FAILURES = int(os.getenv("LOGIN_MAX_USER_FAILURES", 5))  # Per username and client address per window before 429
+    LOGIN_MAX_ADDRESS_FAILURES = int(os.getenv("LOGIN_MAX_ADDRESS_FAILURES", 20))  # Per client address per window; 0 turns it off
+    # Per username from all addresses per window; well above the address limit so a client cannot lock an account out. 0 turns it off
+    LOGIN_MAX_USERNAME_FAILURES = int(os.getenv("LOGIN_MAX_USERNAME_FAILURES", 100))
+    LOGIN_FAILURE_WINDOW = int(os.getenv("LOGIN_FAILURE_WINDOW", 300))  # Seconds
+
+    # Signed access tokens from POST /login (see my_app/auth.py)
+    SECRET_KEY_FALLBACKS = [key for key in os.getenv("SECRET_KEY_FALLBACKS", "").split(",") if key]  # Previous keys, still accepted while rotating
+    AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", 3600))  # Seconds
+    AUTH_REQUIRED = env_flag("AUTH_REQUIRED")  # 401 for requests without a token, except to AUTH_PUBLIC_ENDPOINTS
+    AUTH_PUBLIC_ENDPOINTS = ["main.login", "main.get_metrics"]
+    AUTH_DENYLIST_REFRESH = int(os.getenv("AUTH_DENYLIST_REFRESH", 30))  # Seconds between reloads where LISTEN is unavailable
+
+    # Per-request SQL counting and slow-query logging (see my_app/query_stats.py)
+    QUERY_STATS = env_flag("QUERY_STATS", True)
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))  # Statements at least this slow are logged as warnings
+    SLOW_QUERY_EXPLAIN = env_flag("SLOW_QUERY_EXPLAIN", True)  # ...with their EXPLAIN plan
+    SLOW_QUERY_EXPLAIN_INTERVAL = int(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", 60))  # Seconds between plans of one statement
+    QUERY_STATS_TOP = int(os.getenv("QUERY_STATS_TOP", 5))  # Slowest statements listed per route by GET /metrics/queries
+    SERVER_TIMING = env_flag("SERVER_TIMING", True)  # Server-Timing: db;desc="N queries";dur=ms on every response
+
+    # Prometheus metrics at GET /metrics, summed over all workers (see my_app/metrics.py)
+    METRICS = env_flag("METRICS", True)
+    METRICS_DIR = os.getenv("METRICS_DIR")  # Shared by one server's workers; gunicorn.conf.py sets a fresh one per start
+
+    # Reverse proxies in front of the app (the platform router under the Procfile): the client address is
+    # taken from that many X-Forwarded-For entries. 0 when clients connect directly, or they could spoof it
+    PROXY_HOPS = int(os.getenv("PROXY_HOPS", 1))
+
+    # CORS for the frontend, shared by the WSGI app and the async (ASGI) entry point
+    CORS_ORIGINS = ["http://localhost:5173"]  # Update this with your frontend's URL if different
+    CORS_METHODS = ["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"]
+    CORS_ALLOW_HEADERS = ["Content-Type", "Authorization", "If-None-Match", "X-Request-ID", "Idempotency-Key"]
+    # Keyset pagination cursor, conditional GET, log correlation, export filename, replayed POST
+    CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "ETag", "X-Request-ID", "Content-Disposition", "Idempotent-Replayed"]
+    CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", 86400))  # Seconds a browser may reuse a preflight answer
+    CORS_PREFLIGHT_MIDDLEWARE = env_flag("CORS_PREFLIGHT_MIDDLEWARE", True)  # Answer preflights before Flask (see my_app/middleware.py)
+
+    # gzip / brotli response compression (see my_app/middleware.py)
+    COMPRESS = env_flag("COMPRESS", True)
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))  # Bytes; smaller bodies gain less than the headers cost
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))  # gzip 1-9
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 4))  # brotli 0-11, when the brotli package is installed
+
+    # Logging (see my_app/logs.py)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_SQL_LEVEL = os.getenv("LOG_SQL_LEVEL", "WARNING").upper()  # INFO echoes every SQL statement
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))  # Fraction of requests whose DEBUG/INFO records are kept
+    LOG_JSON = env_flag("LOG_JSON", True)
+
+    # Schema is managed by Alembic (flask db upgrade); set to true only for throwaway local databases
+    DB_CREATE_ALL = env_flag("DB_CREATE_ALL")
+    # Refuse to start unless the database is at the newest migration; gunicorn.conf.py turns it on for the
+    # served app, so `flask db upgrade` itself still runs (see my_app/database.py)
+    DB_REQUIRE_MIGRATED = env_flag("DB_REQUIRE_MIGRATED")
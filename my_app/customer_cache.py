@@ -0,0 +1,224 @@
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from . import db
+from .models import Customer
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'customer_cache'
+ALL = '*'  # Notification payload meaning "drop every entry"
+LISTEN_RETRY_SECONDS = 5
+
+CustomerSummary = namedtuple('CustomerSummary', ['customer_id', 'name', 'is_active'])
+
+
+class CustomerCache:
+    """
+    Per-worker LRU of (customer_id, name, is_active), read through on a miss.
+
+    Committed Customer writes drop their entries here and, on Postgres, send a
+    NOTIFY that every other worker's listener thread turns into the same
+    invalidation. Entries also expire after CUSTOMER_CACHE_TTL seconds, which
+    bounds staleness if a notification is ever missed. Unknown ids are not
+    cached, so a customer added by another worker is visible immediately.
+    """
+
+    def __init__(self):
+        self.maxsize = 1024
+        self.ttl = 300
+        self.listen_url = None
+        self.connect_args = {}
+        self._entries = OrderedDict()  # customer_id -> (expires_at, CustomerSummary)
+        self._generation = 0  # Bumped by every invalidation; a load that raced one is not stored
+        self._listener_pid = None
+        self._reset()
+        # Locks and the listener thread do not survive fork (gunicorn --preload)
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._entries.clear()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'notifications': 0}
+
+    def init_app(self, app):
+        config = app.config
+        self.maxsize = config['CUSTOMER_CACHE_SIZE']
+        self.ttl = config['CUSTOMER_CACHE_TTL']
+        uri = config['DB_LISTEN_URL'] or config.get('SQLALCHEMY_DATABASE_URI') or ''
+        # LISTEN needs a session-level connection, which PgBouncer transaction pooling cannot give
+        if config['CUSTOMER_CACHE_LISTEN'] and uri.startswith('postgres') and (
+                config['DB_LISTEN_URL'] or not config['DB_PGBOUNCER']):
+            self.listen_url = uri
+            self.connect_args = {'sslmode': config['DB_SSLMODE']} if config.get('DB_SSLMODE') else {}
+
+    def get(self, customer_id):
+        # CustomerSummary, or None if there is no such customer
+        return self.get_many([customer_id]).get(customer_id)
+
+    def get_many(self, customer_ids):
+        # {customer_id: CustomerSummary} for the ids that exist; misses are loaded with one IN query.
+        # Ids may arrive as JSON strings ("12"); results are keyed by the id exactly as passed in.
+        self._ensure_listener()
+        requested = {}
+        for customer_id in customer_ids:
+            try:
+                requested.setdefault(int(customer_id), []).append(customer_id)
+            except (TypeError, ValueError):
+                continue
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            for customer_id in requested:
+                entry = self._entries.get(customer_id)
+                if entry and entry[0] > now:
+                    self._entries.move_to_end(customer_id)
+                    found[customer_id] = entry[1]
+                    self.stats['hits'] += 1
+                else:
+                    missing.append(customer_id)
+                    self.stats['misses'] += 1
+
+        if missing:
+            rows = db.session.execute(
+                db.select(Customer.customer_id, Customer.name, Customer.is_active)
+                .where(Customer.customer_id.in_(missing))
+            ).all()
+            loaded = {row.customer_id: CustomerSummary(*row) for row in rows}
+            found.update(loaded)
+
+            with self._lock:
+                if generation == self._generation:
+                    expires_at = time.monotonic() + self.ttl
+                    for customer_id, summary in loaded.items():
+                        self._entries[customer_id] = (expires_at, summary)
+                        self._entries.move_to_end(customer_id)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.stats['evictions'] += 1
+
+        return {key: found[customer_id] for customer_id, keys in requested.items() if customer_id in found for key in keys}
+
+    def invalidate(self, customer_ids=ALL):
+        with self._lock:
+            self._generation += 1
+            if customer_ids == ALL:
+                self.stats['invalidations'] += len(self._entries)
+                self._entries.clear()
+                return
+            for customer_id in customer_ids:
+                if self._entries.pop(customer_id, None) is not None:
+                    self.stats['invalidations'] += 1
+
+    def status(self):
+        # Counters for GET /metrics/customer_cache
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+                ttl=self.ttl,
+                hit_ratio=round(self.stats['hits'] / lookups, 4) if lookups else None,
+                listening=self._listener_pid == os.getpid(),
+            )
+
+    def _ensure_listener(self):
+        # Started lazily in the worker that uses the cache, never in a preloading master
+        if self.listen_url is None or self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, name='customer-cache-listener', daemon=True).start()
+
+    def _listen(self):
+        engine = create_engine(self.listen_url, poolclass=NullPool, connect_args=self.connect_args)
+        while True:
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f'LISTEN {NOTIFY_CHANNEL}')
+                # Anything may have changed while nobody was listening
+                self.invalidate()
+                while True:
+                    if select.select([dbapi_connection], [], [], 60) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    payloads = {notify.payload for notify in dbapi_connection.notifies}
+                    dbapi_connection.notifies.clear()
+                    with self._lock:
+                        self.stats['notifications'] += len(payloads)
+                    if ALL in payloads:
+                        self.invalidate()
+                    elif payloads:
+                        self.invalidate({int(payload) for payload in payloads})
+            except Exception:
+                logger.warning('Customer cache listener disconnected; retrying in %ss', LISTEN_RETRY_SECONDS, exc_info=True)
+                self.invalidate()
+                time.sleep(LISTEN_RETRY_SECONDS)
+            finally:
+                if connection is not None:
+                    connection.invalidate()
+
+
+customer_cache = CustomerCache()
+
+
+def _notify(session, customer_ids):
+    # NOTIFY is transactional: other workers only hear about it if the write commits
+    connection = session.connection()
+    if connection.dialect.name != 'postgresql':
+        return
+    for payload in sorted(str(customer_id) for customer_id in customer_ids):
+        connection.execute(db.select(db.func.pg_notify(NOTIFY_CHANNEL, payload)))
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_customer_writes(session, flush_context):
+    customer_ids = {
+        obj.customer_id for obj in session.deleted if isinstance(obj, Customer)
+    } | {
+        obj.customer_id for obj in session.dirty
+        if isinstance(obj, Customer) and session.is_modified(obj, include_collections=False)
+    }
+    if not customer_ids:
+        return
+    pending = session.info.setdefault('customer_cache_invalidate', set())
+    if pending != ALL:
+        pending.update(customer_ids)
+    _notify(session, customer_ids)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_customer_statements(orm_execute_state):
+    # Bulk update() / delete() on Customers can touch any row
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Customer:
+        session = orm_execute_state.session
+        session.info['customer_cache_invalidate'] = ALL
+        _notify(session, [ALL])
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    # Drop this worker's entries only once the write is visible to the next read
+    customer_ids = session.info.pop('customer_cache_invalidate', None)
+    if customer_ids:
+        customer_cache.invalidate(customer_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop('customer_cache_invalidate', None)
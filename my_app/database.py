@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+
+from sqlalchemy import exc, make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+# Pool counters for this worker process (reported by GET /metrics/pool)
+_pool_stats = {
+    'checkouts': 0,
+    'waits': 0,
+    'wait_seconds': 0.0,
+    'max_wait_seconds': 0.0,
+    'timeouts': 0,
+    'overflow_checkouts': 0,
+}
+_pool_stats_lock = threading.Lock()
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool that records how often a checkout had to wait for a free connection
+
+    def _do_get(self):
+        must_wait = self.checkedin() == 0 and self._overflow >= self._max_overflow > -1
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with _pool_stats_lock:
+                _pool_stats['timeouts'] += 1
+            raise
+        waited = time.perf_counter() - start
+        with _pool_stats_lock:
+            _pool_stats['checkouts'] += 1
+            if self.overflow() > 0:
+                _pool_stats['overflow_checkouts'] += 1
+            if must_wait:
+                _pool_stats['waits'] += 1
+                _pool_stats['wait_seconds'] += waited
+                _pool_stats['max_wait_seconds'] = max(_pool_stats['max_wait_seconds'], waited)
+        return conn
+
+
+def engine_options(config):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings on Config.
+
+    PgBouncer mode (DB_PGBOUNCER=true) disables client-side pooling, since PgBouncer
+    already pools, and avoids prepared statements and startup parameters, which
+    transaction pooling does not support. Set statement_timeout and
+    random_page_cost on the database role instead in that mode.
+    """
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if not uri.startswith('postgres'):
+        # SQLite / local stand-ins keep SQLAlchemy's defaults
+        return {}
+
+    connect_args = {}
+    if config.get('DB_SSLMODE'):
+        connect_args['sslmode'] = config['DB_SSLMODE']
+
+    if config.get('DB_PGBOUNCER'):
+        if '+psycopg' in uri and '+psycopg2' not in uri:
+            connect_args['prepare_threshold'] = None  # psycopg 3: never prepare server-side
+        return {'poolclass': NullPool, 'connect_args': connect_args}
+
+    options = []
+    if config.get('DB_STATEMENT_TIMEOUT_MS'):
+        options.append(f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}")
+    if config.get('DB_RANDOM_PAGE_COST'):
+        options.append(f"-c random_page_cost={float(config['DB_RANDOM_PAGE_COST'])}")
+    if options:
+        connect_args['options'] = ' '.join(options)
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'connect_args': connect_args,
+    }
+
+
+def async_engine_url(config):
+    # DATABASE_URL for the asyncpg driver; sslmode moves to connect_args (see async_engine_options)
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    url = url.set(drivername='postgresql+asyncpg').difference_update_query(['sslmode'])
+    if config.get('DB_PGBOUNCER'):
+        url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+    return url
+
+
+def async_engine_options(config):
+    """
+    create_async_engine() options for the ASGI entry point (my_app/asgi.py),
+    built from the same DB_* settings as engine_options(). asyncpg takes
+    server settings and ssl directly rather than libpq-style options.
+    """
+    connect_args = {}
+    if config.get('DB_SSLMODE'):
+        connect_args['ssl'] = config['DB_SSLMODE']
+
+    if config.get('DB_PGBOUNCER'):
+        connect_args['statement_cache_size'] = 0  # Transaction pooling cannot keep prepared statements
+        return {'poolclass': NullPool, 'connect_args': connect_args}
+
+    server_settings = {}
+    if config.get('DB_STATEMENT_TIMEOUT_MS'):
+        server_settings['statement_timeout'] = str(int(config['DB_STATEMENT_TIMEOUT_MS']))
+    if config.get('DB_RANDOM_PAGE_COST'):
+        server_settings['random_page_cost'] = str(float(config['DB_RANDOM_PAGE_COST']))
+    if server_settings:
+        connect_args['server_settings'] = server_settings
+
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'connect_args': connect_args,
+    }
+
+
+# Engines of apps created in this process (see dispose_after_fork)
+_engines = []
+
+
+def dispose_engines():
+    # Forget inherited pooled connections without closing them (they belong to the parent)
+    for engine in _engines:
+        engine.dispose(close=False)
+
+
+def dispose_after_fork(engines):
+    """
+    Drop inherited pooled connections in forked children (gunicorn --preload),
+    so workers never share a socket with the master or each other. close=False
+    leaves the parent's connections open for the parent. gunicorn.conf.py also
+    calls dispose_engines() from its post_fork hook.
+    """
+    _engines.extend(engines)
+
+
+os.register_at_fork(after_in_child=dispose_engines)
+
+
+def check_migrations_applied(engine, migrations_dir):
+    """
+    Raise RuntimeError unless the database is at the newest Alembic revision
+    in `migrations_dir`. Every write bumps Table_Versions and the idempotent
+    routes read Idempotency_Keys, so serving an unmigrated database would
+    turn writes into 500s; refusing to start surfaces it on the deploy instead.
+    """
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    expected = set(ScriptDirectory(migrations_dir).get_heads())
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current != expected:
+        raise RuntimeError(
+            f"Database is at migration {', '.join(sorted(current)) or 'none'}, the code needs "
+            f"{', '.join(sorted(expected))}. Run `flask --app app db upgrade` (the Procfile release step)."
+        )
+
+
+def pool_status(engine):
+    # Snapshot of the engine's pool plus this worker's checkout counters
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+        })
+    with _pool_stats_lock:
+        status.update(_pool_stats)
+    return status
@@ -0,0 +1,122 @@
+import hashlib
+from functools import wraps
+from itertools import chain
+
+from flask import current_app, request
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import TableVersion
+
+VERSIONS_TABLE = TableVersion.__tablename__
+CHANGED_TABLES = 'etags_changed_tables'  # Session.info key
+
+
+def bump_table_versions(connection, tables):
+    # Upsert so a table with no version row yet starts at 1
+    tables = sorted(set(tables) - {VERSIONS_TABLE})
+    if not tables:
+        return
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(TableVersion.__table__).values([
+        {'table_name': table, 'version': 1} for table in tables
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['table_name'],
+        set_={'version': TableVersion.__table__.c.version + 1}
+    )
+    connection.execute(stmt)
+
+
+def mark_tables_changed(session, tables):
+    """
+    Record tables written in the session's transaction; their versions are
+    bumped in one upsert just before it commits. The version rows stay locked
+    from there to the COMMIT, not for the whole transaction, so concurrent
+    writers to one table only queue for the commit itself.
+    """
+    session.info.setdefault(CHANGED_TABLES, set()).update(tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_flushed_tables(session, flush_context):
+    # new / dirty / deleted still hold the pre-flush state here
+    mark_tables_changed(session, {
+        obj.__table__.name
+        for obj in chain(session.new, session.deleted)
+    } | {
+        obj.__table__.name
+        for obj in session.dirty
+        if session.is_modified(obj, include_collections=False)
+    })
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_statement_tables(orm_execute_state):
+    # Bulk insert() / update() / delete() statements bypass the flush
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        mark_tables_changed(orm_execute_state.session, {mapper.local_table.name})
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_changed_tables(session):
+    # before_commit runs ahead of commit's own flush, so flush first to see every write
+    session.flush()
+    tables = session.info.pop(CHANGED_TABLES, None)
+    if tables:
+        bump_table_versions(session.connection(), tables)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _forget_changed_tables(session, transaction):
+    # A rolled back transaction changed nothing; savepoints leave the outer transaction's tables
+    if transaction.parent is None:
+        session.info.pop(CHANGED_TABLES, None)
+
+
+def versions_select(tables):
+    # Version counters for `tables`: one primary-key lookup
+    return select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables))
+
+
+def etag_for(versions, tables, full_path):
+    # Strong ETag: the tables' version counters plus the request path and query string
+    key = '|'.join(f'{table}:{versions.get(table, 0)}' for table in sorted(tables))
+    key += '|' + full_path
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def current_etag(tables):
+    """
+    Strong ETag for a list response built from `tables`: their version counters
+    plus the request path and query string. Costs one primary-key lookup.
+    """
+    versions = dict(db.session.execute(versions_select(tables)).all())
+    return etag_for(versions, tables, request.full_path)
+
+
+def conditional_get(*tables):
+    """
+    Answer If-None-Match with 304 before the view runs when none of `tables`
+    changed since the client's copy; otherwise tag the view's response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = current_etag(tables)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'  # Always revalidate, never serve stale
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,80 @@
+import csv
+import io
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import outerjoin, select
+
+from . import db
+from .models import Booking, Calendar, CateringBid, Customer, MealPrepBid
+from .schemas import (BOOKING_LIST, CALENDAR_LIST, MEAL_PREP_BID_LIST, CATERING_BID_LIST, BIDS, BID_LIST)
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+class Export:
+    # Row shape (same as the list endpoint), the column from / to apply to, and the indexed order rows stream in
+
+    def __init__(self, schema, date_column, order_by, select_from=None):
+        self.schema = schema
+        self.date_column = date_column
+        self.order_by = order_by
+        self.select_from = select_from
+
+    def statement(self, date_from=None, date_to=None):
+        stmt = select(*self.schema.columns)
+        if self.select_from is not None:
+            stmt = stmt.select_from(self.select_from)
+        if date_from:
+            stmt = stmt.where(self.date_column >= date_from)
+        if date_to:
+            stmt = stmt.where(self.date_column < date_to + timedelta(days=1))  # `to` is inclusive
+        return stmt.order_by(*self.order_by)
+
+
+EXPORTS = {
+    'bookings': Export(BOOKING_LIST, Booking.requested_date, [Booking.requested_date, Booking.booking_id]),
+    'meal_prep_bids': Export(MEAL_PREP_BID_LIST, MealPrepBid.created_at, [MealPrepBid.created_at, MealPrepBid.meal_bid_id]),
+    'catering_bids': Export(CATERING_BID_LIST, CateringBid.created_at, [CateringBid.created_at, CateringBid.catering_bid_id]),
+    'bids': Export(BID_LIST, BIDS.c.created_at, [BIDS.c.created_at, BIDS.c.bid_type, BIDS.c.bid_id]),
+    'calendar': Export(CALENDAR_LIST, Calendar.event_date, [Calendar.event_date, Calendar.event_id],
+                       select_from=outerjoin(Calendar, Customer, Customer.customer_id == Calendar.customer_id)),
+}
+
+
+def stream_batches(statement, schema, batch_size):
+    """
+    Yield the statement's rows as lists of at most `batch_size` dicts. yield_per
+    reads through a server-side cursor on Postgres, so only one batch is held
+    in memory at a time however large the result is. The connection stays
+    checked out until the last batch has been read.
+    """
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for rows in result.partitions():
+            yield schema.dump(rows)
+    finally:
+        result.close()
+
+
+def ndjson_chunks(batches):
+    # One JSON object per line, one chunk per batch
+    dumps = current_app.json.dumps
+    for items in batches:
+        yield ''.join(dumps(item) + '\n' for item in items)
+
+
+def csv_chunks(batches, schema):
+    # Header row first (so an empty export is still a valid file), then one chunk per batch
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(field.key for field in schema.fields)
+    yield buffer.getvalue()
+    for items in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(item.values() for item in items)
+        yield buffer.getvalue()
@@ -0,0 +1,218 @@
+"""
+Idempotency-Key support for the create routes (POST /bookings, /bookings/bulk,
+/meal_prep_bids, /catering_bids).
+
+A client that retries a POST sends the same Idempotency-Key header with the
+same body. The first request runs as usual; its response, if it is a 2xx or
+a validation error (400/422, which the same body always gets again), is kept
+in Idempotency_Keys for IDEMPOTENCY_TTL seconds, and a retry gets it back from
+one primary-key lookup, with Idempotent-Replayed: true, without the view's
+validation, customer lookups or inserts running again. Any other response
+(a 409 slot conflict, a 403/404 customer, a 429, a 5xx) depends on state that
+can change, so the key is released and a retry runs the view again. Keys are
+scoped to the route and the authenticated user; reusing one with a different
+body is 422.
+
+Duplicates that arrive while the first request is still running queue on a
+PostgreSQL advisory lock held for the view's transaction. The key's row is
+written in that same transaction (before_commit), so once the lock is free
+either the first request's writes and its key committed together, or neither
+did and the duplicate runs the view itself. The row holds no status for the
+few milliseconds between that commit and the response being stored; a
+duplicate seeing it waits up to IDEMPOTENCY_WAIT seconds, then gets 409.
+SQLite takes no lock (it allows one writer anyway).
+
+A key still without a response IDEMPOTENCY_CLAIM_TIMEOUT seconds after its
+claim means the worker died between the commit and storing the response.
+The writes did commit, so running the view again would duplicate them;
+instead the key is finished with ABANDONED_RESPONSE, which retries then
+replay.
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+LOCK_NAMESPACE = 0x49444b  # pg_advisory_xact_lock(LOCK_NAMESPACE, key)
+POLL_SECONDS = 0.05  # Between looks at a key whose response is still being stored
+PRUNE_INTERVAL = 60  # Seconds between deletes of expired keys, per worker
+STORED_ERRORS = (400, 422)  # Validation errors: the same body gets them again, so they are replayed
+ABANDONED_RESPONSE = {'message': 'This request was completed, but its response was lost. Reload to see the result.'}
+
+# Core statements on the session's connection, so etags does not version this table
+KEYS = IdempotencyKey.__table__
+
+logger = logging.getLogger(__name__)
+
+_pruned_at = 0.0
+
+
+def request_key(value):
+    # 32-byte key for this route, user and header value
+    user_id = g.auth.user_id if getattr(g, 'auth', None) else ''
+    return hashlib.sha256(f'{request.endpoint}\0{user_id}\0{value}'.encode()).digest()
+
+
+def lookup_select(key):
+    now = datetime.now(timezone.utc)
+    abandoned = KEYS.c.claimed_at < now - timedelta(seconds=current_app.config['IDEMPOTENCY_CLAIM_TIMEOUT'])
+    return (
+        select(KEYS.c.fingerprint, KEYS.c.status_code, KEYS.c.content_type, KEYS.c.body, abandoned.label('abandoned'))
+        .where(KEYS.c.key == key, KEYS.c.expires_at > now)
+    )
+
+
+def lookup(key):
+    return db.session.connection().execute(lookup_select(key)).first()
+
+
+def lock(key):
+    # Held until the view's transaction ends; duplicates of one key wait here
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.execute(select(func.pg_advisory_xact_lock(LOCK_NAMESPACE, int.from_bytes(key[:4], 'big', signed=True))))
+
+
+def upsert(connection, values):
+    # An expired row for the key may still be there; it is replaced
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(KEYS).values(**values)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={name: stmt.excluded[name] for name in values if name != 'key'},
+    ))
+
+
+def store(key, fingerprint, response):
+    global _pruned_at
+    # Whatever the view left uncommitted is not part of its response
+    db.session.rollback()
+    connection = db.session.connection()
+    now = datetime.now(timezone.utc)
+    if time.monotonic() - _pruned_at > PRUNE_INTERVAL:
+        _pruned_at = time.monotonic()
+        connection.execute(delete(KEYS).where(KEYS.c.expires_at <= now))
+    upsert(connection, {
+        'key': key,
+        'fingerprint': fingerprint,
+        'status_code': response.status_code,
+        'content_type': response.content_type,
+        'body': response.get_data(),
+        'claimed_at': now,
+        'expires_at': now + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL']),
+    })
+    db.session.commit()
+
+
+def finish_abandoned(key):
+    # The first request's writes committed but its worker never stored the response
+    db.session.rollback()
+    response = jsonify(ABANDONED_RESPONSE)
+    db.session.connection().execute(
+        update(KEYS)
+        .where(KEYS.c.key == key, KEYS.c.status_code.is_(None))
+        .values(status_code=response.status_code, content_type=response.content_type, body=response.get_data())
+    )
+    db.session.commit()
+    return lookup(key)
+
+
+def forget(key):
+    # The view failed after committing its key: let a retry run it again
+    db.session.rollback()
+    db.session.connection().execute(delete(KEYS).where(KEYS.c.key == key, KEYS.c.status_code.is_(None)))
+    db.session.commit()
+
+
+def replay(row):
+    response = current_app.response_class(row.body, status=row.status_code, content_type=row.content_type)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Replay the stored response for a repeated Idempotency-Key; otherwise run
+    the view with the key locked and store what it returns. Requests without
+    the header run the view as before.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        value = request.headers.get(HEADER)
+        if value is None:
+            return view(*args, **kwargs)
+        if not value or len(value) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.'}), 400
+        key = request_key(value)
+        fingerprint = hashlib.sha256(request.get_data()).digest()
+
+        # A retry of a finished request needs no lock
+        row = lookup(key)
+        if row is None:
+            lock(key)
+            row = lookup(key)  # It may have finished while this one waited
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT']
+        while row is not None and row.status_code is None and not row.abandoned and time.monotonic() < deadline:
+            db.session.rollback()
+            time.sleep(POLL_SECONDS)
+            lock(key)
+            row = lookup(key)
+        if row is not None:
+            db.session.rollback()
+            if row.fingerprint != fingerprint:
+                return jsonify({'error': f'This {HEADER} was already used with a different request.'}), 422
+            if row.status_code is None and row.abandoned:
+                row = finish_abandoned(key) or row
+            if row.status_code is None:
+                return jsonify({'error': f'A request with this {HEADER} is still in progress.'}), 409
+            return replay(row)
+
+        claimed = []
+
+        def claim(session):
+            # Commits with the view's own writes
+            now = datetime.now(timezone.utc)
+            upsert(session.connection(), {
+                'key': key,
+                'fingerprint': fingerprint,
+                'status_code': None,
+                'claimed_at': now,
+                'expires_at': now + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL']),
+            })
+            claimed.append(True)
+
+        session = db.session()
+        event.listen(session, 'before_commit', claim)
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            if claimed:
+                forget(key)
+            raise
+        finally:
+            event.remove(session, 'before_commit', claim)
+
+        stored = 200 <= response.status_code < 300 or response.status_code in STORED_ERRORS
+        if not stored:
+            if claimed:
+                forget(key)
+        elif not response.is_streamed:
+            try:
+                store(key, fingerprint, response)
+            except Exception:
+                # The view's writes are committed; its response still goes out, and a
+                # retry after IDEMPOTENCY_CLAIM_TIMEOUT gets ABANDONED_RESPONSE
+                db.session.rollback()
+                logger.exception('Storing the response for an %s failed', HEADER)
+        return response
+    return wrapper
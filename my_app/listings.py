@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+from dateutil import parser
+from sqlalchemy import BigInteger, cast, func, select
+
+from .models import Booking, Calendar, Customer
+from .pagination import decode_cursor, encode_cursor, keyset_select, parse_limit, split_page
+from .schemas import BOOKING_LIST, CALENDAR_LIST, BIDS, BID_LIST
+from .services import BID_TOTAL_COLUMNS, month_of
+
+# Statements behind the polled list endpoints, built from the query string alone so the
+# WSGI routes (routes.py) and the async handlers (asgi.py) run exactly the same SQL.
+# Builders raise ValueError (or IndexError / TypeError from a malformed cursor) on bad input.
+# Every list takes ?fields= (comma-separated output keys): only those columns are selected.
+
+BID_TYPES = ('meal_prep', 'catering')
+
+
+def parse_date(value):
+    # YYYY-MM-DD query parameter -> date, empty -> None
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+class Page:
+    # One keyset page: the statement to run and how to turn its rows into (items, next cursor)
+
+    def __init__(self, statement, schema, limit, cursor_of):
+        self.statement = statement
+        self.schema = schema
+        self.limit = limit
+        self.cursor_of = cursor_of
+
+    def result(self, rows):
+        rows, has_more = split_page(rows, self.limit)
+        return self.schema.dump(rows), self.cursor_of(rows[-1]) if has_more else None
+
+
+def full_select(schema, args):
+    # Unpaginated listing (GET /customers, /users, /meal_prep_bids, /catering_bids): (statement, schema)
+    schema = schema.only(args.get('fields'))
+    return select(*schema.columns), schema
+
+
+def bookings_page(args):
+    # GET /bookings: limit, after, order (booking_id | requested_date), customer_id, bid_status,
+    # service_type, from / to (requested_date, inclusive), fields
+    order = args.get('order', 'booking_id')
+    if order not in ('booking_id', 'requested_date'):
+        raise ValueError('order must be booking_id or requested_date')
+    limit = parse_limit(args.get('limit'))
+    date_from = parse_date(args.get('from'))
+    date_to = parse_date(args.get('to'))
+
+    after = None
+    if args.get('after'):
+        after = decode_cursor(args['after'])
+        if order == 'requested_date':
+            after = [datetime.strptime(after[0], '%Y-%m-%d').date(), int(after[1])]
+        else:
+            after = [int(after[0])]
+
+    # The cursor is read from the last row, so its columns are selected whatever ?fields= says
+    schema = BOOKING_LIST.only(args.get('fields'), keep=('booking_id', order))
+    statement = select(*schema.columns)
+    if args.get('customer_id'):
+        statement = statement.where(Booking.customer_id == int(args['customer_id']))
+    if args.get('bid_status'):
+        statement = statement.where(Booking.bid_status == args['bid_status'])
+    if args.get('service_type'):
+        statement = statement.where(Booking.service_type == args['service_type'])
+    if date_from:
+        statement = statement.where(Booking.requested_date >= date_from)
+    if date_to:
+        statement = statement.where(Booking.requested_date <= date_to)
+
+    if order == 'requested_date':
+        keys = [Booking.requested_date, Booking.booking_id]
+        cursor_of = lambda row: encode_cursor(row.requested_date.isoformat(), row.booking_id)  # noqa: E731
+    else:
+        keys = [Booking.booking_id]
+        cursor_of = lambda row: encode_cursor(row.booking_id)  # noqa: E731
+    return Page(keyset_select(statement, keys, after, limit), schema, limit, cursor_of)
+
+
+def bid_filters(bids, args):
+    # WHERE clauses shared by GET /bids and GET /bids/summary
+    filters = []
+    if args.get('bid_type'):
+        if args['bid_type'] not in BID_TYPES:
+            raise ValueError('bid_type must be meal_prep or catering')
+        filters.append(bids.c.bid_type == args['bid_type'])
+    if args.get('bid_status'):
+        filters.append(bids.c.bid_status == args['bid_status'])
+    if args.get('customer_id'):
+        filters.append(bids.c.customer_id == int(args['customer_id']))
+    if args.get('from'):
+        filters.append(bids.c.created_at >= datetime.strptime(args['from'], '%Y-%m-%d'))
+    if args.get('to'):
+        filters.append(bids.c.created_at < datetime.strptime(args['to'], '%Y-%m-%d') + timedelta(days=1))
+    return filters
+
+
+def bids_summary_select(args, group_by):
+    # GET /bids/summary: count and totals per group_by (subset of bid_status, month, bid_type), bid_filters()
+    group_columns = {
+        'bid_status': BIDS.c.bid_status,
+        'month': month_of(BIDS.c.created_at),
+        'bid_type': BIDS.c.bid_type
+    }
+    keys = [group_columns[g].label(g) for g in group_by]
+    aggregates = [func.count().label('count')] + [
+        # SUM(bigint) is numeric in Postgres; cast back so totals serialize as JSON numbers
+        func.coalesce(cast(func.sum(BIDS.c[column]), BigInteger), 0).label(f'total_{column}') for column in BID_TOTAL_COLUMNS
+    ]
+    return select(*keys, *aggregates).where(*bid_filters(BIDS, args)).group_by(*keys).order_by(*keys)
+
+
+def bids_page(args):
+    # GET /bids: limit, after, fields, plus the bid_filters() parameters
+    limit = parse_limit(args.get('limit'))
+    filters = bid_filters(BIDS, args)
+    after = None
+    if args.get('after'):
+        after = decode_cursor(args['after'])
+        after = [parser.isoparse(after[0]), str(after[1]), int(after[2])]
+
+    schema = BID_LIST.only(args.get('fields'), keep=('created_at', 'bid_type', 'bid_id'))
+    statement = select(*schema.columns).where(*filters)
+    keys = [BIDS.c.created_at, BIDS.c.bid_type, BIDS.c.bid_id]
+    return Page(
+        keyset_select(statement, keys, after, limit), schema, limit,
+        lambda row: encode_cursor(row.created_at.isoformat(), row.bid_type, row.bid_id)
+    )
+
+
+def calendar_select(args):
+    # GET /calendar: from / to (event_date, inclusive), fields; (statement, schema). The customer's
+    # name comes from a LEFT OUTER JOIN, left out when customer_name is not among the fields
+    date_from = parse_date(args.get('from'))
+    date_to = parse_date(args.get('to'))
+    schema = CALENDAR_LIST.only(args.get('fields'))
+    statement = select(*schema.columns).select_from(Calendar)
+    if 'customer_name' in schema:
+        statement = statement.outerjoin(Customer, Customer.customer_id == Calendar.customer_id)
+    if date_from:
+        statement = statement.where(Calendar.event_date >= date_from)
+    if date_to:
+        statement = statement.where(Calendar.event_date <= date_to)
+    return statement.order_by(Calendar.event_date, Calendar.event_id), schema
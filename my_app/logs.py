@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_queue_handler = None
+_listener = None
+
+access_logger = logging.getLogger('my_app.access')
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line: time, level, logger, message, request_id and any extra= fields
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Tags records with the current request id and drops sub-WARNING records for
+    requests that were not sampled. Runs on the QueueHandler, i.e. in the
+    request's own thread, before the record is queued.
+    """
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+        record.request_id = g.get('request_id')
+        return record.levelno >= logging.WARNING or g.get('log_sampled', True)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+
+    def prepare(self, record):
+        # Keep extra= fields (the stock prepare() only keeps msg), but format the
+        # message here so the listener thread never touches request objects
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_listener(config):
+    # Stdout writes happen on the listener thread, never on a request thread
+    global _listener
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    if config['LOG_JSON']:
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging(app):
+    """
+    Route every logger through one QueueHandler and a background listener,
+    set levels from LOG_LEVEL / LOG_SQL_LEVEL, and tag records with a
+    per-request id (X-Request-ID, echoed back on the response). LOG_SAMPLE_RATE
+    keeps DEBUG/INFO output for that fraction of requests; warnings and errors
+    are always logged.
+    """
+    global _queue_handler
+    config = app.config
+
+    if _queue_handler is None:
+        _queue_handler = _QueueHandler(queue.SimpleQueue())
+        _queue_handler.addFilter(RequestContextFilter())
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        _start_listener(config)
+        atexit.register(_stop_listener)
+        # The listener thread does not survive fork (gunicorn --preload); start a fresh one in each child
+        os.register_at_fork(after_in_child=lambda: _start_listener(config))
+
+    logging.getLogger().setLevel(config['LOG_LEVEL'])
+    logging.getLogger('my_app').setLevel(config['LOG_LEVEL'])
+    logging.getLogger('sqlalchemy').setLevel(config['LOG_SQL_LEVEL'])
+    logging.getLogger('urllib3').setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    sample_rate = config['LOG_SAMPLE_RATE']
+
+    @app.before_request
+    def start_request_log():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.log_sampled = sample_rate >= 1 or random.random() < sample_rate
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def finish_request_log(response):
+        if 'request_id' not in g:
+            return response
+        response.headers['X-Request-ID'] = g.request_id
+        if access_logger.isEnabledFor(logging.INFO):
+            extra = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2),
+            }
+            queries = g.get('queries')  # QUERY_STATS (my_app/query_stats.py)
+            if queries is not None:
+                extra['db_queries'] = queries.count
+                extra['db_ms'] = round(queries.seconds * 1000, 2)
+            access_logger.info('%s %s %s', request.method, request.path, response.status_code, extra=extra)
+        return response
@@ -0,0 +1,366 @@
+"""
+Prometheus metrics for GET /metrics, summed over every gunicorn worker.
+
+Each thread that serves requests writes its counters into its own
+memory-mapped file in METRICS_DIR, so recording a request is a few float
+additions with no lock and no cross-thread or cross-process traffic. A
+background thread per worker snapshots its pool and customer cache state
+into a file of its own every PUBLISH_INTERVAL seconds (and the scraping
+worker right before a scrape). A scrape reads every
+file in the directory and adds them up: counters and histograms over all
+workers that ever ran, gauges over the live ones. Files of workers that
+have exited are folded into one archive file by the next scrape, so
+recycled workers (max_requests) neither lose their counts nor leave
+files piling up. gunicorn.conf.py gives each server a fresh METRICS_DIR.
+"""
+import atexit
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import uuid
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+LE = tuple('+Inf' if bucket == math.inf else repr(bucket) for bucket in LATENCY_BUCKETS)
+UNMATCHED = 'unmatched'  # Route label of requests no URL rule matched (404 / 405)
+PUBLISH_INTERVAL = 5.0  # Seconds between snapshots of a worker's pool and cache state
+ARCHIVE = 'archive.db'
+INITIAL_FILE_SIZE = 64 * 1024
+
+# name -> (type, help); also the order of GET /metrics
+METRICS = {
+    'http_requests_total': ('counter', 'Requests served, by route, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Time to build the response (streamed bodies excluded), by route and method.'),
+    'http_requests_in_flight': ('gauge', 'Requests being served.'),
+    'db_pool_size': ('gauge', 'Configured pool size, over all workers.'),
+    'db_pool_connections': ('gauge', 'Open pooled database connections, by state.'),
+    'db_pool_checkouts_total': ('counter', 'Connections checked out of the pool.'),
+    'db_pool_waits_total': ('counter', 'Checkouts that had to wait for a free connection.'),
+    'db_pool_wait_seconds_total': ('counter', 'Time checkouts spent waiting for a free connection.'),
+    'db_pool_timeouts_total': ('counter', 'Checkouts that gave up after DB_POOL_TIMEOUT.'),
+    'customer_cache_lookups_total': ('counter', 'Customer summary cache lookups, by result.'),
+    'customer_cache_entries': ('gauge', 'Customer summaries cached, over all workers.'),
+    'customer_cache_evictions_total': ('counter', 'Customer summaries evicted to stay under CUSTOMER_CACHE_SIZE.'),
+    'customer_cache_invalidations_total': ('counter', 'Customer summaries dropped after a write.'),
+}
+
+IN_FLIGHT = ('http_requests_in_flight', '', ())
+
+_HEADER = struct.Struct('<Q')  # Bytes of the file in use
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+
+def _entries(buffer):
+    # (key, offset of its value) for every sample in a metric file's bytes
+    used = min(_HEADER.unpack_from(buffer, 0)[0], len(buffer)) if len(buffer) >= _HEADER.size else 0
+    position = _HEADER.size
+    while position + _LENGTH.size <= used:
+        (length,) = _LENGTH.unpack_from(buffer, position)
+        start = position + _LENGTH.size
+        family, suffix, labels = json.loads(bytes(buffer[start:start + length]))
+        offset = start + length + (-(start + length) % 8)
+        yield (family, suffix, tuple(tuple(pair) for pair in labels)), offset
+        position = offset + _VALUE.size
+
+
+class MetricFile:
+    """
+    Float samples in a memory-mapped file with exactly one writer. After an
+    8-byte header holding the bytes in use comes one entry per sample: key
+    length, the (family, suffix, labels) key as JSON, padding, float64 value.
+    An entry is appended the first time its key is written and the header is
+    updated last, so a reader never sees a half-written one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size < INITIAL_FILE_SIZE:
+            os.ftruncate(self._fd, INITIAL_FILE_SIZE)
+            size = INITIAL_FILE_SIZE
+        self._map = mmap.mmap(self._fd, size)
+        self._offsets = dict(_entries(self._map))
+        self._used = max(_HEADER.unpack_from(self._map, 0)[0], _HEADER.size)
+
+    def _offset(self, key):
+        offset = self._offsets.get(key)
+        if offset is None:
+            family, suffix, labels = key
+            encoded = json.dumps([family, suffix, labels]).encode()
+            start = self._used + _LENGTH.size
+            offset = start + len(encoded) + (-(start + len(encoded)) % 8)
+            end = offset + _VALUE.size
+            if end > len(self._map):
+                self._map.resize(max(2 * len(self._map), end))
+            _LENGTH.pack_into(self._map, self._used, len(encoded))
+            self._map[start:start + len(encoded)] = encoded
+            _VALUE.pack_into(self._map, offset, 0.0)
+            _HEADER.pack_into(self._map, 0, end)
+            self._used = end
+            self._offsets[key] = offset
+        return offset
+
+    def add(self, key, amount):
+        offset = self._offset(key)
+        _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._map, self._offset(key), value)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def read_samples(path):
+    # {key: value} of a metric file, read without mapping it
+    with open(path, 'rb') as f:
+        data = f.read()
+    return {key: _VALUE.unpack_from(data, offset)[0] for key, offset in _entries(data)
+            if offset + _VALUE.size <= len(data)}
+
+
+def owner(path):
+    # pid of the worker that wrote a metric file; None for the archive
+    name = os.path.basename(path)
+    return None if name == ARCHIVE else int(name.split('-', 1)[0])
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Metrics:
+    """
+    Request, pool and cache metrics for this worker, written to METRICS_DIR
+    and read back for all workers by render(). Request hooks use a file per
+    OS thread (greenlets of one gevent thread share it; they never switch
+    in the middle of an update), so the only lock they ever take is the one
+    that creates that file, once per thread.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self._snapshot = None
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._token = uuid.uuid4().hex[:8]  # Tells apart files of a reused pid
+        self._shards = {}  # native thread id -> MetricFile
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._publisher_started = False
+        self._worker_file = None
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config['METRICS']
+        self.directory = config['METRICS_DIR'] or self.directory
+        if not self.enabled:
+            return
+
+        from . import db
+        from .customer_cache import customer_cache
+        from .database import pool_status
+
+        def snapshot():
+            with app.app_context():
+                pool = pool_status(db.engine)
+            cache = customer_cache.status()
+            samples = {
+                ('db_pool_checkouts_total', '', ()): pool['checkouts'],
+                ('db_pool_waits_total', '', ()): pool['waits'],
+                ('db_pool_wait_seconds_total', '', ()): pool['wait_seconds'],
+                ('db_pool_timeouts_total', '', ()): pool['timeouts'],
+                ('customer_cache_lookups_total', '', (('result', 'hit'),)): cache['hits'],
+                ('customer_cache_lookups_total', '', (('result', 'miss'),)): cache['misses'],
+                ('customer_cache_entries', '', ()): cache['size'],
+                ('customer_cache_evictions_total', '', ()): cache['evictions'],
+                ('customer_cache_invalidations_total', '', ()): cache['invalidations'],
+            }
+            if 'size' in pool:  # QueuePool; NullPool (DB_PGBOUNCER) keeps no connections
+                samples[('db_pool_size', '', ())] = pool['size']
+                samples[('db_pool_connections', '', (('state', 'in_use'),))] = pool['checked_out']
+                samples[('db_pool_connections', '', (('state', 'idle'),))] = pool['checked_in']
+            return samples
+
+        self._snapshot = snapshot
+
+        @app.before_request
+        def start_request_metrics():
+            self.request_started()
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def note_response_status(response):
+            g.metrics_status = response.status_code
+            return response
+
+        @app.teardown_request
+        def record_request_metrics(exc):
+            started = g.pop('metrics_started', None)
+            if started is None:
+                return
+            rule = request.url_rule
+            self.request_finished(request.method, rule.rule if rule else UNMATCHED,
+                                  g.pop('metrics_status', 500), time.perf_counter() - started)
+
+    def _path(self, name):
+        # Callers hold self._lock or self._publish_lock
+        if self.directory is None:
+            # Not started by gunicorn.conf.py: a directory for this process alone
+            self.directory = tempfile.mkdtemp(prefix='my_app_metrics_')
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f'{os.getpid()}-{self._token}-{name}.db')
+
+    def _shard(self):
+        tid = threading.get_native_id()
+        shard = self._shards.get(tid)
+        if shard is None:
+            with self._lock:
+                shard = self._shards[tid] = MetricFile(self._path(tid))
+                if not self._publisher_started and self._snapshot is not None:
+                    # Started by the first request of each worker, never in a preloading master
+                    self._publisher_started = True
+                    threading.Thread(target=self._publish_forever, name='metrics-publisher', daemon=True).start()
+                    atexit.register(self.publish)  # Final counts of a worker that exits (max_requests)
+        return shard
+
+    def request_started(self):
+        if self.enabled:
+            self._shard().add(IN_FLIGHT, 1)
+
+    def request_finished(self, method, route, status, seconds):
+        if not self.enabled:
+            return
+        shard = self._shard()
+        shard.add(IN_FLIGHT, -1)
+        shard.add(('http_requests_total', '', (('method', method), ('route', route), ('status', str(status)))), 1)
+        labels = (('method', method), ('route', route))
+        shard.add(('http_request_duration_seconds', '_bucket',
+                   labels + (('le', LE[bisect.bisect_left(LATENCY_BUCKETS, seconds)]),)), 1)
+        shard.add(('http_request_duration_seconds', '_sum', labels), seconds)
+
+    def publish(self):
+        # Snapshot this worker's pool and cache state into its worker file
+        if self._snapshot is None:
+            return
+        with self._publish_lock:
+            if self._worker_file is None:
+                with self._lock:
+                    self._worker_file = MetricFile(self._path('worker'))
+            for key, value in self._snapshot().items():
+                self._worker_file.set(key, value)
+
+    def _publish_forever(self):
+        while True:
+            try:
+                self.publish()
+            except Exception:
+                logger.exception('Publishing worker metrics failed')
+            time.sleep(PUBLISH_INTERVAL)
+
+    def collect(self):
+        # {key: value} summed over every worker's files; dead workers' files are archived first
+        self.publish()
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Scrapes only, one at a time across workers
+            totals = {}
+            archive = None
+            try:
+                for path in glob.glob(os.path.join(self.directory, '*.db')):
+                    pid = owner(path)
+                    live = pid is None or alive(pid)
+                    samples = read_samples(path)
+                    for key, value in samples.items():
+                        if METRICS[key[0]][0] == 'gauge' and not live:
+                            continue
+                        totals[key] = totals.get(key, 0.0) + value
+                        if not live:
+                            if archive is None:
+                                archive = MetricFile(os.path.join(self.directory, ARCHIVE))
+                            archive.add(key, value)
+                    if not live:
+                        os.remove(path)
+            finally:
+                if archive is not None:
+                    archive.close()
+        return totals
+
+    def render(self):
+        # Prometheus text exposition format (version 0.0.4)
+        totals = self.collect()
+        families = {}
+        for (family, suffix, labels), value in totals.items():
+            families.setdefault(family, []).append((suffix, labels, value))
+        lines = []
+        for family, (kind, help_text) in METRICS.items():
+            samples = families.get(family)
+            if not samples:
+                continue
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            if kind == 'histogram':
+                lines.extend(histogram_lines(family, samples))
+            else:
+                lines.extend(f'{family}{format_labels(labels)} {format_value(value)}'
+                             for _, labels, value in sorted(samples))
+        return '\n'.join(lines) + '\n'
+
+
+def histogram_lines(family, samples):
+    # Buckets are stored one count per bucket; the exposition format wants them cumulative
+    series = {}  # labels without le -> [bucket counts, sum]
+    for suffix, labels, value in samples:
+        if suffix == '_bucket':
+            le = dict(labels)['le']
+            entry = series.setdefault(tuple(pair for pair in labels if pair[0] != 'le'), [[0.0] * len(LE), 0.0])
+            entry[0][LE.index(le)] += value
+        else:
+            series.setdefault(labels, [[0.0] * len(LE), 0.0])[1] += value
+    for labels, (counts, total) in sorted(series.items()):
+        cumulative = 0.0
+        for le, count in zip(LE, counts):
+            cumulative += count
+            yield f'{family}_bucket{format_labels(labels + (("le", le),))} {format_value(cumulative)}'
+        yield f'{family}_sum{format_labels(labels)} {format_value(total)}'
+        yield f'{family}_count{format_labels(labels)} {format_value(cumulative)}'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = Metrics()
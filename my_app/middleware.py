@@ -0,0 +1,226 @@
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+# Media types worth compressing; everything else (images, already-compressed files) passes through
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+# ETag suffix per content coding, so each encoded representation has its own strong validator
+ETAG_SUFFIXES = {'br': '-br', 'gzip': '-gzip'}
+ETAG_SUFFIX = re.compile(r'-(?:br|gzip)"')
+
+
+class CorsPreflight:
+    """
+    Answers CORS preflights (OPTIONS with Origin and Access-Control-Request-Method)
+    from an allowed origin with 204 and the CORS_* settings, before Flask routing,
+    hooks or a database session are involved. Access-Control-Max-Age lets the
+    browser reuse the answer for CORS_MAX_AGE seconds (browsers cap it: Chrome
+    at 2 hours), so most writes from the frontend need no preflight at all.
+    Preflights from other origins, and actual requests, go to the app, where
+    flask_cors adds the headers as before.
+    """
+
+    def __init__(self, app, origins, methods, allow_headers, max_age):
+        self.app = app
+        self.origins = set(origins)
+        self.methods = {method.upper() for method in methods}
+        self.allow_headers = {header.lower() for header in allow_headers}
+        self.static_headers = [
+            ('Access-Control-Allow-Methods', ', '.join(methods)),
+            ('Access-Control-Max-Age', str(max_age)),
+            ('Vary', 'Origin, Access-Control-Request-Method, Access-Control-Request-Headers'),
+            ('Content-Length', '0'),
+        ]
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] != 'OPTIONS':
+            return self.app(environ, start_response)
+        origin = environ.get('HTTP_ORIGIN')
+        method = environ.get('HTTP_ACCESS_CONTROL_REQUEST_METHOD', '').upper()
+        if not origin or method not in self.methods or not ('*' in self.origins or origin in self.origins):
+            return self.app(environ, start_response)
+        requested = [header.strip() for header in environ.get('HTTP_ACCESS_CONTROL_REQUEST_HEADERS', '').split(',') if header.strip()]
+        if any(header.lower() not in self.allow_headers for header in requested):
+            return self.app(environ, start_response)  # flask_cors refuses it the usual way
+
+        headers = [('Access-Control-Allow-Origin', origin)] + self.static_headers
+        if requested:
+            headers.append(('Access-Control-Allow-Headers', ', '.join(requested)))
+        start_response('204 No Content', headers)
+        return []
+
+
+class Compression:
+    """
+    gzip (or brotli, when the client accepts it and the brotli package is
+    installed) for JSON, NDJSON and text responses. A response with a
+    Content-Length is compressed whole when it is at least COMPRESS_MIN_SIZE
+    bytes; a streamed one (the /export routes) is compressed as it goes, each
+    chunk flushed so the client keeps receiving rows while the export runs.
+
+    An encoded response's ETag gets a -gzip / -br suffix, and the suffix is
+    stripped from If-None-Match on the way in, so conditional GETs still see
+    the app's own ETags and 304 as before.
+    """
+
+    def __init__(self, app, min_size=1024, level=6, brotli_quality=4):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+
+    def encoding_for(self, environ):
+        # The best content coding the client accepts, or None
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return None
+        accepted = {}
+        for item in environ.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            coding, _, params = item.strip().partition(';')
+            quality = 1.0
+            if params.strip().startswith('q='):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[coding.strip().lower()] = quality
+        if brotli is not None and accepted.get('br', 0) > 0:
+            return 'br'
+        if accepted.get('gzip', 0) > 0:
+            return 'gzip'
+        return None
+
+    def __call__(self, environ, start_response):
+        encoding = self.encoding_for(environ)
+        if encoding is None:
+            return self.app(environ, start_response)
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            environ['HTTP_IF_NONE_MATCH'] = ETAG_SUFFIX.sub('"', if_none_match)
+
+        response = {}
+
+        def capture(status, headers, exc_info=None):
+            response.update(status=status, headers=headers, exc_info=exc_info)
+            return lambda data: None  # write() is never used by Flask
+
+        body = self.app(environ, capture)
+        status, headers = response['status'], response['headers']
+        values = {name.lower(): value for name, value in headers}
+        code = status.split(' ', 1)[0]
+
+        if code == '304':
+            # Same representation the client holds: hand back the encoded ETag it sent
+            if if_none_match and ETAG_SUFFIXES[encoding] in if_none_match:
+                headers = with_etag_suffix(headers, ETAG_SUFFIXES[encoding])
+            start_response(status, headers, response['exc_info'])
+            return body
+
+        media_type = values.get('content-type', '').split(';', 1)[0].strip().lower()
+        if (code in ('204', '206') or 'content-encoding' in values
+                or not media_type.startswith(COMPRESSIBLE_TYPES)):
+            start_response(status, headers, response['exc_info'])
+            return body
+
+        headers = with_vary(headers)
+        length = values.get('content-length')
+        if length is not None and int(length) < self.min_size:
+            start_response(status, headers, response['exc_info'])
+            return body
+
+        headers = [(name, value) for name, value in with_etag_suffix(headers, ETAG_SUFFIXES[encoding])
+                   if name.lower() != 'content-length']
+        headers.append(('Content-Encoding', encoding))
+        if length is not None:
+            try:
+                data = b''.join(body)
+            finally:
+                close = getattr(body, 'close', None)
+                if close is not None:
+                    close()
+            compressor = self.compressor(encoding)
+            data = compressor.compress(data) + compressor.finish()
+            headers.append(('Content-Length', str(len(data))))
+            start_response(status, headers, response['exc_info'])
+            return [data]
+
+        start_response(status, headers, response['exc_info'])
+        return CompressedStream(body, self.compressor(encoding))
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.level)
+
+
+class GzipCompressor:
+
+    def __init__(self, level):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+
+    def compress(self, data):
+        return self._zlib.compress(data)
+
+    def flush(self):
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+
+    def __init__(self, quality):
+        self._brotli = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._brotli.process(data)
+
+    def flush(self):
+        return self._brotli.flush()
+
+    def finish(self):
+        return self._brotli.finish()
+
+
+class CompressedStream:
+    # WSGI iterable compressing a streamed body chunk by chunk; close() reaches the app's iterable
+
+    def __init__(self, body, compressor):
+        self.body = body
+        self.compressor = compressor
+
+    def __iter__(self):
+        for chunk in self.body:
+            if chunk:
+                data = self.compressor.compress(chunk) + self.compressor.flush()
+                if data:
+                    yield data
+        yield self.compressor.finish()
+
+    def close(self):
+        close = getattr(self.body, 'close', None)
+        if close is not None:
+            close()
+
+
+def with_vary(headers):
+    # Add Accept-Encoding to Vary, merging with an existing Vary header
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == 'vary':
+            if 'accept-encoding' not in value.lower():
+                headers = list(headers)
+                headers[index] = (name, f'{value}, Accept-Encoding')
+            return headers
+    return list(headers) + [('Vary', 'Accept-Encoding')]
+
+
+def with_etag_suffix(headers, suffix):
+    # "abc" -> "abc-gzip"; weak ETags keep their W/
+    return [
+        (name, value[:-1] + suffix + '"' if name.lower() == 'etag' and value.endswith('"') and not value.endswith(suffix + '"') else value)
+        for name, value in headers
+    ]
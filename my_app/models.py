@@ -15,6 +15,12 @@ class Customer(db.Model):
     # Relationship with Booking model
     bookings = db.relationship('Booking', back_populates='customer')
 
+    # Name lookups in update_meal_prep_bid; partial index for active-only listings
+    __table_args__ = (
+        db.Index('ix_customers_name', 'name'),
+        db.Index('ix_customers_active', 'customer_id', postgresql_where=db.text('is_active')),
+    )
+
     def to_dict(self):
         return {
             'customer_id': self.customer_id,
@@ -34,6 +40,11 @@ class User(db.Model):
     email = db.Column(db.String, nullable=False)
     Password_reset_token = db.Column(db.Text)
 
+    # Login lookup
+    __table_args__ = (
+        db.Index('ix_user_username', 'username'),
+    )
+
     def to_dict(self):
         return {
             'user_id': self.user_id,
@@ -63,6 +74,14 @@ class Booking(db.Model):
     # Establish relationship with Customer
     customer = db.relationship('Customer', back_populates='bookings')
 
+    # Keyset pagination indexes for GET /bookings (see listings.bookings_page)
+    __table_args__ = (
+        db.Index('ix_bookings_requested_date_booking_id', 'requested_date', 'booking_id'),
+        db.Index('ix_bookings_customer_id_booking_id', 'customer_id', 'booking_id'),
+        db.Index('ix_bookings_bid_status_booking_id', 'bid_status', 'booking_id'),
+        db.Index('ix_bookings_service_type_booking_id', 'service_type', 'booking_id'),
+    )
+
     def to_dict(self):
         # Format the start_time and end_time as strings with timezone if they are not None
         return {
@@ -118,6 +137,9 @@ class MealPrepBid(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('booking_id', 'customer_id', name='_booking_customer_uc'),  # Enforce unique booking_id and customer_id pair
+        db.Index('ix_meal_prep_bids_booking_id', 'booking_id'),  # One-bid-per-booking check
+        db.Index('ix_meal_prep_bids_created_at_meal_bid_id', 'created_at', 'meal_bid_id'),  # GET /bids keyset
+        db.Index('ix_meal_prep_bids_customer_id_created_at', 'customer_id', 'created_at', 'meal_bid_id'),  # ...?customer_id=
     )
 
     def to_dict(self):
@@ -153,6 +175,9 @@ class CateringBid(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('booking_id', 'customer_id', name='_booking_customer_uc'),  # Enforce unique booking_id and customer_id pair
+        db.Index('ix_catering_bids_booking_id', 'booking_id'),  # One-bid-per-booking check
+        db.Index('ix_catering_bids_created_at_catering_bid_id', 'created_at', 'catering_bid_id'),  # GET /bids keyset
+        db.Index('ix_catering_bids_customer_id_created_at', 'customer_id', 'created_at', 'catering_bid_id'),  # ...?customer_id=
     )
 
     def to_dict(self):
@@ -187,8 +212,15 @@ class Calendar(db.Model):
     booking = db.relationship('Booking', backref='calendar', uselist=False, foreign_keys=[booking_id])
     customer = db.relationship('Customer', backref='calendar', uselist=False, foreign_keys=[customer_id])
     
-    start_time = db.Column(db.DateTime(timezone=True))
-    end_time = db.Column(db.DateTime(timezone=True))
+    start_time = db.Column(db.Time(timezone=True))  # time with time zone, as in the database
+    end_time = db.Column(db.Time(timezone=True))
+
+    # Month-view window queries on GET /calendar; per-booking event lookups. On PostgreSQL
+    # migration 8c4d2e6f1a37 adds a GiST index on calendar_event_span() (see availability.py)
+    __table_args__ = (
+        db.Index('ix_calendar_event_date_event_id', 'event_date', 'event_id'),
+        db.Index('ix_calendar_booking_id', 'booking_id'),
+    )
 
     def to_dict(self):
         return {
@@ -204,3 +236,38 @@ class Calendar(db.Model):
             'start_time': self.start_time.isoformat() if self.start_time else None,
             'end_time': self.end_time.isoformat() if self.end_time else None
         }
+
+
+class RevokedToken(db.Model):
+    # Access tokens revoked before they expire; read into memory by every worker (see auth.py)
+    __tablename__ = 'Revoked_Tokens'
+    jti = db.Column(db.String, primary_key=True)
+    user_id = db.Column(db.BigInteger)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
+
+
+class IdempotencyKey(db.Model):
+    # Responses to POST requests sent with an Idempotency-Key header, replayed on retries (see idempotency.py)
+    __tablename__ = 'Idempotency_Keys'
+    key = db.Column(db.LargeBinary, primary_key=True)  # sha256 of route, user and header value
+    fingerprint = db.Column(db.LargeBinary, nullable=False)  # sha256 of the request body
+    status_code = db.Column(db.SmallInteger)  # NULL while the first request is still finishing
+    content_type = db.Column(db.String)
+    body = db.Column(db.LargeBinary)
+    claimed_at = db.Column(db.DateTime(timezone=True), nullable=False)  # When the first request committed
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+
+class TableVersion(db.Model):
+    # One row per table, bumped in the same transaction as every write to it (see etags.py)
+    __tablename__ = 'Table_Versions'
+    table_name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
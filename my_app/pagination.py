@@ -0,0 +1,58 @@
+import base64
+import json
+
+from sqlalchemy import tuple_
+
+# Hard cap on rows per page so a single request can never serialize a whole table
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    # Clamp the requested page size to [1, maximum]
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def encode_cursor(*values):
+    # Opaque, URL-safe token holding the sort key of the last row on a page
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def keyset_select(statement, keys, after, limit):
+    """
+    Narrow `statement` (a select() or Query) to the rows strictly after the key
+    values in `after` (or from the start when `after` is None), ordered by
+    `keys`. One extra row is requested so split_page() can tell whether
+    another page exists without a COUNT(*).
+    """
+    if after is not None:
+        if len(keys) == 1:
+            statement = statement.where(keys[0] > after[0])
+        else:
+            statement = statement.where(tuple_(*keys) > tuple_(*after))
+    return statement.order_by(*keys).limit(limit + 1)
+
+
+def split_page(rows, limit):
+    # (rows on this page, whether another page exists)
+    return rows[:limit], len(rows) > limit
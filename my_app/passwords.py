@@ -0,0 +1,210 @@
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import update
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from . import db
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+HASH_PREFIXES = ('scrypt:', 'pbkdf2:')  # Stored values without one are legacy plain text
+MAX_THROTTLE_KEYS = 10000  # Usernames / addresses tracked per worker; the oldest go first
+
+
+class HasherBusy(Exception):
+    # Every hash thread is busy and the queue is full
+    pass
+
+
+class PasswordHasher:
+    """
+    Password hashing and login verification for this worker.
+
+    scrypt / pbkdf2 are CPU-heavy by design, so hashes run on a pool of
+    PASSWORD_HASH_THREADS OS threads (hashlib releases the GIL; under gevent
+    it is gevent's real-thread pool, so the hub keeps serving other
+    greenlets). At most PASSWORD_HASH_QUEUE more logins wait for a thread;
+    past that verify() raises HasherBusy rather than letting a burst of logins
+    take every request thread. Unknown usernames are checked against a dummy
+    hash, so they cost the same as a wrong password.
+
+    Stored plain-text passwords (legacy rows) and hashes made with another
+    PASSWORD_HASH_METHOD are replaced by a fresh hash on the next successful
+    login.
+
+    Failed logins are counted over LOGIN_FAILURE_WINDOW seconds per username
+    and client address together (LOGIN_MAX_USER_FAILURES), per address
+    (LOGIN_MAX_ADDRESS_FAILURES) and per username from every address
+    (LOGIN_MAX_USERNAME_FAILURES); once any reaches its limit the login is
+    refused before any database lookup or hashing. Knowing a username is
+    therefore not enough to lock its owner out: a client mostly locks out
+    itself, and the per-username limit sits well above the per-address one,
+    bounding only guesses spread over many addresses. Counts are per worker,
+    so a server with N workers allows up to N times the limits. The address
+    is the one ProxyFix recovers from X-Forwarded-For (PROXY_HOPS); with a
+    wrong hop count every client shares the router's address, and one
+    client's failures would lock everyone out.
+    """
+
+    def __init__(self):
+        self.method = 'scrypt:32768:8:1'
+        self.threads = 2
+        self.queue = 16
+        self.max_user_failures = 5
+        self.max_address_failures = 20
+        self.max_username_failures = 100
+        self.failure_window = 300
+        self._canonical_method = None
+        self._dummy_hash = None
+        self._reset()
+        # The pool's threads do not survive fork (gunicorn --preload)
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = 0  # Hashes running or queued
+        self._failures = OrderedDict()  # ('login' | 'address' | 'user', value) -> [count, window ends at]
+        self.stats = {'hashes': 0, 'busy': 0, 'rehashed': 0, 'throttled': 0}
+
+    def init_app(self, app):
+        config = app.config
+        self.method = config['PASSWORD_HASH_METHOD']
+        self.threads = config['PASSWORD_HASH_THREADS']
+        self.queue = config['PASSWORD_HASH_QUEUE']
+        self.max_user_failures = config['LOGIN_MAX_USER_FAILURES']
+        self.max_address_failures = config['LOGIN_MAX_ADDRESS_FAILURES']
+        self.max_username_failures = config['LOGIN_MAX_USERNAME_FAILURES']
+        self.failure_window = config['LOGIN_FAILURE_WINDOW']
+        # werkzeug fills in default cost parameters; the stored prefix is what rehashing compares
+        self._dummy_hash = generate_password_hash('', self.method)
+        self._canonical_method = self._dummy_hash.split('$', 1)[0]
+
+    # Hashing
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                gevent_monkey = sys.modules.get('gevent.monkey')
+                if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+                    # Patched threading.Thread is a greenlet and would run the hash on the hub
+                    from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+                    self._pool = GeventThreadPoolExecutor(max_workers=self.threads)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='password-hash')
+            return self._pool
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.threads + self.queue:
+                self.stats['busy'] += 1
+                raise HasherBusy()
+            self._pending += 1
+            self.stats['hashes'] += 1
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, user, password):
+        """
+        Whether `password` is the password of `user` (None: no such user, which
+        still costs one hash). Upgrades the stored value when it is plain text
+        or uses another method; that write is committed here.
+        """
+        if user is None:
+            self._run(check_password_hash, self._dummy_hash, password)
+            return False
+        stored = user.password or ''
+        if stored.startswith(HASH_PREFIXES):
+            if not self._run(check_password_hash, stored, password):
+                return False
+            if stored.split('$', 1)[0] == self._canonical_method:
+                return True
+        elif not hmac.compare_digest(stored.encode(), password.encode()):
+            return False
+        self._rehash(user, stored, password)
+        return True
+
+    def _rehash(self, user, stored, password):
+        # Only if nobody changed the password since it was read
+        try:
+            password_hash = self.hash(password)
+        except HasherBusy:
+            return  # Next login, then
+        db.session.execute(
+            update(User)
+            .where(User.user_id == user.user_id, User.password == stored)
+            .values(password=password_hash)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        logger.info('Upgraded the stored password of user %s to %s', user.user_id, self._canonical_method)
+        with self._lock:
+            self.stats['rehashed'] += 1
+
+    # Failed-login throttling
+
+    def _keys(self, username, address):
+        # (kind, value, limit) counters a login attempt is checked against and counted in
+        keys = [('login', (username, address), self.max_user_failures)]
+        if self.max_address_failures and address:
+            keys.append(('address', address, self.max_address_failures))
+        if self.max_username_failures:
+            keys.append(('user', username, self.max_username_failures))
+        return keys
+
+    def retry_after(self, username, address):
+        # Seconds until this username and address may try again; 0 if they may now
+        now = time.monotonic()
+        wait = 0
+        with self._lock:
+            for kind, value, limit in self._keys(username, address):
+                entry = self._failures.get((kind, value))
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._failures[(kind, value)]
+                elif entry[0] >= limit:
+                    wait = max(wait, entry[1] - now)
+            if wait:
+                self.stats['throttled'] += 1
+        return wait
+
+    def record_failure(self, username, address):
+        now = time.monotonic()
+        with self._lock:
+            for kind, value, _ in self._keys(username, address):
+                entry = self._failures.get((kind, value))
+                if entry is None or entry[1] <= now:
+                    self._failures[(kind, value)] = [1, now + self.failure_window]
+                else:
+                    entry[0] += 1
+                self._failures.move_to_end((kind, value))
+            while len(self._failures) > MAX_THROTTLE_KEYS:
+                self._failures.popitem(last=False)
+
+    def record_success(self, username, address):
+        with self._lock:
+            self._failures.pop(('login', (username, address)), None)
+            self._failures.pop(('user', username), None)
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, pending=self._pending, threads=self.threads, queue=self.queue,
+                        tracked_failures=len(self._failures))
+
+
+passwords = PasswordHasher()
@@ -0,0 +1,231 @@
+import logging
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+EXPLAIN_PREFIX = {'postgresql': 'EXPLAIN ', 'sqlite': 'EXPLAIN QUERY PLAN '}
+STATEMENT_CHARS = 500  # Statements are reported and logged cut to this length
+MAX_STATEMENTS_PER_ROUTE = 100  # Distinct statements tracked per route; later ones are not broken out
+
+
+class RequestQueries:
+    # SQL issued by one request: statement count, total time and (statement, seconds) per statement
+
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+
+class QueryStats:
+    """
+    Per-request SQL instrumentation for the Flask app.
+
+    Cursor execute hooks count every statement a request issues and time it;
+    the response carries the totals in a Server-Timing header and the access
+    log line. Statements slower than SLOW_QUERY_MS are logged with their
+    EXPLAIN plan (no ANALYZE, so nothing runs twice; at most once per
+    statement per SLOW_QUERY_EXPLAIN_INTERVAL seconds). When a request ends
+    its numbers are folded into per-route totals for this worker, reported
+    by GET /metrics/queries along with each route's slowest statements.
+    Statements outside a Flask request (the async list handlers in asgi.py,
+    background threads) are not counted.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_seconds = 0.2
+        self.explain = True
+        self.explain_interval = 60
+        self.server_timing = True
+        self.top = 5
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._routes = {}  # 'GET /bookings' -> per-route totals
+        self._explained = {}  # statement -> monotonic time of its last EXPLAIN
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config['QUERY_STATS']
+        self.slow_seconds = config['SLOW_QUERY_MS'] / 1000
+        self.explain = config['SLOW_QUERY_EXPLAIN']
+        self.explain_interval = config['SLOW_QUERY_EXPLAIN_INTERVAL']
+        self.server_timing = config['SERVER_TIMING']
+        self.top = config['QUERY_STATS_TOP']
+        if not self.enabled:
+            return
+
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+
+        @app.before_request
+        def start_request_queries():
+            g.queries = RequestQueries()
+
+        @app.after_request
+        def add_server_timing(response):
+            queries = g.get('queries')
+            if queries is not None and self.server_timing:
+                # Statements a streamed body runs later are in /metrics/queries, not here
+                response.headers.add('Server-Timing', f'db;desc="{queries.count} queries";dur={queries.seconds * 1000:.2f}')
+            return response
+
+        @app.teardown_request
+        def record_request_queries(exc):
+            queries = g.pop('queries', None)
+            if queries is not None and request.url_rule is not None:
+                self._record(f'{request.method} {request.url_rule.rule}', queries)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'queries' in g:
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+            if context is not None:
+                context.query_timed = True
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        queries = g.get('queries') if has_request_context() else None
+        if queries is None:
+            return
+        queries.count += 1
+        queries.seconds += elapsed
+        queries.statements.append((statement, elapsed))
+        if elapsed >= self.slow_seconds:
+            self._log_slow(conn, statement, parameters, executemany, elapsed)
+
+    def _handle_error(self, exception_context):
+        # A statement that raised never reaches after_cursor_execute; drop its start time so the
+        # pooled connection's next statement is not timed from it
+        conn = exception_context.connection
+        if conn is not None and getattr(exception_context.execution_context, 'query_timed', False):
+            started = conn.info.get('query_started')
+            if started:
+                started.pop()
+
+    def _log_slow(self, conn, statement, parameters, executemany, elapsed):
+        plan = None
+        if self.explain and not executemany and self._should_explain(statement):
+            plan = explain(conn, statement, parameters)
+        logger.warning('Slow query (%.1f ms)', elapsed * 1000, extra={
+            'duration_ms': round(elapsed * 1000, 2),
+            'route': f'{request.method} {request.url_rule.rule}' if request.url_rule else request.path,
+            'statement': statement[:STATEMENT_CHARS],
+            'plan': plan,
+        })
+
+    def _should_explain(self, statement):
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(statement, -self.explain_interval) < self.explain_interval:
+                return False
+            if len(self._explained) >= 1000:
+                self._explained.clear()
+            self._explained[statement] = now
+        return True
+
+    def _record(self, route, queries):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    'requests': 0, 'queries': 0, 'max_queries': 0, 'db_seconds': 0.0, 'max_db_seconds': 0.0,
+                    'statements': {},  # statement -> [calls, seconds, max seconds]
+                }
+            stats['requests'] += 1
+            stats['queries'] += queries.count
+            stats['max_queries'] = max(stats['max_queries'], queries.count)
+            stats['db_seconds'] += queries.seconds
+            stats['max_db_seconds'] = max(stats['max_db_seconds'], queries.seconds)
+            statements = stats['statements']
+            for statement, seconds in queries.statements:
+                entry = statements.get(statement)
+                if entry is None:
+                    if len(statements) >= MAX_STATEMENTS_PER_ROUTE:
+                        continue
+                    entry = statements[statement] = [0, 0.0, 0.0]
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def status(self):
+        # Per-route totals for GET /metrics/queries, busiest routes (most DB time) first
+        with self._lock:
+            routes = {route: (dict(stats), [
+                (statement, tuple(entry)) for statement, entry
+                in sorted(stats['statements'].items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+            ]) for route, stats in self._routes.items()}
+        report = {}
+        for route, (stats, slowest) in sorted(routes.items(), key=lambda item: item[1][0]['db_seconds'], reverse=True):
+            requests = stats['requests']
+            report[route] = {
+                'requests': requests,
+                'queries_per_request': round(stats['queries'] / requests, 2),
+                'max_queries': stats['max_queries'],
+                'db_ms_per_request': round(stats['db_seconds'] * 1000 / requests, 2),
+                'max_db_ms': round(stats['max_db_seconds'] * 1000, 2),
+                'slowest_statements': [{
+                    'statement': statement[:STATEMENT_CHARS],
+                    'calls': calls,
+                    'avg_ms': round(seconds * 1000 / calls, 2),
+                    'max_ms': round(max_seconds * 1000, 2),
+                } for statement, (calls, seconds, max_seconds) in slowest],
+            }
+        return {'enabled': self.enabled, 'slow_query_ms': self.slow_seconds * 1000, 'routes': report}
+
+
+def explain(conn, statement, parameters):
+    """
+    The plan of a statement the request just ran, from a second cursor on the
+    same connection so it sees the same transaction; None when the database
+    has no supported EXPLAIN or it fails. On Postgres the EXPLAIN runs in a
+    savepoint, so an error there never aborts the request's transaction.
+    """
+    dialect = conn.dialect.name
+    prefix = EXPLAIN_PREFIX.get(dialect)
+    if prefix is None:
+        return None
+    savepoint = dialect == 'postgresql'
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT query_stats_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as e:
+            logger.debug('EXPLAIN failed: %s', e)
+            rows = None
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT query_stats_explain')
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT query_stats_explain')
+    except Exception as e:
+        # No transaction to hold the savepoint (autocommit), or the connection went away
+        logger.debug('EXPLAIN skipped: %s', e)
+        return None
+    finally:
+        cursor.close()
+    # Postgres: one plan line per row; SQLite: (id, parent, notused, detail)
+    return '\n'.join(str(row[-1]) for row in rows) if rows is not None else None
+
+
+query_stats = QueryStats()
@@ -1,49 +1,58 @@
 from flask import Blueprint, request, jsonify 
 from .models import Customer, Booking, Service, MealPrepBid, CateringBid, Calendar, User 
+from .listings import bids_page, bids_summary_select, bookings_page, calendar_select, full_select
+from .availability import availability, booking_conflicts, parse_window
+from .services import add_calendar_event, delete_bookings, insert_bookings_with_calendar, BID_TOTAL_COLUMNS
+from .database import pool_status
+from .etags import conditional_get
+from .idempotency import idempotent
+from .customer_cache import customer_cache
+from .query_stats import query_stats
+from .metrics import metrics
+from .passwords import passwords, HasherBusy
+from .auth import staff_required, tokens
+from .exports import EXPORTS, EXPORT_FORMATS, stream_batches, ndjson_chunks, csv_chunks
+from .schemas import CUSTOMER_LIST, USER_LIST, MEAL_PREP_BID_LIST, CATERING_BID_LIST
+from .serializers import UnknownField
 from . import db 
 from datetime import datetime 
-from sqlalchemy.exc import IntegrityError 
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import pytz 
 from pytz import timezone 
 from dateutil import parser  
-import requests 
-from werkzeug.security import check_password_hash 
-from itsdangerous import URLSafeTimedSerializer
 from werkzeug.security import generate_password_hash
-from flask import current_app
+from flask import current_app, g, stream_with_context
 from flask_mail import Message
 from sqlalchemy import UniqueConstraint
 import logging 
+import math
 from datetime import datetime, timezone, timedelta  # Add timedelta here
-logging.basicConfig(level=logging.DEBUG) 
 
 main = Blueprint('main', __name__) 
 
+# Handlers and levels are configured by create_app, not at import
 logger = logging.getLogger(__name__) 
-logger.setLevel(logging.INFO) 
 
-handler = logging.StreamHandler() 
-
-handler.setLevel(logging.INFO) 
-
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s') 
+ 
+ 
 
-handler.setFormatter(formatter) 
+# Every row of an unpaginated list endpoint; ?fields= (comma-separated keys) selects only those columns
 
-logger.addHandler(handler) 
+def full_list(schema):
+    try:
+        statement, schema = full_select(schema, request.args)
+    except UnknownField as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    return jsonify(schema.dump(db.session.execute(statement).all())), 200
 
- 
- 
 
 # Fetch all customers 
 
 @main.route('/customers', methods=['GET']) 
-
+@conditional_get('Customers')
 def get_customers(): 
 
-    customers = Customer.query.all() 
-
-    return jsonify([customer.to_dict() for customer in customers]) 
+    return full_list(CUSTOMER_LIST)
 
  
  
@@ -101,7 +110,7 @@ def soft_delete_customer(customer_id):
     customer = db.session.get(Customer, customer_id)
     if not customer:
         return jsonify({"error": "Customer not found"}), 404
-    print(f"Deactivating customer: {customer_id}, is_active: {customer.is_active}")
+    logger.debug("Deactivating customer %s (is_active=%s)", customer_id, customer.is_active)
 
     # Check if the customer has associated bookings
     bookings = db.session.query(Booking).filter(Booking.customer_id == customer_id).all()
@@ -111,7 +120,7 @@ def soft_delete_customer(customer_id):
     try:
         customer.is_active = False
         db.session.commit()
-        print(f"Customer deactivated: {customer_id}, is_active: {customer.is_active}")
+        logger.info('Customer deactivated', extra={'customer_id': customer_id})
         return jsonify({"message": "Customer deactivated successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -119,16 +128,16 @@ def soft_delete_customer(customer_id):
 
 @main.route('/customers/<int:customer_id>/reactivate', methods=['PATCH'])
 def reactivate_customer(customer_id):
-    print(f"Reactivate request received for customer ID: {customer_id}")  # Ensure route is hit
+    logger.debug("Reactivate request received for customer %s", customer_id)
     customer = db.session.get(Customer, customer_id)
     if not customer:
         return jsonify({"error": "Customer not found"}), 404
     
-    print(f"Reactivating customer: {customer_id}, is_active: {customer.is_active}")
+    logger.debug("Reactivating customer %s (is_active=%s)", customer_id, customer.is_active)
     try:
         customer.is_active = True
         db.session.commit()
-        print(f"Customer reactivated: {customer_id}, is_active: {customer.is_active}")
+        logger.info('Customer reactivated', extra={'customer_id': customer_id})
         return jsonify({"message": "Customer reactivated successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -170,49 +179,10 @@ def edit_customer(customer_id):
 # Route to fetch all meal prep bids 
 
 @main.route('/meal_prep_bids', methods=['GET']) 
-
+@conditional_get('Meal_Prep_Bids')
 def get_meal_prep_bids(): 
 
-    meal_prep_bids = MealPrepBid.query.all() 
-
-     
-
-    # Serialize the meal prep bids 
-
-    meal_prep_bids_list = [ 
-
-        { 
-
-            'meal_bid_id': bid.meal_bid_id, 
-
-            'created_at': bid.created_at.isoformat(), 
-
-            'bid_status': bid.bid_status, 
-
-            'miles': bid.miles, 
-
-            'service_fee': str(bid.service_fee), 
-
-            'estimated_groceries': str(bid.estimated_groceries), 
-
-            'estimated_bid_price': str(bid.estimated_bid_price), 
-            
-            'foods': bid.foods,
-
-            'supplies': str(bid.supplies), 
-
-            'booking_id': bid.booking_id, 
-
-            'customer_id': bid.customer_id 
-
-        } for bid in meal_prep_bids 
-
-    ] 
-
- 
- 
-
-    return jsonify(meal_prep_bids_list), 200 
+    return full_list(MEAL_PREP_BID_LIST)
 
  
  
@@ -220,54 +190,91 @@ def get_meal_prep_bids():
 # Route to fetch all catering bids 
 
 @main.route('/catering_bids', methods=['GET']) 
-
+@conditional_get('Catering_Bids')
 def get_catering_bids(): 
 
-    catering_bids = CateringBid.query.all() 
-
-     
-
-    # Serialize the catering bids 
-
-    catering_bids_list = [ 
-
-        { 
-
-            'catering_bid_id': bid.catering_bid_id, 
-
-            'created_at': bid.created_at.isoformat(), 
+    return full_list(CATERING_BID_LIST)
 
-            'bid_status': bid.bid_status, 
-
-            'miles': bid.miles, 
-
-            'service_fee': str(bid.service_fee), 
-
-            'clean_up': str(bid.clean_up), 
-
-            'decorations': str(bid.decorations), 
-
-            'estimated_groceries': str(bid.estimated_groceries), 
-
-            'foods': bid.foods, 
-
-            'estimated_bid_price': str(bid.estimated_bid_price), 
+ 
+ 
 
-            'booking_id': bid.booking_id, 
+# Fetch meal prep and catering bids together, one keyset page at a time
+# Query params: limit, after (cursor from X-Next-Cursor), bid_type (meal_prep | catering),
+# bid_status, customer_id, from / to (created_at date, YYYY-MM-DD, inclusive), fields (comma-separated keys)
 
-            'customer_id': bid.customer_id 
+BID_SUMMARY_GROUPS = ('bid_status', 'month', 'bid_type')
 
-        } for bid in catering_bids 
 
-    ] 
+@main.route('/bids', methods=['GET'])
+@conditional_get('Meal_Prep_Bids', 'Catering_Bids')
+def get_bids():
+    try:
+        page = bids_page(request.args)
+    except (ValueError, IndexError, TypeError) as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+
+    items, next_cursor = page.result(db.session.execute(page.statement).all())
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+# Bid counts and totals aggregated in SQL for the dashboard
+# Query params: group_by (comma-separated subset of bid_status, month, bid_type; default all three),
+# plus the same bid_type / bid_status / customer_id / from / to filters as GET /bids
+
+@main.route('/bids/summary', methods=['GET'])
+@conditional_get('Meal_Prep_Bids', 'Catering_Bids')
+def get_bids_summary():
+    group_by = request.args.get('group_by')
+    group_by = [g.strip() for g in group_by.split(',') if g.strip()] if group_by else list(BID_SUMMARY_GROUPS)
+    if any(g not in BID_SUMMARY_GROUPS for g in group_by):
+        return jsonify({'error': f'group_by must be a subset of {", ".join(BID_SUMMARY_GROUPS)}'}), 400
+    try:
+        statement = bids_summary_select(request.args, group_by)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    rows = db.session.execute(statement).all()
+
+    groups = [row._asdict() for row in rows]
+    totals = {'count': sum(group['count'] for group in groups)}
+    for column in BID_TOTAL_COLUMNS:
+        totals[f'total_{column}'] = sum(group[f'total_{column}'] for group in groups)
+
+    return jsonify({'group_by': group_by, 'groups': groups, 'totals': totals}), 200
+
+
+# Full-history export for accounting, streamed row batch by row batch instead of built in memory
+# Entities: bookings, meal_prep_bids, catering_bids, bids, calendar
+# Query params: format (ndjson, the default, or csv), from / to (YYYY-MM-DD, inclusive) on the entity's date
+# (requested_date for bookings, created_at for bids, event_date for calendar)
+
+@main.route('/export/<entity>', methods=['GET'])
+def export_entity(entity):
+    export = EXPORTS.get(entity)
+    if export is None:
+        return jsonify({'error': f'Unknown export. Use one of: {", ".join(EXPORTS)}'}), 404
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    try:
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
 
- 
- 
+    batches = stream_batches(export.statement(date_from, date_to), export.schema, current_app.config['EXPORT_BATCH_SIZE'])
+    if export_format == 'csv':
+        chunks = csv_chunks(batches, export.schema)
+    else:
+        chunks = ndjson_chunks(batches)
 
-    return jsonify(catering_bids_list), 200 
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response = current_app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={entity}.{extension}'
+    return response
 
- 
- 
 
 # Create a new bid based on service type 
 
@@ -278,20 +285,22 @@ def get_catering_bids():
 @main.route('/meal_prep_bids/<int:meal_bid_id>/<int:customer_id>/<int:booking_id>', methods=['PUT'])
 def update_meal_prep_bid(meal_bid_id, customer_id, booking_id):
     # Log the request
-    print(f"Received PUT request for Meal Prep Bid ID: {meal_bid_id}, Customer ID: {customer_id}")
+    logger.debug("PUT meal prep bid %s for customer %s", meal_bid_id, customer_id)
     
     data = request.json
-    print(f"Received payload: {data}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Meal prep bid payload', extra={'payload': data})
 
     # Query using both meal_bid_id and customer_id for composite primary key
     bid = MealPrepBid.query.filter_by(meal_bid_id=meal_bid_id, customer_id=customer_id, booking_id=booking_id,).first()
 
     if not bid:
-        print(f"Meal Prep Bid with ID {meal_bid_id} and Customer ID {customer_id} not found.")
+        logger.info("Meal prep bid %s for customer %s not found", meal_bid_id, customer_id)
         return jsonify({'error': 'Meal Prep Bid not found'}), 404
 
     # Log the existing state of the bid
-    print(f"Existing Meal Prep Bid: {bid.to_dict()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Existing meal prep bid', extra={'bid': bid.to_dict()})
 
     # Update fields with provided data, if any
     bid.bid_status = data.get('bid_status', bid.bid_status)
@@ -310,19 +319,19 @@ def update_meal_prep_bid(meal_bid_id, customer_id, booking_id):
         if customer:
             bid.customer_id = customer.id
         else:
-            print(f"Customer {customer_name} not found.")
+            logger.info("Customer %s not found", customer_name)
             return jsonify({'error': 'Customer not found'}), 404
 
     try:
         db.session.commit()
-        print("Meal Prep Bid successfully updated.")
+        logger.info('Meal prep bid updated', extra={'meal_bid_id': meal_bid_id})
         return jsonify(bid.to_dict()), 200
     except IntegrityError as e:
         db.session.rollback()
-        print(f"IntegrityError during update: {str(e)}")
+        logger.warning("IntegrityError updating meal prep bid %s: %s", meal_bid_id, e)
         return jsonify({'error': f'Failed to update meal prep bid: {str(e)}'}), 400
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.exception("Unexpected error updating meal prep bid %s", meal_bid_id)
         return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
 
      
@@ -330,10 +339,11 @@ def update_meal_prep_bid(meal_bid_id, customer_id, booking_id):
 @main.route('/catering_bids/<int:catering_bid_id>/<int:customer_id>/<int:booking_id>', methods=['PUT'])
 def update_catering_bid(catering_bid_id, customer_id, booking_id):
     # Log the request
-    print(f"Received PUT request for Catering Bid ID: {catering_bid_id}, Customer ID: {customer_id}")
+    logger.debug("PUT catering bid %s for customer %s", catering_bid_id, customer_id)
     
     data = request.json
-    print(f"Received payload: {data}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Catering bid payload', extra={'payload': data})
 
     # Query using the composite primary key
    # Query using both booking_id and customer_id
@@ -341,11 +351,12 @@ def update_catering_bid(catering_bid_id, customer_id, booking_id):
 
 
     if not bid:
-        print(f"Catering Bid with ID {catering_bid_id} and Customer ID {customer_id} not found.")
+        logger.info("Catering bid %s for customer %s not found", catering_bid_id, customer_id)
         return jsonify({'error': 'Catering Bid not found'}), 404
 
     # Log the existing state of the bid
-    print(f"Existing Catering Bid: {bid.to_dict()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Existing catering bid', extra={'bid': bid.to_dict()})
 
     # Update fields with provided data, if any
     bid.bid_status = data.get('bid_status', bid.bid_status)
@@ -360,20 +371,21 @@ def update_catering_bid(catering_bid_id, customer_id, booking_id):
 
     try:
         db.session.commit()
-        print("Catering Bid successfully updated.")
+        logger.info('Catering bid updated', extra={'catering_bid_id': catering_bid_id})
         return jsonify(bid.to_dict()), 200
     except IntegrityError as e:
         db.session.rollback()
-        print(f"IntegrityError during update: {str(e)}")
+        logger.warning("IntegrityError updating catering bid %s: %s", catering_bid_id, e)
         return jsonify({'error': 'Failed to update catering bid'}), 400
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+    except Exception:
+        logger.exception("Unexpected error updating catering bid %s", catering_bid_id)
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
  
  
 # POST route to create a Meal Prep bid
 @main.route('/meal_prep_bids', methods=['POST'])
+@idempotent
 def create_meal_prep_bid():
     data = request.json
     
@@ -382,7 +394,7 @@ def create_meal_prep_bid():
         return jsonify({'error': 'Booking ID and Customer ID are required.'}), 400
     
     # Check if the customer is deactivated
-    customer = Customer.query.get(data['customer_id'])
+    customer = customer_cache.get(data['customer_id'])
     if not customer or not customer.is_active:
         return jsonify({'error': 'This customer is deactivated and cannot create a bid.'}), 400
     
@@ -417,6 +429,7 @@ def create_meal_prep_bid():
 
 
 @main.route('/catering_bids', methods=['POST'])
+@idempotent
 def create_catering_bid():
     data = request.json
     
@@ -425,7 +438,7 @@ def create_catering_bid():
         return jsonify({'error': 'Booking ID and Customer ID are required.'}), 400
     
     # Check if the customer is deactivated
-    customer = Customer.query.get(data['customer_id'])
+    customer = customer_cache.get(data['customer_id'])
     if not customer or not customer.is_active:
         return jsonify({'error': 'This customer is deactivated and cannot create a bid.'}), 400
     
@@ -491,37 +504,24 @@ def delete_meal_prep_bid(meal_bid_id, customer_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
-# Fetch all bookings 
+# Fetch bookings one keyset page at a time 
+# Query params: limit, after (cursor from X-Next-Cursor), order (booking_id | requested_date),
+# customer_id, bid_status, service_type, from / to (requested_date, YYYY-MM-DD, inclusive),
+# fields (comma-separated keys)
 
 @main.route('/bookings', methods=['GET']) 
-
+@conditional_get('Bookings')
 def get_bookings(): 
+    try:
+        page = bookings_page(request.args)
+    except (ValueError, IndexError, TypeError) as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
 
-    bookings = Booking.query.all() 
-
-    return jsonify([{ 
-
-        'booking_id': b.booking_id, 
-
-        'requested_date': b.requested_date.isoformat(), 
-
-        'event_location': b.event_location, 
-
-        'event_type': b.event_type, 
-
-        'customer_id': b.customer_id, 
-
-        'number_of_guests': b.number_of_guests, 
-
-        'bid_status': b.bid_status, 
-
-        'start_time': b.start_time.isoformat() if b.start_time else None,   
-
-        'end_time': b.end_time.isoformat() if b.end_time else None, 
-
-        'service_type': b.service_type,  # Add service_type here 
-
-    } for b in bookings]) 
+    items, next_cursor = page.result(db.session.execute(page.statement).all())
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
  
  
@@ -582,18 +582,25 @@ def get_booking(booking_id):
  
 
 
+BOOKING_REQUIRED_FIELDS = [
+    'requested_date', 'event_location', 'event_type', 'customer_id',  # Ensure customer_id is included
+    'number_of_guests', 'bid_status', 'user_id', 'service_type',
+    'start_time', 'end_time'
+]
+
+# Upper bound on items accepted by POST /bookings/bulk
+MAX_BULK_BOOKINGS = 1000
+
+
 @main.route('/bookings', methods=['POST'])
+@idempotent
 def create_booking():
     data = request.json
-    print(f"Received data in POST request: {data}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Booking payload', extra={'payload': data})
 
     # Validate required fields
-    required_fields = [
-        'requested_date', 'event_location', 'event_type', 'customer_id',  # Ensure customer_id is included
-        'number_of_guests', 'bid_status', 'user_id', 'service_type',
-        'start_time', 'end_time'
-    ]
-    for field in required_fields:
+    for field in BOOKING_REQUIRED_FIELDS:
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
 
@@ -606,14 +613,14 @@ def create_booking():
         end_time = parser.isoparse(data['end_time']) if data['end_time'] else None
 
         # Log the parsed times
-        print(f"Parsed start_time: {start_time}, Parsed end_time: {end_time}")
+        logger.debug("Parsed start_time: %s, end_time: %s", start_time, end_time)
 
         # Validate that start_time and end_time are not None
         if not start_time or not end_time:
             return jsonify({'error': 'Both start_time and end_time must be provided and valid.'}), 400
 
     except ValueError as e:
-        print("Parsing error:", str(e))
+        logger.info("Booking date/time parsing error: %s", e)
         return jsonify({'error': 'Invalid date or time format.'}), 400
 
     # Check if the customer is active
@@ -622,7 +629,7 @@ def create_booking():
         return jsonify({'error': 'Customer ID is required.'}), 400
 
     
-    customer = Customer.query.get(customer_id)
+    customer = customer_cache.get(customer_id)
     if not customer:
         return jsonify({'error': 'Customer not found.'}), 404
 
@@ -631,7 +638,13 @@ def create_booking():
 
     # Extract the customer's name
     customer_name = customer.name
-    print(f"Customer found: {customer_name}")  # Log the customer name
+    logger.debug("Customer found: %s", customer_name)
+
+    # Refuse a slot another calendar event already holds (checked under a per-day lock until commit)
+    if current_app.config['BOOKING_CONFLICT_CHECK']:
+        conflicts = booking_conflicts(requested_date, start_time, end_time)
+        if conflicts:
+            return jsonify({'error': 'The booking overlaps existing calendar events.', 'conflicts': conflicts}), 409
 
     # Create the new booking object
     new_booking = Booking(
@@ -639,7 +652,6 @@ def create_booking():
     event_location=data['event_location'],
     event_type=data['event_type'],
     customer_id=customer_id,  # Make sure `customer_id` is correct
-    customer=customer,  # Make sure the relationship is set properly
     number_of_guests=data['number_of_guests'],
     bid_status=data['bid_status'],
     user_id=data['user_id'],
@@ -649,33 +661,21 @@ def create_booking():
 )
 
     try:
-        # Add to the session and commit to the database
+        # Flush to get the booking_id, then stage the calendar event in the same transaction
         db.session.add(new_booking)
+        db.session.flush()
+
+        add_calendar_event(
+            event_date=requested_date,
+            event_status='Pending',
+            event_type=data['event_type'],
+            booking_id=new_booking.booking_id,
+            customer_id=customer_id,
+            start_time=start_time.time(),
+            end_time=end_time.time()
+        )
         db.session.commit()
-        print("Booking added to the session")
-
-        # Create the associated calendar event with customer name
-        calendar_data = {
-        'event_date': requested_date.strftime('%Y-%m-%d'),
-        'event_status': 'Pending',
-        'event_type': data['event_type'],
-        'start_time': start_time.strftime('%H:%M:%S'),
-        'end_time': end_time.strftime('%H:%M:%S'),
-        'booking_id': new_booking.booking_id,
-        'customer_id': customer_id,  # Use `customer_id` here
-        'customer_name': customer.name  # Ensure `customer_name` is correctly populated
-    }
-        # Log the calendar data before sending it
-        print(f"Sending data to calendar: {calendar_data}")
-
-        # Make the POST request to the calendar service
-        calendar_response = requests.post("http://127.0.0.1:5000/calendar", json=calendar_data)
-        
-        # Check the calendar response status
-        if calendar_response.status_code != 200:
-            print(f"Failed to create calendar event: {calendar_response.status_code} - {calendar_response.text}")
-        else:
-            print(f"Calendar event created successfully: {calendar_response.text}")
+        logger.info('Booking and calendar event committed', extra={'booking_id': new_booking.booking_id})
 
         return jsonify(new_booking.to_dict()), 201
 
@@ -683,6 +683,85 @@ def create_booking():
         db.session.rollback()
         return jsonify({'error': 'Failed to add booking. Integrity error occurred.'}), 400
 
+
+# Import many bookings (and their calendar events) in a single transaction.
+# Accepts a JSON list or {"bookings": [...]}; nothing is written unless every item is valid.
+@main.route('/bookings/bulk', methods=['POST'])
+@idempotent
+def create_bookings_bulk():
+    data = request.json
+    items = data.get('bookings') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty list of bookings.'}), 400
+    if len(items) > MAX_BULK_BOOKINGS:
+        return jsonify({'error': f'At most {MAX_BULK_BOOKINGS} bookings can be imported at once.'}), 400
+
+    # Fetch every referenced customer from the cache, loading the rest with one IN query
+    customer_ids = {item.get('customer_id') for item in items if isinstance(item, dict) and item.get('customer_id')}
+    customers = customer_cache.get_many(customer_ids) if customer_ids else {}
+
+    # Validate everything up front
+    rows = []
+    results = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'error': 'Booking must be an object.'})
+            continue
+        missing = [field for field in BOOKING_REQUIRED_FIELDS if field not in item]
+        if missing:
+            results.append({'index': index, 'error': f'Missing required field: {missing[0]}'})
+            continue
+        try:
+            requested_date = datetime.strptime(item['requested_date'], '%Y-%m-%d').date()
+            start_time = parser.isoparse(item['start_time']) if item['start_time'] else None
+            end_time = parser.isoparse(item['end_time']) if item['end_time'] else None
+        except (ValueError, TypeError):
+            results.append({'index': index, 'error': 'Invalid date or time format.'})
+            continue
+        if not start_time or not end_time:
+            results.append({'index': index, 'error': 'Both start_time and end_time must be provided and valid.'})
+            continue
+
+        customer = customers.get(item['customer_id'])
+        if not customer:
+            results.append({'index': index, 'error': 'Customer not found.'})
+            continue
+        if not customer.is_active:
+            results.append({'index': index, 'error': 'This customer is deactivated and cannot make a booking.'})
+            continue
+
+        rows.append({
+            'requested_date': requested_date,
+            'event_location': item['event_location'],
+            'event_type': item['event_type'],
+            'customer_id': customer.customer_id,
+            'number_of_guests': item['number_of_guests'],
+            'bid_status': item['bid_status'],
+            'user_id': item['user_id'],
+            'service_type': item['service_type'],
+            'start_time': start_time,
+            'end_time': end_time
+        })
+        results.append({'index': index, 'status': 'valid'})
+
+    if len(rows) != len(items):
+        return jsonify({'error': 'Validation failed; no bookings were imported.', 'results': results}), 400
+
+    try:
+        booking_ids = insert_bookings_with_calendar(rows)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import bookings. Integrity error occurred.'}), 400
+
+    return jsonify({
+        'created': len(booking_ids),
+        'results': [
+            {'index': index, 'status': 'created', 'booking_id': booking_id}
+            for index, booking_id in enumerate(booking_ids)
+        ]
+    }), 201
+
  
 # Edit an existing booking 
 
@@ -692,7 +771,8 @@ def update_booking(booking_id):
 
     data = request.json 
 
-    print(f"Received data: {data}")  # Log the incoming data to check it 
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Booking update payload', extra={'payload': data})
 
  
  
@@ -761,6 +841,12 @@ def update_booking(booking_id):
 
             return jsonify({'error': 'Booking not found.'}), 404 
 
+        # Refuse a slot another calendar event already holds; the booking's own event does not count
+        if current_app.config['BOOKING_CONFLICT_CHECK']:
+            conflicts = booking_conflicts(requested_date, start_time, end_time, booking_id=booking_id)
+            if conflicts:
+                return jsonify({'error': 'The booking overlaps existing calendar events.', 'conflicts': conflicts}), 409
+
  
  
 
@@ -827,59 +913,66 @@ def update_booking(booking_id):
 
 # Delete an existing booking 
 
-@main.route('/bookings/<int:booking_id>', methods=['DELETE']) 
-
-def delete_booking(booking_id): 
+@main.route('/bookings/<int:booking_id>', methods=['DELETE'])
+def delete_booking(booking_id):
+    # Its calendar events, services and bids go with it
+    deleted, _ = delete_bookings([booking_id])
+    if not deleted:
+        db.session.rollback()
+        return jsonify({'error': 'Booking not found'}), 404
+    db.session.commit()
+    return jsonify({'message': 'Booking deleted successfully'}), 200
 
-    booking = Booking.query.get(booking_id) 
 
-    if not booking: 
+# Delete many bookings, with their calendar events, services and bids, in one transaction
 
-        return jsonify({'error': 'Booking not found'}), 404 
+@main.route('/bookings/bulk_delete', methods=['POST'])
+def delete_bookings_bulk():
+    data = request.json
+    booking_ids = data.get('booking_ids') if isinstance(data, dict) else data
+    if not isinstance(booking_ids, list) or not booking_ids or not all(type(i) is int for i in booking_ids):
+        return jsonify({'error': 'Expected a non-empty list of booking IDs.'}), 400
+    if len(booking_ids) > MAX_BULK_BOOKINGS:
+        return jsonify({'error': f'At most {MAX_BULK_BOOKINGS} bookings can be deleted at once.'}), 400
 
- 
- 
+    deleted, counts = delete_bookings(booking_ids)
+    db.session.commit()
+    return jsonify({
+        'deleted': deleted,
+        'not_found': sorted(set(booking_ids) - set(deleted)),
+        'rows': counts
+    }), 200
 
-    db.session.delete(booking) 
 
-    db.session.commit() 
+# Fetch calendar events, optionally limited to an event_date window (from / to, YYYY-MM-DD, inclusive)
+# and to some keys (fields, comma-separated) 
 
-    return jsonify({'message': 'Booking deleted successfully'}), 200 
+@main.route('/calendar', methods=['GET'])
+@conditional_get('Calendar', 'Customers')
+def get_calendar_events():
+    try:
+        statement, schema = calendar_select(request.args)
+    except UnknownField as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
 
+    # Reads the customer's name in the same query (LEFT OUTER JOIN) instead of one lookup per event
+    return jsonify(schema.dump(db.session.execute(statement).all()))
  
  
 
-# Fetch all calendar events 
+# Free and taken time between from and to (YYYY-MM-DD or ISO 8601 datetimes; a to date is inclusive)
 
-@main.route('/calendar', methods=['GET'])
-def get_calendar_events():
-    # Fetch all events
-    events = Calendar.query.all()
-    
-    # Prepare a list to hold the response data
-    response_data = []
-
-    for event in events:
-        # Fetch the customer based on customer_id
-        customer = Customer.query.get(event.customer_id)  # Assuming customer_id is a field in Calendar
-        
-        # Append the event data along with the customer name (if exists)
-        response_data.append({
-            'event_id': event.event_id,
-            'created_at': event.created_at.isoformat() if event.created_at else None,
-            'event_date': event.event_date.isoformat() if event.event_date else None,
-            'event_status': event.event_status,
-            'customer_id': event.customer_id,  # Keep the customer_id
-            'customer_name': customer.name if customer else None,  # Get customer name safely
-            'event_type': event.event_type,
-            'booking_id': event.booking_id,
-            'start_time': event.start_time.isoformat() if event.start_time else None,
-            'end_time': event.end_time.isoformat() if event.end_time else None
-        })
+@main.route('/availability', methods=['GET'])
+@conditional_get('Calendar')
+def get_availability():
+    try:
+        start, end = parse_window(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(availability(start, end))
 
-    return jsonify(response_data)
- 
- 
 
 # Fetch a specific event by booking_id 
 
@@ -959,8 +1052,6 @@ def add_to_calendar():
 
         # Parse start_time and end_time as time (HH:MM:SS) 
 
-        tz = pytz.timezone('America/Chicago')  # Set to your desired timezone, e.g., 'America/Chicago' 
-
         start_time = datetime.strptime(data['start_time'], '%H:%M:%S').time() 
 
         end_time = datetime.strptime(data['end_time'], '%H:%M:%S').time() 
@@ -968,15 +1059,6 @@ def add_to_calendar():
  
  
 
-        # Combine event_date with start_time and end_time and localize them to the timezone 
-
-        start_time = tz.localize(datetime.combine(event_date, start_time)).time() 
-
-        end_time = tz.localize(datetime.combine(event_date, end_time)).time() 
-
- 
- 
-
     except ValueError as e: 
 
         return jsonify({'error': f'Invalid date or time format: {str(e)}'}), 400 
@@ -984,30 +1066,19 @@ def add_to_calendar():
  
  
 
-    # Create new calendar event 
-
-    new_event = Calendar( 
-
-        event_date=event_date, 
-
-        event_status=data['event_status'], 
-
-        event_type=data['event_type'], 
-
-        booking_id=data['booking_id'], 
-
-        start_time=start_time,  # Store as time with timezone 
-
-        end_time=end_time  # Store as time with timezone 
-
-    ) 
-
- 
- 
-
     try: 
 
-        db.session.add(new_event) 
+        # Create new calendar event 
+
+        add_calendar_event(
+            event_date=event_date,
+            event_status=data['event_status'],
+            event_type=data['event_type'],
+            booking_id=data['booking_id'],
+            customer_id=data.get('customer_id'),
+            start_time=start_time,
+            end_time=end_time
+        )
 
         db.session.commit() 
 
@@ -1027,7 +1098,8 @@ def add_to_calendar():
 @main.route('/calendar/<int:event_id>', methods=['PUT'])
 def update_calendar_event(event_id):
     data = request.json
-    print(f"Updated event data: {data}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Calendar event update payload', extra={'payload': data})
 
     try:
         # Parse incoming data
@@ -1059,182 +1131,137 @@ def update_calendar_event(event_id):
         return jsonify({'message': 'Event and booking updated successfully.'}), 200
 
     except ValueError as e:
-        print(f"Date or time parsing error: {e}")
+        logger.info("Calendar event date/time parsing error: %s", e)
         return jsonify({'error': 'Invalid date or time format.'}), 400
-    except Exception as e:
-        print(f"Update error: {e}")
+    except Exception:
+        logger.exception("Failed to update calendar event %s", event_id)
         db.session.rollback()
         return jsonify({'error': 'Failed to update event or booking.'}), 500
 
      
-@main.route('/login', methods=['POST']) 
-
-def login(): 
-
-    data = request.get_json() 
-
-    if not data or 'username' not in data or 'password' not in data: 
-
-        return jsonify({'message': 'Username and password are required'}), 400 
-
-
-    username = data['username'] 
-
-    password = data['password'] 
-
-    # Query the database for the user 
-
-    user = User.query.filter_by(username=username).first() 
-
-    if user: 
-
-        # Temporarily comparing plain-text passwords for existing users (for testing) 
-
-        if user.password == password: 
-
-            return jsonify({ 
-
-                'message': 'Login successful', 
-
-                'user': user.to_dict()  # Convert user data to dictionary 
-
-            }), 200 
-
-        else: 
-
-            return jsonify({'message': 'Invalid username or password'}), 401 
-
-    else: 
-
-        return jsonify({'message': 'Invalid username or password'}), 401 
-
- 
-
-@main.route('/bookings_and_calendar/<int:booking_id>', methods=['DELETE']) 
-
-def delete_booking_and_calendar(booking_id): 
-
-    try: 
-
-        logger.info(f"Attempting to delete booking with ID {booking_id}") 
-
-         
-
-        # Start a transaction 
-
-        with db.session.begin(): 
-
-            # Try to get the booking first 
-
-            booking = Booking.query.get(booking_id) 
-
-            if not booking: 
-
-                logger.info(f"Booking {booking_id} not found. Proceeding to delete associated calendar events.") 
-
-                 
-
-                # Fetch and delete the associated calendar events (if booking doesn't exist) 
-
-                calendar_events = Calendar.query.filter_by(booking_id=booking_id).all() 
-
-                if not calendar_events: 
-
-                    logger.error(f"No calendar events found for booking {booking_id}") 
-
-                    return jsonify({"error": "No associated calendar events found"}), 404 
-
-                else: 
-
-                    logger.info(f"Found {len(calendar_events)} calendar events for booking {booking_id}, deleting them.") 
-
-                     
-
-                for calendar_event in calendar_events: 
-
-                    try: 
-
-                        db.session.delete(calendar_event) 
-
-                        logger.info(f"Deleted calendar event with ID {calendar_event.event_id} for booking {booking_id}") 
-
-                    except Exception as e: 
-
-                        logger.error(f"Error deleting calendar event {calendar_event.event_id}: {str(e)}") 
-
-                        db.session.rollback() 
-
-                        return jsonify({"error": f"Error deleting calendar event {calendar_event.event_id}: {str(e)}"}), 500 
-
-                 
-
-                # Commit the transaction (only the calendar events are deleted in this case) 
-
-                db.session.commit() 
-
-                logger.info(f"Successfully committed changes: deleted calendar events for booking {booking_id}") 
-
-                return jsonify({"message": "Calendar events deleted successfully, but the booking doesn't exist."}), 200 
-
- 
- 
-
-            else: 
-
-                # If the booking exists, delete the associated calendar events 
-
-                calendar_events = Calendar.query.filter_by(booking_id=booking_id).all() 
-
-                for calendar_event in calendar_events: 
-
-                    db.session.delete(calendar_event) 
+@main.route('/login', methods=['POST'])
+def login():
+    data = request.get_json()
+    if not data or 'username' not in data or 'password' not in data:
+        return jsonify({'message': 'Username and password are required'}), 400
+    username = data['username']
+    password = data['password']
+    if not isinstance(username, str) or not isinstance(password, str):
+        return jsonify({'message': 'Username and password are required'}), 400
+
+    # Refused before any lookup or hashing once this username or address has failed too often
+    address = request.remote_addr
+    retry_after = passwords.retry_after(username, address)
+    if retry_after:
+        response = jsonify({'message': 'Too many failed login attempts. Try again later.'})
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response, 429
+
+    user = User.query.filter_by(username=username).first()
+    try:
+        verified = passwords.verify(user, password)
+    except HasherBusy:
+        response = jsonify({'message': 'The server is busy. Try again shortly.'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    if not verified:
+        passwords.record_failure(username, address)
+        return jsonify({'message': 'Invalid username or password'}), 401
+    passwords.record_success(username, address)
+    token, expires_in = tokens.issue(user)
+    return jsonify({
+        'message': 'Login successful',
+        'user': user.to_dict(),  # Convert user data to dictionary
+        'access_token': token,
+        'token_type': 'Bearer',
+        'expires_in': expires_in
+    }), 200
+
+
+# Revoke the access token the request carries, on every worker
+
+@main.route('/logout', methods=['POST'])
+def logout():
+    if g.get('auth') is None:
+        return jsonify({'error': 'Authentication required.'}), 401, {'WWW-Authenticate': 'Bearer'}
+    tokens.revoke(g.auth)
+    return jsonify({'message': 'Logged out'}), 200
+
+
+@main.route('/bookings_and_calendar/<int:booking_id>', methods=['DELETE'])
+def delete_booking_and_calendar(booking_id):
+    logger.info("Attempting to delete booking with ID %s", booking_id)
+    try:
+        # The booking and everything hanging off it, in one transaction
+        deleted, counts = delete_bookings([booking_id])
+        if not deleted and not counts['Calendar']:
+            db.session.rollback()
+            logger.info("Booking %s not found and has no calendar events", booking_id)
+            return jsonify({"error": "No associated calendar events found"}), 404
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("SQLAlchemyError during the deletion of booking %s and calendar events: %s", booking_id, e)
+        return jsonify({"error": f"SQLAlchemyError during the deletion: {str(e)}"}), 500
 
-                    logger.info(f"Deleted calendar event with ID {calendar_event.event_id} for booking {booking_id}") 
+    logger.info("Deleted booking %s: %s", booking_id, counts)
+    if not deleted:
+        return jsonify({"message": "Calendar events deleted successfully, but the booking doesn't exist."}), 200
+    return jsonify({"message": "Booking and associated calendar events deleted successfully"}), 200
 
-                 
 
-                # Now delete the booking itself 
 
-                db.session.delete(booking) 
+# Prometheus metrics: requests, latency, pool and cache state summed over all workers
 
-                logger.info(f"Deleted booking with ID {booking_id}") 
+@main.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
-                 
 
-                # Commit the transaction 
+# Connection pool state and checkout counters for this worker
 
-                db.session.commit() 
+@main.route('/metrics/pool', methods=['GET'])
+@staff_required
+def get_pool_metrics():
+    return jsonify(pool_status(db.engine)), 200
 
-                logger.info(f"Successfully committed changes for booking {booking_id} and its associated calendar events") 
 
-             
+# Per-route SQL counts, DB time and slowest statements for this worker
 
-            return jsonify({"message": "Booking and associated calendar events deleted successfully"}), 200 
+@main.route('/metrics/queries', methods=['GET'])
+@staff_required
+def get_query_metrics():
+    return jsonify(query_stats.status()), 200
 
- 
- 
 
-    except SQLAlchemyError as e: 
+# Customer summary cache hit/miss counters for this worker
 
-        db.session.rollback() 
+@main.route('/metrics/customer_cache', methods=['GET'])
+@staff_required
+def get_customer_cache_metrics():
+    return jsonify(customer_cache.status()), 200
 
-        logger.error(f"SQLAlchemyError during the deletion of booking {booking_id} and calendar events: {str(e)}") 
 
-        return jsonify({"error": f"SQLAlchemyError during the deletion: {str(e)}"}), 500 
+# Access token settings and revocation denylist state for this worker
 
-    except Exception as e: 
+@main.route('/metrics/auth', methods=['GET'])
+@staff_required
+def get_auth_metrics():
+    return jsonify(tokens.status()), 200
 
-        logger.error(f"Unexpected error occurred while deleting booking {booking_id}: {str(e)}") 
 
-        return jsonify({"error": f"Unexpected error: {str(e)}"}), 500 
+# Password hash pool and failed-login throttling counters for this worker
 
- 
+@main.route('/metrics/passwords', methods=['GET'])
+@staff_required
+def get_password_metrics():
+    return jsonify(passwords.status()), 200
 
-# Create a token serializer
-serializer = URLSafeTimedSerializer(current_app.secret_key)
 
 
 @main.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users]), 200
+    return full_list(USER_LIST)
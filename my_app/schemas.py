@@ -0,0 +1,99 @@
+from .models import Booking, Calendar, CateringBid, Customer, MealPrepBid, User
+from .serializers import Field, Schema, iso
+from .services import bids_union
+
+# Output shapes of the list endpoints, read as plain column tuples (see serializers.Schema).
+# Keys, order and value formats match what the routes returned when they built dicts by hand.
+
+CUSTOMER_LIST = Schema(
+    Field('customer_id', Customer.customer_id),
+    Field('name', Customer.name),
+    Field('email', Customer.email),
+    Field('phone_number', Customer.phone_number),
+    Field('is_active', Customer.is_active),
+)
+
+USER_LIST = Schema(
+    Field('user_id', User.user_id),
+    Field('created_at', User.created_at, iso),
+    Field('username', User.username),
+    Field('email', User.email),
+    Field('Password_reset_token', User.Password_reset_token),
+)
+
+BOOKING_LIST = Schema(
+    Field('booking_id', Booking.booking_id),
+    Field('requested_date', Booking.requested_date, iso),
+    Field('event_location', Booking.event_location),
+    Field('event_type', Booking.event_type),
+    Field('customer_id', Booking.customer_id),
+    Field('number_of_guests', Booking.number_of_guests),
+    Field('bid_status', Booking.bid_status),
+    Field('start_time', Booking.start_time, iso),
+    Field('end_time', Booking.end_time, iso),
+    Field('service_type', Booking.service_type),
+)
+
+# Calendar rows carry the customer's name from a LEFT OUTER JOIN on Customers
+CALENDAR_LIST = Schema(
+    Field('event_id', Calendar.event_id),
+    Field('created_at', Calendar.created_at, iso),
+    Field('event_date', Calendar.event_date, iso),
+    Field('event_status', Calendar.event_status),
+    Field('customer_id', Calendar.customer_id),
+    Field('customer_name', Customer.name),
+    Field('event_type', Calendar.event_type),
+    Field('booking_id', Calendar.booking_id),
+    Field('start_time', Calendar.start_time, iso),
+    Field('end_time', Calendar.end_time, iso),
+)
+
+# The legacy bid listings return money fields as strings
+MEAL_PREP_BID_LIST = Schema(
+    Field('meal_bid_id', MealPrepBid.meal_bid_id),
+    Field('created_at', MealPrepBid.created_at, iso),
+    Field('bid_status', MealPrepBid.bid_status),
+    Field('miles', MealPrepBid.miles),
+    Field('service_fee', MealPrepBid.service_fee, str),
+    Field('estimated_groceries', MealPrepBid.estimated_groceries, str),
+    Field('estimated_bid_price', MealPrepBid.estimated_bid_price, str),
+    Field('foods', MealPrepBid.foods),
+    Field('supplies', MealPrepBid.supplies, str),
+    Field('booking_id', MealPrepBid.booking_id),
+    Field('customer_id', MealPrepBid.customer_id),
+)
+
+CATERING_BID_LIST = Schema(
+    Field('catering_bid_id', CateringBid.catering_bid_id),
+    Field('created_at', CateringBid.created_at, iso),
+    Field('bid_status', CateringBid.bid_status),
+    Field('miles', CateringBid.miles),
+    Field('service_fee', CateringBid.service_fee, str),
+    Field('clean_up', CateringBid.clean_up, str),
+    Field('decorations', CateringBid.decorations, str),
+    Field('estimated_groceries', CateringBid.estimated_groceries, str),
+    Field('foods', CateringBid.foods),
+    Field('estimated_bid_price', CateringBid.estimated_bid_price, str),
+    Field('booking_id', CateringBid.booking_id),
+    Field('customer_id', CateringBid.customer_id),
+)
+
+# GET /bids reads from one shared UNION ALL subquery
+BIDS = bids_union()
+
+BID_LIST = Schema(
+    Field('bid_type', BIDS.c.bid_type),
+    Field('bid_id', BIDS.c.bid_id),
+    Field('created_at', BIDS.c.created_at, iso),
+    Field('bid_status', BIDS.c.bid_status),
+    Field('miles', BIDS.c.miles),
+    Field('service_fee', BIDS.c.service_fee),
+    Field('estimated_groceries', BIDS.c.estimated_groceries),
+    Field('estimated_bid_price', BIDS.c.estimated_bid_price),
+    Field('foods', BIDS.c.foods),
+    Field('booking_id', BIDS.c.booking_id),
+    Field('customer_id', BIDS.c.customer_id),
+    Field('supplies', BIDS.c.supplies),
+    Field('clean_up', BIDS.c.clean_up),
+    Field('decorations', BIDS.c.decorations),
+)
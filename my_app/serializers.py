@@ -0,0 +1,107 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to Flask's stdlib json encoder
+    orjson = None
+
+
+def iso(value):
+    # date / datetime / time -> ISO 8601 string, None stays None
+    return value.isoformat() if value is not None else None
+
+
+class UnknownField(ValueError):
+    # A ?fields= key the schema does not have
+    pass
+
+
+class Field:
+    # One output key, the column (or labelled expression) it is read from, and an optional converter
+
+    def __init__(self, key, column, convert=None):
+        self.key = key
+        self.column = column.label(key) if column.key != key else column
+        self.convert = convert
+
+
+class Schema:
+    """
+    Column-level description of a list response. `columns` goes straight into
+    select() / session.query(), so no ORM objects are built, and dump() turns
+    the resulting row tuples into plain dicts ready for the JSON encoder.
+    """
+
+    def __init__(self, *fields, extra=()):
+        self.fields = fields
+        # `extra` fields are selected but not dumped: they come last, past the end of the keys zip() reads
+        self.columns = [field.column for field in fields] + [field.column for field in extra]
+        self._keys = [field.key for field in fields]
+        self._converters = [(field.key, field.convert) for field in fields if field.convert]
+        self._narrowed = {}
+
+    def only(self, fields, keep=()):
+        """
+        This schema cut down to a ?fields= value (comma-separated keys, kept in
+        schema order), so the statement selects only those columns; all of them
+        when `fields` is empty. Keys in `keep` (keyset cursor columns) are still
+        selected but only returned if asked for. Raises UnknownField for unknown keys.
+        """
+        if not fields:
+            return self
+        names = frozenset(name.strip() for name in fields.split(',') if name.strip())
+        if not names:
+            return self
+        cache_key = (names, tuple(keep))
+        schema = self._narrowed.get(cache_key)
+        if schema is None:
+            unknown = sorted(names.difference(self._keys))
+            if unknown:
+                raise UnknownField(f"unknown field {', '.join(unknown)}; fields are {', '.join(self._keys)}")
+            schema = Schema(
+                *[field for field in self.fields if field.key in names],
+                extra=[field for field in self.fields if field.key in keep and field.key not in names],
+            )
+            if len(self._narrowed) < 256:  # Distinct ?fields= sets cached per schema
+                self._narrowed[cache_key] = schema
+        return schema
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def dump(self, rows):
+        keys, converters = self._keys, self._converters
+        items = []
+        for row in rows:
+            item = dict(zip(keys, row))
+            for key, convert in converters:
+                item[key] = convert(item[key])
+            items.append(item)
+        return items
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() backend that uses orjson when it is installed. Keys are not sorted
+    and dates still go through Flask's default() hook, so output only differs
+    from the stdlib provider in key order and whitespace.
+    """
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_dumps(obj), mimetype=self.mimetype)
+
+    def _orjson_dumps(self, obj):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=options)
@@ -0,0 +1,183 @@
+from datetime import datetime
+
+import pytz
+from sqlalchemy import BigInteger, any_, bindparam, delete, func, insert, literal_column, null, select, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from . import db
+from .etags import mark_tables_changed
+from .models import Booking, Calendar, CateringBid, MealPrepBid, Service
+
+# Calendar times are stored as wall-clock times in the business timezone
+CALENDAR_TZ = pytz.timezone('America/Chicago')
+
+
+def localize_event_times(event_date, start_time, end_time):
+    # Combine event_date with start_time and end_time and localize them to the timezone
+    start_time = CALENDAR_TZ.localize(datetime.combine(event_date, start_time)).time()
+    end_time = CALENDAR_TZ.localize(datetime.combine(event_date, end_time)).time()
+    return start_time, end_time
+
+
+def add_calendar_event(event_date, event_status, event_type, booking_id, start_time, end_time, customer_id=None):
+    """
+    Stage a Calendar row in the current session. The caller owns the transaction,
+    so a booking and its calendar event can be committed together.
+    """
+    start_time, end_time = localize_event_times(event_date, start_time, end_time)
+    event = Calendar(
+        event_date=event_date,
+        event_status=event_status,
+        event_type=event_type,
+        booking_id=booking_id,
+        customer_id=customer_id,
+        start_time=start_time,  # Store as time with timezone
+        end_time=end_time  # Store as time with timezone
+    )
+    db.session.add(event)
+    return event
+
+
+def insert_bookings_with_calendar(booking_rows, event_status='Pending'):
+    """
+    Insert many bookings and one calendar event per booking using two multi-row
+    INSERT statements in the current transaction (the caller commits).
+
+    `booking_rows` are dicts of Booking column values whose start_time / end_time
+    are datetimes. Returns the new booking_ids in the same order.
+    """
+    if not booking_rows:
+        return []
+
+    booking_ids = db.session.scalars(
+        insert(Booking).returning(Booking.booking_id, sort_by_parameter_order=True),
+        booking_rows
+    ).all()
+
+    calendar_rows = []
+    for booking_id, row in zip(booking_ids, booking_rows):
+        start_time, end_time = localize_event_times(
+            row['requested_date'], row['start_time'].time(), row['end_time'].time()
+        )
+        calendar_rows.append({
+            'event_date': row['requested_date'],
+            'event_status': event_status,
+            'event_type': row['event_type'],
+            'booking_id': booking_id,
+            'customer_id': row['customer_id'],
+            'start_time': start_time,
+            'end_time': end_time
+        })
+    db.session.execute(insert(Calendar), calendar_rows)
+
+    return booking_ids
+
+
+# Rows that belong to a booking and go with it when it is deleted
+BOOKING_DEPENDENTS = (Calendar, Service, MealPrepBid, CateringBid)
+
+
+def delete_bookings_select(booking_ids):
+    # PostgreSQL: one row of the dependents' deleted counts (BOOKING_DEPENDENTS order), then the deleted booking ids
+    ids = bindparam('booking_ids', booking_ids, type_=ARRAY(BigInteger))
+    deletes = [
+        delete(model.__table__).where(model.__table__.c.booking_id == any_(ids))
+        .returning(model.__table__.c.booking_id).cte(f'deleted_{model.__tablename__.lower()}')
+        for model in BOOKING_DEPENDENTS + (Booking,)
+    ]
+    return select(
+        *[select(func.count()).select_from(cte).scalar_subquery() for cte in deletes[:-1]],
+        select(func.array_agg(deletes[-1].c.booking_id)).scalar_subquery(),
+    )
+
+
+def delete_bookings(booking_ids):
+    """
+    Delete bookings together with their Calendar, Service, MealPrepBid and
+    CateringBid rows in the current transaction (the caller commits; rolling
+    back undoes all of it). Dependent rows go even when their booking no
+    longer exists. Returns the ids of the bookings that were deleted and the
+    number of rows removed per table.
+
+    On PostgreSQL this is one statement, the dependents' DELETEs running as
+    CTEs of the bookings' (foreign keys are checked at the end of the
+    statement, when the dependents are already gone); elsewhere one bulk
+    DELETE per table. Nothing is loaded into the session.
+    """
+    booking_ids = sorted(set(booking_ids))
+    if not booking_ids:
+        return [], {}
+
+    if db.engine.dialect.name == 'postgresql':
+        row = db.session.execute(delete_bookings_select(booking_ids)).one()
+        deleted = sorted(row[-1] or [])
+        counts = {model.__tablename__: count for model, count in zip(BOOKING_DEPENDENTS, row[:-1])}
+        counts[Booking.__tablename__] = len(deleted)
+        # A SELECT to the ETag hooks, so mark the tables here
+        mark_tables_changed(db.session, [table for table, count in counts.items() if count])
+        return deleted, counts
+
+    counts = {
+        model.__tablename__: db.session.execute(
+            delete(model).where(model.booking_id.in_(booking_ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        for model in BOOKING_DEPENDENTS
+    }
+    deleted = sorted(db.session.scalars(
+        delete(Booking).where(Booking.booking_id.in_(booking_ids))
+        .returning(Booking.booking_id).execution_options(synchronize_session=False)
+    ).all())
+    counts[Booking.__tablename__] = len(deleted)
+    return deleted, counts
+
+
+# Money / distance columns summed by GET /bids/summary
+BID_TOTAL_COLUMNS = ['service_fee', 'estimated_groceries', 'estimated_bid_price', 'miles']
+
+
+def bids_union():
+    """
+    Meal prep and catering bids as one subquery (UNION ALL) with a common column
+    set. bid_type tells the kinds apart; kind-specific columns are NULL on the
+    other side.
+    """
+    meal_prep = select(
+        literal_column("'meal_prep'").label('bid_type'),
+        MealPrepBid.meal_bid_id.label('bid_id'),
+        MealPrepBid.created_at,
+        MealPrepBid.bid_status,
+        MealPrepBid.miles,
+        MealPrepBid.service_fee,
+        MealPrepBid.estimated_groceries,
+        MealPrepBid.estimated_bid_price,
+        MealPrepBid.foods,
+        MealPrepBid.booking_id,
+        MealPrepBid.customer_id,
+        MealPrepBid.supplies,
+        null().label('clean_up'),
+        null().label('decorations')
+    )
+    catering = select(
+        literal_column("'catering'").label('bid_type'),
+        CateringBid.catering_bid_id.label('bid_id'),
+        CateringBid.created_at,
+        CateringBid.bid_status,
+        CateringBid.miles,
+        CateringBid.service_fee,
+        CateringBid.estimated_groceries,
+        CateringBid.estimated_bid_price,
+        CateringBid.foods,
+        CateringBid.booking_id,
+        CateringBid.customer_id,
+        null().label('supplies'),
+        CateringBid.clean_up,
+        CateringBid.decorations
+    )
+    return union_all(meal_prep, catering).subquery('bids')
+
+
+def month_of(column):
+    # 'YYYY-MM' bucket for a timestamp column, computed in the database
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(column, literal_column("'YYYY-MM'"))
+    return func.strftime(literal_column("'%Y-%m'"), column)
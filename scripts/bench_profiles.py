@@ -0,0 +1,85 @@
+"""
+Run the app under each gunicorn.conf.py profile (sync, gthread, gevent,
+async) and load-test it with the same read-only request mix, to pick
+GUNICORN_PROFILE for a deployment.
+
+    DATABASE_URL=postgresql://postgres@localhost/cyds_bench DB_SSLMODE=disable \\
+        python scripts/bench_profiles.py --concurrency 32 --db-latency-ms 20
+
+Each profile uses its own process / thread sizing unless --workers is
+given (WEB_CONCURRENCY), so compare the RSS column as well as req/s: the
+best profile is the one with the highest req/s and an acceptable p99 for
+the memory the instance has. --db-latency-ms adds a delaying proxy in front
+of a local database to mimic the round trip to Supabase (see
+compare_async.py); leave it off when pointing at the real database.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compare_async import ROOT, load, rss_mb, start_latency_proxy, wait_for_port  # noqa: E402
+
+PROFILES = ['sync', 'gthread', 'gevent', 'async']
+
+# Paginated listings, a calendar month and single-row lookups, like the dashboard's polling
+DEFAULT_ROUTES = [
+    '/bookings?limit=50',
+    '/bids?limit=50',
+    '/calendar?from=2024-03-01&to=2024-03-31',
+    '/bookings/{booking_id}',
+    '/calendar/{booking_id}',
+]
+
+
+def run_profile(profile, args, env):
+    env = dict(env, GUNICORN_PROFILE=profile)
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+               '--bind', f'127.0.0.1:{args.port}', '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        wait_for_port(args.port)
+        asyncio.run(load(args.port, args.routes, args.concurrency, 2))  # Warm up pools and caches
+        latencies, errors = asyncio.run(load(args.port, args.routes, args.concurrency, args.duration))
+        memory = rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(f'{profile:8} {len(latencies) / args.duration:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+          f'p99 {p99 * 1000:7.1f} ms  errors {errors}  RSS {memory:6.1f} MB', flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=PROFILES, action='append', help='run only this profile (repeatable)')
+    parser.add_argument('--workers', type=int, help='same process count for every profile')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent keep-alive clients (default 32)')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per profile (default 15)')
+    parser.add_argument('--db-latency-ms', type=float, default=0, help='simulated database round trip')
+    parser.add_argument('--booking-id', type=int, default=1, help='id used by the single-booking routes')
+    parser.add_argument('--port', type=int, default=8732)
+    parser.add_argument('--route', dest='routes', action='append', help='GET path to request (repeatable)')
+    args = parser.parse_args()
+    args.routes = [route.format(booking_id=args.booking_id) for route in args.routes or DEFAULT_ROUTES]
+
+    env = dict(os.environ, LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+    if not env.get('DATABASE_URL', '').startswith('postgres'):
+        sys.exit('bench_profiles.py needs a PostgreSQL DATABASE_URL')
+    if args.db_latency_ms:
+        env['DATABASE_URL'] = start_latency_proxy(env['DATABASE_URL'], args.db_latency_ms)
+
+    for profile in args.profile or PROFILES:
+        run_profile(profile, args, env)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Time the JSON list endpoints end to end (query, row -> dict, encode) through
+Flask's test client against a local Postgres, each in full and again with
+the ?fields= a typical frontend view asks for, showing the payload and time
+the sparse fieldset saves.
+
+    DATABASE_URL=postgresql://postgres@localhost/cyds_bench DB_SSLMODE=disable \\
+        python scripts/bench_serialization.py --seed 10000
+
+--seed tops every table up to that many rows first (see bench/seed.py);
+only point it at a throwaway database.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench.seed import seed  # noqa: E402
+from my_app import create_app, db  # noqa: E402
+
+ROUTES = [
+    '/customers',
+    '/users',
+    '/meal_prep_bids',
+    '/catering_bids',
+    '/bookings?limit=100',
+    '/calendar',
+    '/bids?limit=100',
+]
+
+# ?fields= of a list view for each route: a picker, a table, a month grid
+SPARSE_FIELDS = {
+    '/customers': 'customer_id,name,is_active',
+    '/users': 'user_id,username',
+    '/meal_prep_bids': 'meal_bid_id,bid_status,estimated_bid_price,booking_id',
+    '/catering_bids': 'catering_bid_id,bid_status,estimated_bid_price,booking_id',
+    '/bookings?limit=100': 'booking_id,requested_date,bid_status,customer_id',
+    '/calendar': 'event_id,event_date,event_status,start_time',
+    '/bids?limit=100': 'bid_type,bid_id,bid_status,estimated_bid_price',
+}
+
+
+def time_route(client, route, runs):
+    # (median seconds, response) over `runs` requests after a warm-up one
+    response = client.get(route)  # Warm up the pool and compiled statement cache
+    if response.status_code != 200:
+        sys.exit(f'{route} returned {response.status_code}')
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(route)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, metavar='ROWS', help='top every table up to ROWS rows first')
+    parser.add_argument('--runs', type=int, default=20, help='timed requests per route (default 20)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            sys.exit('bench_serialization.py needs a PostgreSQL DATABASE_URL')
+        if args.seed:
+            seed(args.seed)
+
+    client = app.test_client()
+    for route in ROUTES:
+        median, response = time_route(client, route, args.runs)
+        size = len(response.data)
+        print(f'{route:24} {len(response.get_json()):6} items  {median * 1000:8.2f} ms  {1 / median:7.1f} req/s  '
+              f'{size / 1024:8.1f} KiB')
+        fields = SPARSE_FIELDS[route]
+        sparse_median, sparse = time_route(client, f"{route}{'&' if '?' in route else '?'}fields={fields}", args.runs)
+        print(f"{'  with ?fields=':24} {len(fields.split(',')):6} keys   {sparse_median * 1000:8.2f} ms  "
+              f"{1 / sparse_median:7.1f} req/s  {len(sparse.data) / 1024:8.1f} KiB  "
+              f"({(1 - len(sparse.data) / size) * 100:.0f}% smaller, {(1 - sparse_median / median) * 100:.0f}% faster)")
+
+
+if __name__ == '__main__':
+    main()
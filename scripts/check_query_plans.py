@@ -0,0 +1,173 @@
+"""
+Run EXPLAIN ANALYZE on the query behind every route against a local Postgres
+and fail if any of them needs a sequential scan.
+
+    DATABASE_URL=postgresql://postgres@localhost/cyds_plans DB_SSLMODE=disable \\
+        python scripts/check_query_plans.py --seed 100000
+
+--seed tops every table up to that many rows first (bench/seed.py). Only point
+it at a throwaway database, never at Supabase. Apply the migrations before
+running (flask --app app db upgrade) so the plans reflect the real indexes.
+
+Queries that read a whole table by design (unpaginated listings, aggregates)
+are reported but never fail the check.
+"""
+import argparse
+import hashlib
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import select  # noqa: E402
+
+from bench.seed import seed  # noqa: E402
+from my_app import create_app, db  # noqa: E402
+from my_app.availability import overlapping_select  # noqa: E402
+from my_app.exports import EXPORTS  # noqa: E402
+from my_app.idempotency import lookup_select  # noqa: E402
+from my_app.listings import bids_page, bids_summary_select, bookings_page, calendar_select, full_select  # noqa: E402
+from my_app.models import Booking, Calendar, CateringBid, Customer, IdempotencyKey, MealPrepBid, User  # noqa: E402
+from my_app.pagination import encode_cursor  # noqa: E402
+from my_app.schemas import CATERING_BID_LIST, CUSTOMER_LIST, MEAL_PREP_BID_LIST, USER_LIST  # noqa: E402
+from my_app.services import delete_bookings_select  # noqa: E402
+
+APP_TABLES = {
+    Booking.__tablename__, Calendar.__tablename__, CateringBid.__tablename__,
+    Customer.__tablename__, MealPrepBid.__tablename__, User.__tablename__, IdempotencyKey.__tablename__,
+}
+
+
+def sample_params():
+    # Real keys from the seeded data, so every lookup actually hits rows
+    booking = db.session.execute(
+        select(Booking.booking_id, Booking.customer_id, Booking.requested_date).order_by(Booking.booking_id.desc()).limit(1)
+    ).one()
+    meal_bid = db.session.execute(select(MealPrepBid).order_by(MealPrepBid.meal_bid_id.desc()).limit(1)).scalar_one()
+    catering_bid = db.session.execute(select(CateringBid).order_by(CateringBid.catering_bid_id.desc()).limit(1)).scalar_one()
+    return {
+        'booking': booking,
+        'meal_bid': meal_bid,
+        'catering_bid': catering_bid,
+        'customer_name': db.session.scalar(select(Customer.name).order_by(Customer.customer_id.desc()).limit(1)),
+        'username': db.session.scalar(select(User.username).order_by(User.user_id.desc()).limit(1)),
+    }
+
+
+def route_queries(p):
+    """
+    (route, statement, reads the whole table by design). The list routes'
+    statements come from the same builders the routes use (listings.py,
+    exports.py, availability.py, idempotency.py, services.py), fed query
+    strings like the frontend's; the rest mirror the routes' ORM lookups.
+    The cascade delete runs last: EXPLAIN ANALYZE executes it, and main()
+    rolls it back.
+    """
+    booking, meal_bid, catering_bid = p['booking'], p['meal_bid'], p['catering_bid']
+    month_start = booking.requested_date.replace(day=1)
+    month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    month = {'from': month_start.isoformat(), 'to': month_end.isoformat()}
+    slot_start = datetime.combine(booking.requested_date, datetime.min.time()) + timedelta(hours=10)
+    by_date = encode_cursor(booking.requested_date.isoformat(), booking.booking_id)
+    bid_cursor = encode_cursor(meal_bid.created_at.isoformat(), 'meal_prep', meal_bid.meal_bid_id)
+
+    def page(args):
+        return bookings_page(args).statement
+
+    return [
+        ('GET /customers', full_select(CUSTOMER_LIST, {})[0], True),
+        ('GET /users', full_select(USER_LIST, {})[0], True),
+        ('GET /meal_prep_bids', full_select(MEAL_PREP_BID_LIST, {})[0], True),
+        ('GET /catering_bids', full_select(CATERING_BID_LIST, {})[0], True),
+        ('GET /bids/summary', bids_summary_select({}, ['bid_status', 'month', 'bid_type']), True),
+        ('GET /bids/summary?customer_id=', bids_summary_select({'customer_id': booking.customer_id}, ['bid_status']), False),
+        ('GET /bookings', page({}), False),
+        ('GET /bookings?after=', page({'after': encode_cursor(booking.booking_id // 2)}), False),
+        ('GET /bookings?order=requested_date', page({'order': 'requested_date'}), False),
+        ('GET /bookings?order=requested_date&after=', page({'order': 'requested_date', 'after': by_date}), False),
+        ('GET /bookings?customer_id=', page({'customer_id': booking.customer_id}), False),
+        ('GET /bookings?bid_status=', page({'bid_status': 'Cancelled'}), False),
+        ('GET /bookings?service_type=', page({'service_type': 'Catering'}), False),
+        ('GET /bookings?from=&to=', page(month), False),
+        ('GET /bookings?fields=', page({'fields': 'booking_id,event_type'}), False),
+        ('GET /bookings/<id>', select(Booking).where(Booking.booking_id == booking.booking_id), False),
+        ('PATCH /customers/<id> (booking check)', select(Booking).where(Booking.customer_id == booking.customer_id), False),
+        ('GET /calendar?from=&to=', calendar_select(month)[0], False),
+        ('GET /calendar?from=&to=&fields=', calendar_select(dict(month, fields='event_id,event_date'))[0], False),
+        ('GET /calendar/<booking_id>', select(Calendar).where(Calendar.booking_id == booking.booking_id).limit(1), False),
+        ('GET /availability?from=&to=', overlapping_select(slot_start, slot_start + timedelta(days=7)), False),
+        ('POST /bookings (conflict check)', overlapping_select(slot_start, slot_start + timedelta(hours=3)), False),
+        ('PUT /bookings/<id> (conflict check)', overlapping_select(
+            slot_start, slot_start + timedelta(hours=3), exclude_booking_id=booking.booking_id), False),
+        ('GET /export/bookings?from=&to=', EXPORTS['bookings'].statement(month_start, month_end), False),
+        ('GET /export/calendar?from=&to=', EXPORTS['calendar'].statement(month_start, month_end), False),
+        ('GET /export/bids?from=&to=', EXPORTS['bids'].statement(month_start, month_end), False),
+        ('POST /meal_prep_bids (existing bid check)', select(MealPrepBid)
+            .where(MealPrepBid.booking_id == booking.booking_id).limit(1), False),
+        ('POST /catering_bids (existing bid check)', select(CateringBid)
+            .where(CateringBid.booking_id == booking.booking_id).limit(1), False),
+        ('POST with Idempotency-Key (lookup)', lookup_select(hashlib.sha256(b'check_query_plans').digest()), False),
+        ('PUT /meal_prep_bids/<id>/<customer_id>/<booking_id>', select(MealPrepBid).where(
+            MealPrepBid.meal_bid_id == meal_bid.meal_bid_id, MealPrepBid.customer_id == meal_bid.customer_id,
+            MealPrepBid.booking_id == meal_bid.booking_id).limit(1), False),
+        ('PUT /meal_prep_bids (customer_name)', select(Customer).where(Customer.name == p['customer_name']).limit(1), False),
+        ('PUT /catering_bids/<id>/<customer_id>/<booking_id>', select(CateringBid).where(
+            CateringBid.booking_id == catering_bid.booking_id, CateringBid.customer_id == catering_bid.customer_id).limit(1), False),
+        ('POST /login', select(User).where(User.username == p['username']).limit(1), False),
+        ('GET /bids', bids_page({}).statement, False),
+        ('GET /bids?after=', bids_page({'after': bid_cursor}).statement, False),
+        ('GET /bids?customer_id=', bids_page({'customer_id': booking.customer_id}).statement, False),
+        ('GET /bids?bid_type=&from=&to=', bids_page(dict(month, bid_type='catering')).statement, False),
+        ('DELETE /bookings/<id> (cascade)', delete_bookings_select([booking.booking_id]), False),
+    ]
+
+
+def seq_scans(plan):
+    # App tables read with a sequential scan anywhere in the plan tree
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in APP_TABLES:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def explain(statement):
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    connection = db.session.connection()
+    result = connection.exec_driver_sql('EXPLAIN (ANALYZE, FORMAT JSON) ' + str(compiled), compiled.params)
+    return result.scalar()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, metavar='ROWS', help='top every table up to ROWS rows first')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            sys.exit('check_query_plans.py needs a PostgreSQL DATABASE_URL')
+        if args.seed:
+            seed(args.seed)
+
+        failures = 0
+        for route, statement, full_scan in route_queries(sample_params()):
+            result = explain(statement)
+            scans = seq_scans(result['Plan'])
+            if scans and not full_scan:
+                status = 'FAIL'
+                failures += 1
+            else:
+                status = 'ok  ' if not scans else 'full'
+            print(f"{status} {result['Execution Time']:9.2f} ms  {route}" + (f"  (Seq Scan on {', '.join(scans)})" if scans else ''))
+        db.session.rollback()
+
+    if failures:
+        print(f'{failures} route queries use a sequential scan')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Load-test the sync deployment (gunicorn sync workers, the Procfile setup)
+against the async one (my_app.asgi on uvicorn workers) with the same number
+of workers, and report requests/sec, p50 / p99 latency and total RSS.
+
+    DATABASE_URL=postgresql://postgres@localhost/cyds_bench DB_SSLMODE=disable \\
+        python scripts/compare_async.py --workers 2 --concurrency 32 --db-latency-ms 20
+
+--db-latency-ms puts a TCP proxy in front of the database that delays every
+packet by half that many milliseconds each way, to stand in for the round trip
+to Supabase when testing against a local Postgres. Reads only: safe to point
+at any database, but every request hits it.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from bench.load import drive, wait_for_port  # noqa: E402
+
+DEFAULT_ROUTES = [
+    '/bookings?limit=50',
+    '/bookings?order=requested_date&limit=50',
+    '/bids?limit=50',
+    '/calendar?from=2024-03-01&to=2024-03-31',
+]
+
+MODES = {
+    'sync': ['my_app:create_app()'],
+    'async': ['-k', 'uvicorn.workers.UvicornWorker', 'my_app.asgi:create_asgi_app()'],
+}
+
+
+def start_latency_proxy(database_url, latency_ms):
+    """
+    Serve the database on a local TCP port through a proxy that delays each
+    chunk by latency_ms / 2 in each direction. Returns DATABASE_URL rewritten
+    to go through it.
+    """
+    parts = urlsplit(database_url)
+    query = parse_qs(parts.query)
+    socket_dir = query.pop('host', [None])[0]
+    if socket_dir and socket_dir.startswith('/'):
+        target = lambda: asyncio.open_unix_connection(os.path.join(socket_dir, f'.s.PGSQL.{parts.port or 5432}'))  # noqa: E731
+    else:
+        target = lambda: asyncio.open_connection(parts.hostname, parts.port or 5432)  # noqa: E731
+    delay = latency_ms / 2000
+
+    async def pipe(reader, writer):
+        try:
+            while data := await reader.read(65536):
+                await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        server_reader, server_writer = await target()
+        await asyncio.gather(pipe(client_reader, server_writer), pipe(server_reader, client_writer))
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0))
+    port = server.sockets[0].getsockname()[1]
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    netloc = f'{parts.username or ""}{":" + parts.password if parts.password else ""}@127.0.0.1:{port}'
+    return urlunsplit((parts.scheme, netloc, parts.path, urlencode(query, doseq=True), ''))
+
+
+def rss_mb(pid):
+    # Resident memory of a process and all of its descendants
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+            with open(f'/proc/{current}/task/{current}/children') as children:
+                pids.extend(int(child) for child in children.read().split())
+        except FileNotFoundError:
+            continue
+    return total / 1024
+
+
+async def load(port, routes, concurrency, duration):
+    # GET the routes round robin; returns (latencies, requests that failed or were not 200)
+    latencies, statuses, errors, _ = await drive(port, 'GET', itertools.cycle((route, None) for route in routes),
+                                                 concurrency, duration)
+    return latencies, errors + sum(n for status, n in statuses.items() if status != 200)
+
+
+def run_mode(mode, args, env):
+    port = args.port
+    command = [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--bind', f'127.0.0.1:{port}',
+               '--timeout', '120', '--log-level', 'warning'] + MODES[mode]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        wait_for_port(port)
+        asyncio.run(load(port, args.routes, args.concurrency, 2))  # Warm up pools and caches
+        latencies, errors = asyncio.run(load(port, args.routes, args.concurrency, args.duration))
+        memory = rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(f'{mode:6} {len(latencies) / args.duration:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+          f'p99 {p99 * 1000:7.1f} ms  errors {errors}  RSS {memory:6.1f} MB ({args.workers} workers)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for both modes (default 2)')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent keep-alive clients (default 32)')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per mode (default 15)')
+    parser.add_argument('--db-latency-ms', type=float, default=0, help='simulated database round trip')
+    parser.add_argument('--port', type=int, default=8731)
+    parser.add_argument('--route', dest='routes', action='append', help='GET path to request (repeatable)')
+    parser.add_argument('--mode', choices=sorted(MODES), action='append', help='run only this mode')
+    args = parser.parse_args()
+    args.routes = args.routes or DEFAULT_ROUTES
+
+    env = dict(os.environ, LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+    if not env.get('DATABASE_URL', '').startswith('postgres'):
+        sys.exit('compare_async.py needs a PostgreSQL DATABASE_URL')
+    if args.db_latency_ms:
+        env['DATABASE_URL'] = start_latency_proxy(env['DATABASE_URL'], args.db_latency_ms)
+
+    for mode in args.mode or ['sync', 'async']:
+        run_mode(mode, args, env)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import os
+from datetime import date, datetime, timezone
+
+import pytest
+
+from bench.seed import create_sqlite_schema
+from my_app import create_app, db
+from my_app.customer_cache import customer_cache
+from my_app.models import Customer
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # A fresh SQLite file per test; create_sqlite_schema lets it assign BigInteger ids
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "app.db"}')
+    app = create_app()
+    with app.app_context():
+        create_sqlite_schema()
+    customer_cache.invalidate()  # Per-worker singleton; ids repeat across the tests' databases
+    return app
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def any_app(request, monkeypatch):
+    """
+    The app on SQLite, then on the PostgreSQL database in TEST_POSTGRES_URL
+    (a migrated, throwaway one) when that is set, for code with a separate
+    PostgreSQL path. Tests using it remove what they write.
+    """
+    if request.param == 'sqlite':
+        return request.getfixturevalue('app')
+    url = os.getenv('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    monkeypatch.setenv('DATABASE_URL', url)
+    app = create_app()
+    customer_cache.invalidate()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_customer(customer_id=1, is_active=True):
+    db.session.add(Customer(
+        customer_id=customer_id, name=f'Customer {customer_id}', email=f'c{customer_id}@example.com',
+        phone_number='555', is_active=is_active,
+    ))
+    db.session.commit()
+
+
+def booking_body(customer_id=1, requested_date=date(2030, 1, 2), start_hour=10, hours=2):
+    # POST /bookings JSON for a slot on requested_date
+    start = datetime(requested_date.year, requested_date.month, requested_date.day, start_hour, tzinfo=timezone.utc)
+    return {
+        'requested_date': requested_date.isoformat(),
+        'event_location': 'Hall',
+        'event_type': 'Catering',
+        'customer_id': customer_id,
+        'number_of_guests': 20,
+        'bid_status': 'Pending',
+        'user_id': None,
+        'service_type': 'Catering',
+        'start_time': start.isoformat(),
+        'end_time': start.replace(hour=start_hour + hours).isoformat(),
+    }
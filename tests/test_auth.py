@@ -0,0 +1,112 @@
+import threading
+from types import SimpleNamespace
+
+import anyio
+
+from flask import Flask
+from itsdangerous import TimestampSigner
+
+from my_app.auth import TokenAuth, tokens
+from my_app.config import Config
+
+USER = SimpleNamespace(user_id=7)
+
+
+def token_auth(secret_key, database_uri=None, **config):
+    # A TokenAuth of its own, as another worker or deploy would have it
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(SQLALCHEMY_DATABASE_URI=database_uri, **config)
+    app.secret_key = secret_key
+    auth = TokenAuth()
+    auth.init_app(app)
+    return auth
+
+
+def bearer(token):
+    return f'Bearer {token}'
+
+
+def test_issued_token_verifies():
+    auth = token_auth('key-1')
+    token, expires_in = auth.issue(USER)
+    claims, error = auth.authenticate(bearer(token))
+    assert error is None
+    assert (claims.user_id, claims.role) == (7, 'staff')
+    assert expires_in == auth.ttl
+
+
+def test_bad_tokens_are_rejected():
+    auth = token_auth('key-1')
+    token, _ = auth.issue(USER)
+    assert auth.authenticate(None) == (None, None)
+    assert auth.authenticate(token)[1] == 'Expected an Authorization: Bearer token.'
+    assert auth.authenticate(bearer(token[:-2] + 'xx'))[1] == 'Invalid token.'
+    assert token_auth('key-2').authenticate(bearer(token))[1] == 'Invalid token.'
+
+
+def test_fallback_keys_accept_tokens_signed_before_rotation():
+    old_token, _ = token_auth('key-1').issue(USER)
+    rotated = token_auth('key-2', SECRET_KEY_FALLBACKS=['key-1'])
+    assert rotated.authenticate(bearer(old_token))[1] is None
+
+    # New tokens are signed with the new key; the old key alone no longer accepts them
+    new_token, _ = rotated.issue(USER)
+    assert token_auth('key-2').authenticate(bearer(new_token))[1] is None
+    assert token_auth('key-1').authenticate(bearer(new_token))[1] == 'Invalid token.'
+
+
+def test_token_expires_after_ttl(monkeypatch):
+    auth = token_auth('key-1', AUTH_TOKEN_TTL=60)
+    token, _ = auth.issue(USER)
+    get_timestamp = TimestampSigner.get_timestamp
+    monkeypatch.setattr(TimestampSigner, 'get_timestamp', lambda self: get_timestamp(self) + 61)
+    assert auth.authenticate(bearer(token)) == (None, 'Token expired.')
+
+
+def test_revoked_token_is_refused(app, client):
+    with app.app_context():
+        token, _ = tokens.issue(USER)
+    headers = {'Authorization': bearer(token)}
+    assert client.post('/logout', headers=headers).status_code == 200
+
+    response = client.post('/logout', headers=headers)
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Token revoked.'}
+
+    # Another worker loads the revocation from Revoked_Tokens
+    other = token_auth(app.secret_key, app.config['SQLALCHEMY_DATABASE_URI'])
+    assert not other.denylist_loaded
+    other.load_denylist()
+    assert other.denylist_loaded
+    assert other.authenticate(bearer(token)) == (None, 'Token revoked.')
+
+
+def test_auth_required(app, client, monkeypatch):
+    monkeypatch.setattr(tokens, 'required', True)
+    response = client.get('/customers')
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+    with app.app_context():
+        token, _ = tokens.issue(USER)
+    assert client.get('/customers', headers={'Authorization': bearer(token)}).status_code == 200
+
+
+def test_async_routes_check_tokens_off_the_event_loop_until_the_denylist_loads(monkeypatch):
+    from my_app.asgi import ASYNC_ROUTES
+
+    threads = []
+
+    def authenticate(header):
+        threads.append(threading.current_thread())
+        return None, 'Invalid token.'
+
+    monkeypatch.setattr(tokens, 'authenticate', authenticate)
+    monkeypatch.setattr(TokenAuth, 'denylist_loaded', property(lambda self: False))
+    request = SimpleNamespace(
+        headers={'Authorization': 'Bearer x'}, method='GET', url=SimpleNamespace(path='/customers'),
+        app=SimpleNamespace(state=SimpleNamespace(log_sample_rate=0)),
+    )
+    response = anyio.run(ASYNC_ROUTES[0].respond, request, 0.0)
+    assert response.status_code == 401
+    assert threads and threads[0] is not threading.main_thread()
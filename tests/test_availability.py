@@ -0,0 +1,146 @@
+import random
+import time as time_module
+from datetime import date, datetime, time, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from my_app import availability, db
+from my_app.availability import EventSpans, booking_conflicts, event_span, parse_window
+from my_app.models import Calendar
+
+DAY = date(2030, 1, 2)
+
+
+def at(day, hour, minute=0):
+    return datetime.combine(day, time(hour, minute))
+
+
+def test_event_span_within_a_day():
+    assert event_span(DAY, time(10), time(12)) == (at(DAY, 10), at(DAY, 12))
+
+
+def test_event_span_past_midnight():
+    assert event_span(DAY, time(22), time(1)) == (at(DAY, 22), at(DAY + timedelta(days=1), 1))
+    # Equal times are a whole day, the longest an event can be
+    assert event_span(DAY, time(9), time(9)) == (at(DAY, 9), at(DAY + timedelta(days=1), 9))
+
+
+def test_event_span_drops_utc_offsets():
+    offset = timezone(timedelta(hours=-6))
+    assert event_span(DAY, time(10, tzinfo=offset), datetime(2030, 1, 1, 12, tzinfo=timezone.utc)) == (
+        at(DAY, 10), at(DAY, 12))
+
+
+def test_event_span_untimed():
+    assert event_span(DAY, None, time(12)) is None
+    assert event_span(DAY, time(10), None) is None
+
+
+def spans(*events):
+    return EventSpans([(span, SimpleNamespace(event_id=n)) for n, span in enumerate(events)])
+
+
+def test_event_spans_touching_events_do_not_overlap():
+    events = spans((at(DAY, 8), at(DAY, 10)), (at(DAY, 12), at(DAY, 14)))
+    assert events.overlapping(at(DAY, 10), at(DAY, 12)) == []
+    assert [row.event_id for _, row in events.overlapping(at(DAY, 9), at(DAY, 13))] == [0, 1]
+
+
+def test_event_spans_finds_events_started_the_day_before():
+    overnight = event_span(DAY - timedelta(days=1), time(9), time(9))
+    events = spans(overnight, (at(DAY, 12), at(DAY, 14)))
+    assert [row.event_id for _, row in events.overlapping(at(DAY, 8), at(DAY, 8, 30))] == [0]
+    assert events.overlapping(at(DAY, 9), at(DAY, 10)) == []
+
+
+def test_event_spans_matches_a_linear_scan():
+    rng = random.Random(0)
+    events = []
+    for _ in range(2000):
+        day = DAY + timedelta(days=rng.randrange(60))
+        events.append(event_span(day, time(rng.randrange(24), rng.choice((0, 30))), time(rng.randrange(24))))
+    index = spans(*events)
+    for _ in range(300):
+        start = at(DAY, 0) + timedelta(minutes=30 * rng.randrange(60 * 48))
+        end = start + timedelta(hours=rng.randrange(1, 30))
+        expected = sorted((span, n) for n, span in enumerate(events) if span[0] < end and start < span[1])
+        assert [(span, row.event_id) for span, row in index.overlapping(start, end)] == expected
+
+
+@pytest.fixture
+def calendar(app):
+    # Events on DAY: 10-12 for booking 1, 14-16 cancelled, 22-01 past midnight, one without times
+    with app.app_context():
+        for event_id, booking_id, status, start, end in (
+            (1, 1, 'Pending', time(10), time(12)),
+            (2, 2, 'Cancelled', time(14), time(16)),
+            (3, 3, 'Confirmed', time(22), time(1)),
+            (4, 4, 'Pending', None, None),
+        ):
+            db.session.add(Calendar(
+                event_id=event_id, booking_id=booking_id, event_date=DAY, event_status=status,
+                event_type='Catering', start_time=start, end_time=end,
+            ))
+        db.session.commit()
+    return app
+
+
+def conflicting_events(app, event_date, start, end, booking_id=None):
+    with app.app_context():
+        return [event['event_id'] for event in booking_conflicts(event_date, start, end, booking_id=booking_id)]
+
+
+def test_booking_conflicts_overlap(calendar):
+    assert conflicting_events(calendar, DAY, time(11), time(13)) == [1]
+    assert conflicting_events(calendar, DAY, time(9), time(23)) == [1, 3]
+
+
+def test_booking_conflicts_touching_and_cancelled_are_free(calendar):
+    assert conflicting_events(calendar, DAY, time(12), time(14)) == []
+    assert conflicting_events(calendar, DAY, time(14), time(16)) == []
+
+
+def test_booking_conflicts_past_midnight(calendar):
+    next_day = DAY + timedelta(days=1)
+    assert conflicting_events(calendar, next_day, time(0, 30), time(2)) == [3]
+    assert conflicting_events(calendar, next_day, time(1), time(2)) == []
+    # A booking of its own that runs past midnight into the next day's events
+    assert conflicting_events(calendar, DAY - timedelta(days=1), time(23), time(10)) == []
+    assert conflicting_events(calendar, DAY - timedelta(days=1), time(23), time(10, 30)) == [1]
+
+
+def test_booking_conflicts_exclude_the_booking_itself(calendar):
+    assert conflicting_events(calendar, DAY, time(11), time(13), booking_id=1) == []
+
+
+def test_booking_and_availability_read_offsets_alike(calendar, client):
+    # 10:00-06:00 is 10:00 on both paths, whatever the server's timezone
+    offset = timezone(timedelta(hours=-6))
+    start, end = datetime(2030, 1, 2, 10, tzinfo=offset), datetime(2030, 1, 2, 12, tzinfo=offset)
+    assert parse_window({'from': start.isoformat(), 'to': end.isoformat()}) == (at(DAY, 10), at(DAY, 12))
+    assert conflicting_events(calendar, DAY, start, end) == [1]
+
+    body = client.get('/availability', query_string={'from': start.isoformat(), 'to': end.isoformat()}).get_json()
+    assert [event['event_id'] for event in body['events']] == [1]
+    assert body['free'] == []
+
+
+def test_availability_gaps(calendar, client):
+    body = client.get('/availability', query_string={'from': DAY.isoformat(), 'to': DAY.isoformat()}).get_json()
+    assert [event['event_id'] for event in body['events']] == [1, 3]
+    assert body['free'] == [
+        {'start': at(DAY, 0).isoformat(), 'end': at(DAY, 10).isoformat()},
+        {'start': at(DAY, 12).isoformat(), 'end': at(DAY, 22).isoformat()},
+    ]
+    assert [event['event_id'] for event in body['unscheduled']] == [4]
+
+
+def test_missing_span_index_is_checked_again(app, monkeypatch):
+    # A worker started before migration 8c4d2e6f1a37 does not stay on the fallback
+    with app.app_context():
+        key = str(db.engine.url)
+        monkeypatch.setitem(availability._span_index, key, (time_module.monotonic() - availability.SPAN_INDEX_RECHECK - 1, False))
+        assert availability.has_span_index() is False
+        checked_at, _ = availability._span_index[key]
+        assert time_module.monotonic() - checked_at < availability.SPAN_INDEX_RECHECK
@@ -0,0 +1,68 @@
+from datetime import date, time, timedelta
+
+from sqlalchemy import event
+
+from my_app import db
+from my_app.models import Calendar, Customer
+
+
+def seed(app, count):
+    # `count` events on consecutive days, each for a customer of its own
+    with app.app_context():
+        db.session.execute(db.delete(Calendar))
+        db.session.execute(db.delete(Customer))
+        for n in range(1, count + 1):
+            db.session.add(Customer(customer_id=n, name=f'Customer {n}', email=f'c{n}@example.com', phone_number='555'))
+            db.session.add(Calendar(
+                event_id=n, event_date=date(2030, 1, 1) + timedelta(days=n), event_status='Pending',
+                event_type='Catering', customer_id=n,
+                start_time=time(9), end_time=time(11),
+            ))
+        db.session.commit()
+
+
+def calendar_statements(app):
+    # (response, SQL statements executed while serving GET /calendar)
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = app.test_client().get('/calendar')
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return response, statements
+
+
+def test_calendar_query_count_does_not_grow_with_events(app):
+    counts = {}
+    for n in (1, 10, 50):
+        seed(app, n)
+        response, statements = calendar_statements(app)
+        assert response.status_code == 200
+        events = response.get_json()
+        assert len(events) == n
+        assert all(item['customer_name'] == f'Customer {item["customer_id"]}' for item in events)
+        counts[n] = len(statements)
+
+    # The customer's name is joined in, not looked up per event
+    assert counts[1] == counts[10] == counts[50], counts
+    assert counts[50] <= 3, counts
+
+
+def test_calendar_window_and_fields(app):
+    seed(app, 10)  # Events on 2030-01-02 .. 2030-01-11
+    client = app.test_client()
+
+    events = client.get('/calendar', query_string={'from': '2030-01-04', 'to': '2030-01-06'}).get_json()
+    assert [item['event_date'] for item in events] == ['2030-01-04', '2030-01-05', '2030-01-06']
+
+    events = client.get('/calendar', query_string={'from': '2030-01-11', 'fields': 'event_id,customer_name'}).get_json()
+    assert events == [{'event_id': 10, 'customer_name': 'Customer 10'}]
+
+    assert client.get('/calendar', query_string={'from': '2030-13-01'}).status_code == 400
+    assert client.get('/calendar', query_string={'fields': 'password'}).status_code == 400
@@ -0,0 +1,95 @@
+from datetime import date, datetime, timezone
+
+from sqlalchemy import delete, func, select
+
+from conftest import add_customer
+from my_app import db, routes
+from my_app.etags import versions_select
+from my_app.models import Booking, Calendar, CateringBid, Customer, MealPrepBid, Service
+from my_app.services import BOOKING_DEPENDENTS, delete_bookings
+
+# High ids, clear of anything already in a shared PostgreSQL test database, and removed afterwards
+CUSTOMER_ID = 900001
+BOOKING_IDS = [900001, 900002, 900003]
+TABLES = [model.__tablename__ for model in BOOKING_DEPENDENTS + (Booking,)]
+
+
+def add_booking_with_dependents(booking_id):
+    start = datetime(2030, 1, 2, 10, tzinfo=timezone.utc)
+    db.session.add(Booking(
+        booking_id=booking_id, requested_date=date(2030, 1, 2), customer_id=CUSTOMER_ID, number_of_guests=10,
+        event_location='Hall', event_type='Catering', bid_status='Pending', service_type='Catering',
+        start_time=start, end_time=start.replace(hour=12),
+    ))
+    db.session.flush()
+    db.session.add_all([
+        Calendar(event_id=booking_id, booking_id=booking_id, event_date=date(2030, 1, 2),
+                 event_status='Pending', event_type='Catering'),
+        Service(service_id=booking_id, booking_id=booking_id, service_name='Setup'),
+        MealPrepBid(meal_bid_id=booking_id, booking_id=booking_id, customer_id=CUSTOMER_ID, bid_status='Pending',
+                    miles=1, service_fee=1, estimated_groceries=1, supplies=1),
+        CateringBid(catering_bid_id=booking_id, booking_id=booking_id, customer_id=CUSTOMER_ID,
+                    bid_status='Pending', service_fee=1),
+    ])
+    db.session.flush()
+
+
+def remaining(model):
+    return sorted(db.session.scalars(select(model.booking_id).where(model.booking_id.in_(BOOKING_IDS))))
+
+
+def test_delete_bookings_removes_only_the_targeted_rows(any_app):
+    with any_app.app_context():
+        try:
+            db.session.add(Customer(customer_id=CUSTOMER_ID, name='Delete test', email='delete@example.com',
+                                    phone_number='555'))
+            for booking_id in BOOKING_IDS:
+                add_booking_with_dependents(booking_id)
+            db.session.commit()
+            before = dict(db.session.execute(versions_select(TABLES)).all())
+
+            deleted, counts = delete_bookings(BOOKING_IDS[:2] + [999999])
+            db.session.commit()
+
+            assert deleted == BOOKING_IDS[:2]
+            assert counts == {table: 2 for table in TABLES}
+            for model in BOOKING_DEPENDENTS + (Booking,):
+                assert remaining(model) == BOOKING_IDS[2:], model.__tablename__
+            # Every table the delete touched has a new version, so cached list responses revalidate
+            after = dict(db.session.execute(versions_select(TABLES)).all())
+            assert all(after[table] > before[table] for table in TABLES), (before, after)
+        finally:
+            db.session.rollback()
+            delete_bookings(BOOKING_IDS)
+            db.session.execute(delete(Customer).where(Customer.customer_id == CUSTOMER_ID))
+            db.session.commit()
+
+
+def test_bulk_delete_route(app, client):
+    with app.app_context():
+        add_customer(CUSTOMER_ID)
+        for booking_id in BOOKING_IDS:
+            add_booking_with_dependents(booking_id)
+        db.session.commit()
+
+    response = client.post('/bookings/bulk_delete', json={'booking_ids': [BOOKING_IDS[0], 999999]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['deleted'] == [BOOKING_IDS[0]]
+    assert body['not_found'] == [999999]
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).select_from(Calendar)) == 2
+
+
+def test_bulk_delete_limit(app, client, monkeypatch):
+    monkeypatch.setattr(routes, 'MAX_BULK_BOOKINGS', 2)
+    response = client.post('/bookings/bulk_delete', json={'booking_ids': BOOKING_IDS})
+    assert response.status_code == 400
+    assert 'At most 2 bookings' in response.get_json()['error']
+
+    assert client.post('/bookings/bulk_delete', json={'booking_ids': BOOKING_IDS[:2]}).status_code == 200
+
+
+def test_bulk_delete_rejects_bad_ids(client):
+    assert client.post('/bookings/bulk_delete', json={'booking_ids': []}).status_code == 400
+    assert client.post('/bookings/bulk_delete', json={'booking_ids': ['1']}).status_code == 400
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import OperationalError
+
+from conftest import add_customer
+from my_app import db
+from my_app.etags import versions_select
+from my_app.models import Customer, TableVersion
+
+CUSTOMER_ID = 900101  # Clear of a shared PostgreSQL test database's rows, and removed afterwards
+
+
+def test_unchanged_poll_is_304(app, client):
+    with app.app_context():
+        add_customer()
+    first = client.get('/customers')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    poll = client.get('/customers', headers={'If-None-Match': etag})
+    assert poll.status_code == 304
+    assert poll.headers['ETag'] == etag
+    assert poll.get_data() == b''
+
+
+def test_write_changes_the_etag(app, client):
+    with app.app_context():
+        add_customer(1)
+    etag = client.get('/customers').headers['ETag']
+
+    with app.app_context():
+        add_customer(2)  # Flushed insert
+    response = client.get('/customers', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 2
+
+    etag = response.headers['ETag']
+    with app.app_context():
+        db.session.execute(update(Customer).values(name='Renamed'))  # Bulk statement, no flush
+        db.session.commit()
+    assert client.get('/customers', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_rolled_back_write_keeps_the_etag(app, client):
+    with app.app_context():
+        add_customer(1)
+    etag = client.get('/customers').headers['ETag']
+    with app.app_context():
+        db.session.get(Customer, 1).name = 'Not saved'
+        db.session.flush()
+        db.session.rollback()
+    assert client.get('/customers', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_version_row_is_only_locked_at_commit(any_app):
+    # Two writers to one table overlap until they commit; only the commit bumps (and locks) the version row
+    with any_app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip('row locks are PostgreSQL only')
+        before = dict(db.session.execute(versions_select(['Customers'])).all()).get('Customers', 0)
+        try:
+            customer = Customer(customer_id=CUSTOMER_ID, name='Lock test', email='lock@example.com',
+                                phone_number='555')
+            db.session.add(customer)
+            db.session.flush()
+            with db.engine.connect() as other:
+                other.execute(text("SET lock_timeout = '1s'"))
+                try:
+                    other.execute(select(TableVersion).where(TableVersion.table_name == 'Customers').with_for_update())
+                except OperationalError:
+                    pytest.fail('Table_Versions row locked before commit')
+                other.rollback()
+            db.session.commit()
+            after = db.session.scalar(select(TableVersion.version).where(TableVersion.table_name == 'Customers'))
+            assert after == before + 1
+        finally:
+            db.session.rollback()
+            db.session.execute(db.delete(Customer).where(Customer.customer_id == CUSTOMER_ID))
+            db.session.commit()
@@ -0,0 +1,103 @@
+from sqlalchemy import func, select
+
+from conftest import add_customer, booking_body
+from my_app import db, routes
+from my_app.models import Booking, Customer
+
+
+def post_booking(client, body, key='retry-1'):
+    return client.post('/bookings', json=body, headers={'Idempotency-Key': key})
+
+
+def booking_count(app):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(Booking))
+
+
+def test_retry_replays_the_stored_response(app, client):
+    with app.app_context():
+        add_customer()
+    first = post_booking(client, booking_body())
+    retry = post_booking(client, booking_body())
+
+    assert first.status_code == retry.status_code == 201
+    assert 'Idempotent-Replayed' not in first.headers
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert booking_count(app) == 1
+
+
+def test_validation_error_is_replayed(app, client):
+    body = booking_body()
+    del body['event_location']
+    assert post_booking(client, body).status_code == 400
+    retry = post_booking(client, body)
+    assert retry.status_code == 400
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_key_reused_with_a_different_body_is_422(app, client):
+    with app.app_context():
+        add_customer()
+    assert post_booking(client, booking_body()).status_code == 201
+    response = post_booking(client, booking_body(start_hour=14))
+    assert response.status_code == 422
+    assert booking_count(app) == 1
+
+
+def test_retry_after_a_5xx_runs_the_view_again(app, client, monkeypatch):
+    with app.app_context():
+        add_customer()
+    add_calendar_event = routes.add_calendar_event
+    calls = []
+
+    def fail_once(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise RuntimeError('database went away')
+        return add_calendar_event(**kwargs)
+
+    monkeypatch.setattr(routes, 'add_calendar_event', fail_once)
+    assert post_booking(client, booking_body()).status_code == 500
+    retry = post_booking(client, booking_body())
+    assert retry.status_code == 201
+    assert 'Idempotent-Replayed' not in retry.headers
+    assert booking_count(app) == 1
+
+
+def test_4xx_that_depends_on_state_is_not_frozen(app, client):
+    # 404 for an unknown customer, 403 while deactivated: both clear once the customer is fixed
+    assert post_booking(client, booking_body()).status_code == 404
+    with app.app_context():
+        add_customer(is_active=False)
+    assert post_booking(client, booking_body()).status_code == 403
+    with app.app_context():
+        db.session.get(Customer, 1).is_active = True
+        db.session.commit()
+    retry = post_booking(client, booking_body())
+    assert retry.status_code == 201
+    assert 'Idempotent-Replayed' not in retry.headers
+
+
+def test_conflict_is_not_frozen(app, client):
+    with app.app_context():
+        add_customer()
+    taken = post_booking(client, booking_body(), key='first')
+    assert taken.status_code == 201
+    assert post_booking(client, booking_body(start_hour=11)).status_code == 409
+
+    assert client.delete(f"/bookings/{taken.get_json()['booking_id']}").status_code in (200, 204)
+    assert post_booking(client, booking_body(start_hour=11)).status_code == 201
+
+
+def test_store_failure_still_sends_the_response(app, client, monkeypatch):
+    with app.app_context():
+        add_customer()
+
+    def broken_store(*args):
+        raise RuntimeError('Idempotency_Keys unavailable')
+
+    monkeypatch.setattr('my_app.idempotency.store', broken_store)
+    response = post_booking(client, booking_body())
+    assert response.status_code == 201
+    assert booking_count(app) == 1
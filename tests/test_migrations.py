@@ -0,0 +1,36 @@
+import os
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from my_app import db
+from my_app.database import check_migrations_applied
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def stamp(revision):
+    with db.engine.begin() as connection:
+        MigrationContext.configure(connection).stamp(ScriptDirectory(MIGRATIONS), revision)
+
+
+def test_unmigrated_database_is_refused(app):
+    with app.app_context():
+        with pytest.raises(RuntimeError, match='at migration none'):
+            check_migrations_applied(db.engine, MIGRATIONS)
+
+
+def test_database_behind_head_is_refused(app):
+    script = ScriptDirectory(MIGRATIONS)
+    head = script.get_current_head()
+    with app.app_context():
+        stamp(script.get_revision(head).down_revision)
+        with pytest.raises(RuntimeError, match=f'needs {head}'):
+            check_migrations_applied(db.engine, MIGRATIONS)
+
+
+def test_migrated_database_starts(app):
+    with app.app_context():
+        stamp('heads')
+        check_migrations_applied(db.engine, MIGRATIONS)
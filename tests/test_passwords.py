@@ -0,0 +1,101 @@
+import itertools
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from my_app import db
+from my_app.models import User
+from my_app.passwords import passwords
+
+# The throttle counters live in the per-worker singleton, so every test logs in from addresses of its own
+_addresses = (f'203.0.113.{n}' for n in itertools.count(1))
+
+
+@pytest.fixture
+def address():
+    return lambda: next(_addresses)
+
+
+def add_user(username, password, user_id=1):
+    db.session.add(User(user_id=user_id, username=username, password=password, email=f'{username}@example.com'))
+    db.session.commit()
+
+
+def login(client, username, password, address):
+    # Through the router: ProxyFix (PROXY_HOPS=1) takes the client address from X-Forwarded-For
+    return client.post('/login', json={'username': username, 'password': password},
+                       headers={'X-Forwarded-For': address})
+
+
+def stored_password(app, username):
+    with app.app_context():
+        return db.session.scalar(db.select(User.password).where(User.username == username))
+
+
+def test_legacy_plain_text_password_is_rehashed(app, client, address):
+    with app.app_context():
+        add_user('legacy', 'secret')
+    assert login(client, 'legacy', 'wrong', address()).status_code == 401
+    assert stored_password(app, 'legacy') == 'secret'
+
+    response = login(client, 'legacy', 'secret', address())
+    assert response.status_code == 200
+    assert response.get_json()['access_token']
+    stored = stored_password(app, 'legacy')
+    assert stored.startswith(passwords._canonical_method + '$')
+    assert login(client, 'legacy', 'secret', address()).status_code == 200
+
+
+def test_other_hash_method_is_rehashed(app, client, address):
+    with app.app_context():
+        add_user('old_hash', generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+    assert login(client, 'old_hash', 'secret', address()).status_code == 200
+    assert stored_password(app, 'old_hash').startswith(passwords._canonical_method + '$')
+
+
+def test_unknown_username_costs_one_hash(app, client, address):
+    with app.app_context():
+        add_user('known', generate_password_hash('secret', passwords.method))
+    hashes = passwords.stats['hashes']
+    assert login(client, 'nobody', 'secret', address()).status_code == 401
+    assert passwords.stats['hashes'] == hashes + 1
+    assert login(client, 'known', 'wrong', address()).status_code == 401
+    assert passwords.stats['hashes'] == hashes + 2
+
+
+def test_repeated_failures_are_429_for_that_client_only(app, client, address):
+    with app.app_context():
+        add_user('staff', generate_password_hash('secret', passwords.method))
+    attacker, owner = address(), address()
+    for _ in range(passwords.max_user_failures):
+        assert login(client, 'staff', 'guess', attacker).status_code == 401
+
+    refused = login(client, 'staff', 'secret', attacker)
+    assert refused.status_code == 429
+    assert int(refused.headers['Retry-After']) > 0
+    # Knowing the username is not enough to lock its owner out
+    assert login(client, 'staff', 'secret', owner).status_code == 200
+
+
+def test_address_limit_spans_usernames(app, client, address, monkeypatch):
+    monkeypatch.setattr(passwords, 'max_address_failures', 3)
+    client_address = address()
+    for n in range(3):
+        assert login(client, f'user{n}', 'guess', client_address).status_code == 401
+    assert login(client, 'someone_else', 'guess', client_address).status_code == 429
+
+
+def test_username_limit_spans_addresses(app, client, address, monkeypatch):
+    monkeypatch.setattr(passwords, 'max_username_failures', 3)
+    for _ in range(3):
+        assert login(client, 'target', 'guess', address()).status_code == 401
+    assert login(client, 'target', 'guess', address()).status_code == 429
+
+
+def test_busy_hasher_is_503(app, client, address, monkeypatch):
+    with app.app_context():
+        add_user('busy', generate_password_hash('secret', passwords.method))
+    monkeypatch.setattr(passwords, 'queue', -passwords.threads)  # Every thread taken, no queue left
+    response = login(client, 'busy', 'secret', address())
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'